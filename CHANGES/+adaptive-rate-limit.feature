@@ -0,0 +1 @@
+Added the `ANSIBLE_SYNC_HOST_CONCURRENCY` setting. With it, collection syncs adapt their concurrency per remote host, backing off on `429` and `503` answers and honoring `Retry-After`.
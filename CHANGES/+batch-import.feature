@@ -0,0 +1 @@
+Added a repositories/ansible/ansible/<pk>/import_collections/ endpoint that imports many collection tarballs, tar archives of tarballs or a worker-side directory in one task, adding all of them to the repository in a single new version.
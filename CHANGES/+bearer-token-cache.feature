@@ -0,0 +1 @@
+Bearer tokens are now cached per auth url and refresh token, and refreshed shortly before they expire instead of after a `401`.
@@ -0,0 +1 @@
+Resolve and create the Collection and AnsibleNamespace objects of a sync save batch in bulk instead of one `get_or_create` per content unit.
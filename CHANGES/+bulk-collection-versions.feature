@@ -0,0 +1,2 @@
+Added a `collection_versions/bulk/` endpoint returning the metadata of the versions of many collections in one POST request.
+Collection syncs with a requirements file use it automatically when the remote is another Pulp, instead of downloading all collection versions.
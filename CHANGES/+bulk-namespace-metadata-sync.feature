@@ -0,0 +1 @@
+Look up the known namespace metadata of a collection sync with a single query, and fetch the remaining namespaces through the filtered namespaces listing or on the bounded metadata work queue.
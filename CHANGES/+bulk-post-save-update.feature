@@ -0,0 +1 @@
+Write the `files` and `docs_blob` of newly synced collection versions with one UPDATE statement per save batch instead of one per collection version.
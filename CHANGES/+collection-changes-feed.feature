@@ -0,0 +1,2 @@
+Added a `collection_versions/changes/` endpoint listing the collection versions added to and removed from a distribution since a cursor.
+Optimized syncs from another Pulp use it to only process what changed since the last sync.
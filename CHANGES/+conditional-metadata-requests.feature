@@ -0,0 +1 @@
+Collection syncs can cache remote metadata responses on disk, in `ANSIBLE_SYNC_METADATA_CACHE_DIR`, and revalidate them with `If-None-Match`/`If-Modified-Since`, so unchanged metadata is not downloaded again.
@@ -0,0 +1 @@
+Collection syncs now download docs blobs with their own `ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY` and keep them compressed in memory instead of writing them to temporary files.
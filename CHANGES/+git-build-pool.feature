@@ -0,0 +1 @@
+Collection syncs clone and build the collections of git_url entries on a pool of ANSIBLE_SYNC_GIT_BUILD_WORKERS processes instead of on the event loop.
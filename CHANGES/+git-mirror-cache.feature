@@ -0,0 +1 @@
+Added the `ANSIBLE_GIT_CACHE_DIR` setting. With it, git-based collection syncs keep a bare mirror of each git repository on the worker and check refs out from it, so resyncs fetch only new commits instead of cloning again.
@@ -0,0 +1 @@
+Role syncs fetch a bounded number of Galaxy pages at once, skip role versions already in the repository, and reuse role tarballs Pulp has already downloaded.
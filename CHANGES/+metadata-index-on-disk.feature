@@ -0,0 +1 @@
+Added the `ANSIBLE_SYNC_METADATA_INDEX_ON_DISK` setting to keep the metadata index of collection syncs in a temporary SQLite database instead of in memory.
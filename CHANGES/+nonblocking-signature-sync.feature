@@ -0,0 +1 @@
+Syncing signed or marked collection versions no longer makes the metadata parsing wait for each collection version to be downloaded and saved.
@@ -0,0 +1 @@
+Paginated collection and version listings are now fetched concurrently once the first page reports the total count.
@@ -0,0 +1,2 @@
+Read the metadata of newly synced collection tarballs on a thread pool in a dedicated sync stage, so decompression overlaps with downloads and database writes.
+The number of threads is configurable with the `ANSIBLE_SYNC_EXTRACTION_WORKERS` setting.
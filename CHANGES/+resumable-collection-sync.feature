@@ -0,0 +1 @@
+Added the `ANSIBLE_SYNC_CHECKPOINTS` setting. With it, optimized collection syncs that fetch the metadata of each collection version on its own checkpoint the content they have saved, and a retried sync from the same remote skips fetching the metadata of that content again.
@@ -0,0 +1 @@
+Collection imports and uploads read the tarball from storage once, and only decompress the start of it to read MANIFEST.json and FILES.json.
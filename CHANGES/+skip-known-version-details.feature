@@ -0,0 +1,2 @@
+Optimized syncs that page through the remote no longer fetch the detail metadata of collection versions that are already present in the repository, unless the remote reports a different number of signatures for them.
+The v3 collection versions listing now reports the `signatures_count` of every version.
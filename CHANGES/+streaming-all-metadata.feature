@@ -0,0 +1 @@
+Parse the unpaginated `collection_versions/all/` sync metadata incrementally, so the memory used by a sync no longer grows with the size of the remote and content is emitted while parsing continues.
@@ -0,0 +1 @@
+Added a `dry_run` option to collection syncs, reporting the collection versions a sync would add and remove and the size of the artifacts it would download.
@@ -0,0 +1,2 @@
+Collection sync now processes metadata requests on a bounded work queue instead of fixed chunks, starting new requests (including dependency lookups) as soon as a slot frees up.
+The limit is the remote's `download_concurrency`, and the numbers of queued and in-flight requests are shown on the metadata parsing progress report.
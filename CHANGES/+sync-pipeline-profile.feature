@@ -0,0 +1 @@
+Added the `ANSIBLE_SYNC_PIPELINE_PROFILE` setting to report per-stage item counts, batch sizes, wait and database times of collection syncs.
@@ -1,2 +1,5 @@
 # default results per page. used to calculate number of pages
 PAGE_SIZE = 100
+
+# maximum number of collections in a request to the bulk collection versions endpoint
+BULK_VERSIONS_REQUEST_SIZE = 1000
@@ -1,12 +1,26 @@
 import asyncio
+import hashlib
 import json
+import os
+import shutil
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
 from gettext import gettext as _
 from logging import getLogger
+from pathlib import Path
+from urllib.parse import urlparse
 
 from aiohttp import BasicAuth
 from aiohttp.client_exceptions import ClientResponseError
+from django.conf import settings
 
-from pulpcore.plugin.download import DownloaderFactory, FileDownloader, HttpDownloader
+from pulpcore.plugin.download import (
+    DownloaderFactory,
+    DownloadResult,
+    FileDownloader,
+    HttpDownloader,
+)
 
 log = getLogger(__name__)
 
@@ -24,23 +38,324 @@ class AnsibleFileDownloader(FileDownloader):
 
     def __init__(self, *args, **kwargs):
         kwargs.pop("silence_errors_for_response_status_codes", None)
+        kwargs.pop("metadata_cache", None)
+        kwargs.pop("post_data", None)
+        kwargs.pop("rate_limiter", None)
+        kwargs.pop("in_memory", None)
         super().__init__(*args, **kwargs)
 
 
-AUTH_TOKEN = None
-TOKEN_LOCK = asyncio.Lock()
+class MetadataCache:
+    """
+    On-disk cache of the metadata responses of a remote.
+
+    Responses carrying an `ETag` or `Last-Modified` header are kept together with those
+    validators, so later requests for the same url can be made conditional. When the server
+    answers `304 Not Modified` a copy of the cached body is returned instead. The least recently
+    used entries are evicted by :meth:`prune`.
+
+    Args:
+        path (str): The directory holding the cache entries.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def for_remote(cls, remote):
+        """
+        Return the metadata cache of a remote, or None if caching is disabled.
+        """
+        if not settings.ANSIBLE_SYNC_METADATA_CACHE_DIR:
+            return None
+        return cls(Path(settings.ANSIBLE_SYNC_METADATA_CACHE_DIR) / str(remote.pk))
+
+    def _entry(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.path / f"{key}.json", self.path / f"{key}.body"
+
+    def _load(self, url):
+        info_path, body_path = self._entry(url)
+        try:
+            with open(info_path) as fd:
+                info = json.load(fd)
+        except (OSError, ValueError):
+            return None, body_path
+        if info.get("url") != url or not body_path.exists():
+            return None, body_path
+        return info, body_path
+
+    def conditional_headers(self, url):
+        """
+        Return the headers making a request for `url` conditional on the cached response.
+        """
+        info, _body_path = self._load(url)
+        headers = {}
+        if info:
+            if info.get("etag"):
+                headers["If-None-Match"] = info["etag"]
+            if info.get("last_modified"):
+                headers["If-Modified-Since"] = info["last_modified"]
+        return headers
+
+    def get(self, url):
+        """
+        Return a DownloadResult for the cached response of `url`, or None if there is none.
+
+        The result points to a copy of the cached body in the current working directory, which
+        the caller owns.
+        """
+        info, body_path = self._load(url)
+        if info is None:
+            return None
+        try:
+            with (
+                open(body_path, "rb") as src,
+                tempfile.NamedTemporaryFile(dir=".", delete=False) as copy,
+            ):
+                shutil.copyfileobj(src, copy)
+            # The modification time of the body tracks when an entry was last used
+            os.utime(body_path)
+        except OSError:
+            return None
+        return DownloadResult(
+            path=copy.name,
+            artifact_attributes={"size": os.path.getsize(copy.name)},
+            url=url,
+            headers=info["headers"],
+        )
+
+    def prune(self, max_size):
+        """
+        Evict the least recently used entries until the cache takes at most `max_size` bytes.
+        """
+        entries = []
+        for body_path in self.path.glob("*.body"):
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+        size = sum(entry_size for _mtime, entry_size, _path in entries)
+        for _mtime, entry_size, body_path in sorted(entries):
+            if size <= max_size:
+                break
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            size -= entry_size
+
+    def clear(self):
+        """
+        Delete all entries of the cache.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def put(self, url, download_result):
+        """
+        Store a downloaded response if it carries validators to revalidate it with.
+        """
+        headers = download_result.headers or {}
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified) or "no-store" in headers.get("Cache-Control", ""):
+            return
+        info = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {"Content-Type": headers.get("Content-Type", "application/json")},
+        }
+        info_path, body_path = self._entry(url)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Replace both files atomically so concurrent syncs never read a partial entry.
+        with tempfile.NamedTemporaryFile(dir=self.path, delete=False) as body:
+            with open(download_result.path, "rb") as src:
+                shutil.copyfileobj(src, body)
+        os.replace(body.name, body_path)
+        with tempfile.NamedTemporaryFile("w", dir=self.path, delete=False) as fd:
+            json.dump(info, fd)
+        os.replace(fd.name, info_path)
+
+
+def parse_retry_after(value):
+    """
+    Return the seconds to wait according to a `Retry-After` header value, or None.
+
+    The value is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Limits the concurrent requests to one host and adapts the limit to how the host responds.
+
+    The limit grows by one for every `limit` successful requests and is halved, at most once per
+    second, when the host answers `429 Too Many Requests` or `503 Service Unavailable` (AIMD). A
+    `Retry-After` header on such an answer holds back all requests to the host until it has
+    passed.
+
+    Use it as an async context manager around each request.
+
+    Args:
+        initial (int): The initial concurrency limit.
+        maximum (int): The maximum concurrency limit.
+        max_retry_after (float): The longest `Retry-After` delay in seconds that is honored.
+    """
+
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, initial, maximum, max_retry_after=600):
+        self.maximum = maximum
+        self.limit = float(max(1, min(initial, maximum)))
+        self.max_retry_after = max_retry_after
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = None
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        async with self._condition:
+            while True:
+                delay = self.blocked_until - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.in_flight >= int(self.limit):
+                    await self._condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            if exc is None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif isinstance(exc, ClientResponseError) and exc.status in self.THROTTLE_STATUSES:
+                self._throttled(exc.headers and exc.headers.get("Retry-After"))
+            self._condition.notify_all()
+
+    def _throttled(self, retry_after):
+        now = asyncio.get_running_loop().time()
+        if self._last_decrease is None or now - self._last_decrease >= 1:
+            self._last_decrease = now
+            self.limit = max(1.0, self.limit / 2)
+            log.info(
+                _("Host is throttling requests, lowering the concurrency to {limit}").format(
+                    limit=int(self.limit)
+                )
+            )
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            self.blocked_until = max(self.blocked_until, now + min(delay, self.max_retry_after))
+
+
+class BearerTokenCache:
+    """
+    Bearer tokens obtained with refresh tokens, shared by all downloaders in a worker.
+
+    Tokens are kept per `(auth_url, refresh_token)` pair. A token counts as stale shortly before
+    the expiry announced by the auth server, so it is refreshed before requests start failing
+    with 401. Concurrent requests for a stale token share a single refresh.
+    """
+
+    # Refresh this many seconds before expiry at most, and 10% of the token lifetime at least
+    REFRESH_MARGIN = 60
+
+    def __init__(self):
+        self._tokens = {}
+        self._locks = {}
+
+    def get(self, key):
+        """
+        Return the cached token for `key`, or None if there is none or it is about to expire.
+        """
+        token, refresh_at = self._tokens.get(key, (None, None))
+        if refresh_at is not None and time.monotonic() >= refresh_at:
+            return None
+        return token
+
+    def invalidate(self, key, token):
+        """
+        Forget `token`, unless it was already replaced by a newer one.
+        """
+        if self._tokens.get(key, (None, None))[0] == token:
+            del self._tokens[key]
+
+    async def get_or_refresh(self, key, refresh):
+        """
+        Return the cached token for `key`, refreshing it first if needed.
+
+        Args:
+            key (tuple): The `(auth_url, refresh_token)` the token is obtained with.
+            refresh (callable): A coroutine function returning the new token and the seconds it
+                expires in, or None if the auth server did not say.
+        """
+        token = self.get(key)
+        if token:
+            return token
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            token = self.get(key)
+            if token:
+                return token
+            token, expires_in = await refresh()
+            refresh_at = None
+            if expires_in:
+                margin = min(self.REFRESH_MARGIN, expires_in / 10)
+                refresh_at = time.monotonic() + expires_in - margin
+            self._tokens[key] = (token, refresh_at)
+            return token
+
+
+TOKEN_CACHE = BearerTokenCache()
 
 
 class TokenAuthHttpDownloader(HttpDownloader):
     """
     Custom Downloader that automatically handles Token Based and Basic Authentication.
+
+    If a `metadata_cache` is given, requests are made conditional on its cached response and a
+    `304 Not Modified` answer returns the cached body. If `post_data` is given, it is POSTed as
+    JSON instead of making a GET request. If a `rate_limiter` is given, every request is made
+    through that `AdaptiveRateLimiter`. If `in_memory` is set, the response body is kept in
+    `body` instead of being written to a file, and the DownloadResult has no path.
     """
 
     def __init__(
-        self, url, auth_url, token, silence_errors_for_response_status_codes=None, **kwargs
+        self,
+        url,
+        auth_url,
+        token,
+        silence_errors_for_response_status_codes=None,
+        metadata_cache=None,
+        post_data=None,
+        rate_limiter=None,
+        in_memory=False,
+        **kwargs,
     ):
         self.ansible_auth_url = auth_url
+        self.rate_limiter = rate_limiter
+        self.in_memory = in_memory
+        self.body = None
         self.token = token
+        # Responses to POST requests depend on the data sent, so only GET requests are cached
+        self.metadata_cache = metadata_cache if post_data is None else None
+        self.post_data = post_data
         if silence_errors_for_response_status_codes is None:
             silence_errors_for_response_status_codes = set()
         self.silence_errors_for_response_status_codes = silence_errors_for_response_status_codes
@@ -74,39 +389,92 @@ class TokenAuthHttpDownloader(HttpDownloader):
         :meth:`~pulpcore.plugin.download.BaseDownloader._run`.
 
         """
+        if self.rate_limiter is None:
+            return await self._run_request(extra_data)
+        async with self.rate_limiter:
+            return await self._run_request(extra_data)
+
+    async def _run_request(self, extra_data=None):
+        """
+        Make the request with the authentication the remote is configured for.
+        """
+        headers = {}
+        if self.metadata_cache:
+            headers = self.metadata_cache.conditional_headers(self.url)
         if not self.token and not self.ansible_auth_url:
-            return await super()._run(extra_data=extra_data)
+            if not headers and self.post_data is None and not self.in_memory:
+                return await super()._run(extra_data=extra_data)
+            return await self._run_with_additional_headers(headers)
         elif self.token and not self.ansible_auth_url:
             # https://www.django-rest-framework.org/api-guide/authentication/#tokenauthentication
-            headers = {"Authorization": "Token {token}".format(token=self.token)}
+            headers["Authorization"] = "Token {token}".format(token=self.token)
             return await self._run_with_additional_headers(headers)
         else:
-            return await self._run_with_token_refresh_and_401_retry()
+            return await self._run_with_token_refresh_and_401_retry(headers)
+
+    async def _handle_response(self, response):
+        """
+        Handle the response of a successful request.
+
+        With `in_memory` the body is only read into `body`. Otherwise, with a metadata cache, the
+        cached body is returned on `304 Not Modified`, and any other response is cached.
 
-    async def _run_with_token_refresh_and_401_retry(self):
+        Raises:
+            aiohttp.ClientResponseError: If the server answered 304 but the cached body is gone.
+                The retry is then made unconditionally.
+
+        """
+        if self.in_memory:
+            self.body = await response.read()
+            return DownloadResult(
+                path=None,
+                artifact_attributes={"size": len(self.body)},
+                url=self.url,
+                headers=response.headers,
+            )
+        if self.metadata_cache is None:
+            return await super()._handle_response(response)
+        if response.status == 304:
+            cached = self.metadata_cache.get(self.url)
+            if cached is None:
+                raise ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=_("Cached metadata for {url} is gone").format(url=self.url),
+                )
+            return cached
+        result = await super()._handle_response(response)
+        await asyncio.to_thread(self.metadata_cache.put, self.url, result)
+        return result
+
+    async def _run_with_token_refresh_and_401_retry(self, headers=None):
         """
-        Fetch the response and refresh the Keycloak token if needed when doing so.
+        Fetch the response with a Bearer token, refreshing the token if needed.
 
-        If the fetching of data returns a 401 exception, invalidate the token and try to refresh it
-        once again.
+        Tokens are refreshed ahead of their expiry. If the fetching of data still returns a 401
+        exception, the token is invalidated and the request is retried once with a new token.
+
+        Args:
+            headers: Additional headers to submit along with the bearer token.
 
         Returns:
             DownloadResult: Contains information about the result. See the DownloadResult docs for
                  more information.
         """
-        while True:
+        for attempt in range(2):
             token = await self.get_or_update_token()
             # Keycloak Token
-            headers = {"Authorization": "Bearer {token}".format(token=token)}
+            request_headers = dict(headers or {})
+            request_headers["Authorization"] = "Bearer {token}".format(token=token)
             try:
-                return await self._run_with_additional_headers(headers)
+                return await self._run_with_additional_headers(request_headers)
             except ClientResponseError as exc:
-                if exc.status == 401:
-                    global AUTH_TOKEN
-                    AUTH_TOKEN = None  # The token expired so let's forget it so it will refresh
+                if exc.status == 401 and not attempt:
+                    # The token was revoked or expired early, so let's forget it so it will refresh
+                    TOKEN_CACHE.invalidate(self._token_key, token)
                     continue
-                else:
-                    raise
+                raise
 
     async def _run_with_additional_headers(self, headers):
         """
@@ -121,8 +489,18 @@ class TokenAuthHttpDownloader(HttpDownloader):
         """
         if self.download_throttler:
             await self.download_throttler.acquire()
-        async with self.session.get(
-            self.url, headers=headers, proxy=self.proxy, proxy_auth=self.proxy_auth, auth=self.auth
+        request_kwargs = {}
+        method = self.session.get
+        if self.post_data is not None:
+            method = self.session.post
+            request_kwargs["json"] = self.post_data
+        async with method(
+            self.url,
+            headers=headers,
+            proxy=self.proxy,
+            proxy_auth=self.proxy_auth,
+            auth=self.auth,
+            **request_kwargs,
         ) as response:
             self.raise_for_status(response)
             to_return = await self._handle_response(response)
@@ -132,37 +510,41 @@ class TokenAuthHttpDownloader(HttpDownloader):
             self.session.close()
         return to_return
 
+    @property
+    def _token_key(self):
+        return (self.ansible_auth_url, self.token)
+
     async def get_or_update_token(self):
         """
         Use an existing, or refresh, the Bearer token to be used with all requests.
         """
-        global AUTH_TOKEN
-        global TOKEN_LOCK
-
-        if AUTH_TOKEN:
-            return AUTH_TOKEN
-        async with TOKEN_LOCK:
-            if AUTH_TOKEN:
-                return AUTH_TOKEN
-            log.info(_("Updating bearer token"))
-            form_payload = {
-                "grant_type": "refresh_token",
-                "client_id": "cloud-services",
-                "refresh_token": self.token,
-            }
-            url = self.ansible_auth_url
-            async with self.session.post(
-                url,
-                data=form_payload,
-                proxy=self.proxy,
-                proxy_auth=self.proxy_auth,
-                auth=self.auth,
-                raise_for_status=True,
-            ) as response:
-                token_data = await response.text()
+        return await TOKEN_CACHE.get_or_refresh(self._token_key, self._refresh_token)
 
-            AUTH_TOKEN = json.loads(token_data)["access_token"]
-            return AUTH_TOKEN
+    async def _refresh_token(self):
+        """
+        Obtain a new Bearer token from the auth url with the refresh token.
+
+        Returns:
+            A tuple of the access token and the seconds it expires in, or None if unknown.
+        """
+        log.info(_("Updating bearer token"))
+        form_payload = {
+            "grant_type": "refresh_token",
+            "client_id": "cloud-services",
+            "refresh_token": self.token,
+        }
+        url = self.ansible_auth_url
+        async with self.session.post(
+            url,
+            data=form_payload,
+            proxy=self.proxy,
+            proxy_auth=self.proxy_auth,
+            auth=self.auth,
+            raise_for_status=True,
+        ) as response:
+            token_data = json.loads(await response.text())
+
+        return token_data["access_token"], token_data.get("expires_in")
 
 
 class AnsibleDownloaderFactory(DownloaderFactory):
@@ -185,6 +567,23 @@ class AnsibleDownloaderFactory(DownloaderFactory):
                 "file": AnsibleFileDownloader,
             }
         super().__init__(remote, downloader_overrides)
+        self._rate_limiters = {}
+
+    def _rate_limiter(self, url):
+        """
+        Return the AdaptiveRateLimiter shared by all downloads from the host of `url`.
+
+        Returns None if adaptive rate limiting is disabled.
+        """
+        if not settings.ANSIBLE_SYNC_HOST_CONCURRENCY:
+            return None
+        host = urlparse(url).netloc
+        if host not in self._rate_limiters:
+            maximum = self._remote.download_concurrency or self._remote.DEFAULT_DOWNLOAD_CONCURRENCY
+            self._rate_limiters[host] = AdaptiveRateLimiter(
+                initial=settings.ANSIBLE_SYNC_HOST_CONCURRENCY, maximum=maximum
+            )
+        return self._rate_limiters[host]
 
     def _http_or_https(self, download_class, url, **kwargs):
         """
@@ -214,5 +613,6 @@ class AnsibleDownloaderFactory(DownloaderFactory):
             options["auth"] = BasicAuth(login=self._remote.username, password=self._remote.password)
 
         kwargs["throttler"] = self._remote.download_throttler if self._remote.rate_limit else None
+        kwargs.setdefault("rate_limiter", self._rate_limiter(url))
 
         return download_class(url, self._remote.auth_url, self._remote.token, **options, **kwargs)
@@ -1,4 +1,5 @@
 import typing as t
+from gettext import gettext as _
 
 from django.conf import settings
 from drf_spectacular.types import OpenApiTypes
@@ -12,6 +13,8 @@ from pulpcore.plugin.util import get_domain
 
 from pulp_ansible.app import fields, models
 from pulp_ansible.app import serializers as ansible_serializers
+from pulp_ansible.app.constants import BULK_VERSIONS_REQUEST_SIZE
+from pulp_ansible.app.utils import AnsibleSpec
 
 DOMAIN_ENABLED = settings.DOMAIN_ENABLED
 
@@ -109,6 +112,7 @@ class CollectionVersionListSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(source="pulp_created")
     updated_at = serializers.DateTimeField(source="pulp_last_updated")
     marks = serializers.SerializerMethodField()
+    signatures_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         fields = (
@@ -118,6 +122,7 @@ class CollectionVersionListSerializer(serializers.ModelSerializer):
             "updated_at",
             "requires_ansible",
             "marks",
+            "signatures_count",
         )
         model = models.CollectionVersion
 
@@ -235,6 +240,7 @@ class UnpaginatedCollectionVersionSerializer(CollectionVersionListSerializer):
     metadata = CollectionMetadataSerializer(source="*", read_only=True)
     namespace = CollectionNamespaceSerializer(source="*", read_only=True)
     signatures = CollectionVersionSignatureSerializer(many=True)
+    signatures_count = serializers.SerializerMethodField()
 
     class Meta:
         model = models.CollectionVersion
@@ -250,6 +256,10 @@ class UnpaginatedCollectionVersionSerializer(CollectionVersionListSerializer):
             "git_commit_sha",
         )
 
+    def get_signatures_count(self, obj) -> int:
+        """Get the number of signatures in the current repo."""
+        return len(obj.signatures.all())
+
     @extend_schema_field(ArtifactRefSerializer)
     def get_artifact(self, obj):
         """
@@ -320,6 +330,98 @@ class CollectionVersionSerializer(UnpaginatedCollectionVersionSerializer):
         )
 
 
+class CollectionVersionBulkRequestSerializer(serializers.Serializer):
+    """
+    A serializer for requesting the metadata of many CollectionVersions at once.
+    """
+
+    collections = serializers.ListField(
+        child=serializers.CharField(),
+        min_length=1,
+        max_length=BULK_VERSIONS_REQUEST_SIZE,
+        help_text=_(
+            "The collections to return versions of, as 'namespace.name' optionally followed by "
+            "':' and a version range, e.g. 'pulp.squeezer:>=0.0.9,<0.1.0'."
+        ),
+    )
+
+    def validate_collections(self, value):
+        """
+        Parse every entry into a tuple of namespace, name and version spec.
+        """
+        requested = []
+        for entry in value:
+            fullname, _sep, version_range = entry.partition(":")
+            namespace, _sep, name = fullname.partition(".")
+            if not namespace or not name or "." in name:
+                raise serializers.ValidationError(
+                    _("'{entry}' is not of the form 'namespace.name[:version_range]'.").format(
+                        entry=entry
+                    )
+                )
+            try:
+                spec = AnsibleSpec(version_range or "*")
+            except ValueError:
+                raise serializers.ValidationError(
+                    _("'{version_range}' is not a valid version range.").format(
+                        version_range=version_range
+                    )
+                )
+            requested.append((namespace, name, spec))
+        return requested
+
+
+class CollectionVersionRemovedSerializer(serializers.Serializer):
+    """
+    A serializer for a CollectionVersion removed from a distribution.
+    """
+
+    namespace = serializers.CharField()
+    name = serializers.CharField()
+    version = serializers.CharField()
+
+
+class CollectionDeprecatedSerializer(serializers.Serializer):
+    """
+    A serializer for a deprecated Collection.
+    """
+
+    namespace = serializers.CharField()
+    name = serializers.CharField()
+
+
+class NamespaceMetadataRefSerializer(serializers.Serializer):
+    """
+    A serializer for a reference to AnsibleNamespaceMetadata.
+    """
+
+    name = serializers.CharField()
+    metadata_sha256 = serializers.CharField()
+
+
+class CollectionVersionChangesSerializer(serializers.Serializer):
+    """
+    A serializer for the changes to the content of a distribution since a cursor.
+    """
+
+    cursor = serializers.CharField(
+        help_text=_("Pass as 'since' to get the changes after the current content.")
+    )
+    published = serializers.DateTimeField()
+    full_sync_required = serializers.BooleanField(
+        help_text=_("Whether the changes since the given cursor cannot be listed.")
+    )
+    added = UnpaginatedCollectionVersionSerializer(
+        many=True,
+        help_text=_("CollectionVersions that were added, or whose signatures or marks were."),
+    )
+    removed = CollectionVersionRemovedSerializer(many=True)
+    namespaces = NamespaceMetadataRefSerializer(many=True)
+    deprecated = CollectionDeprecatedSerializer(
+        many=True, help_text=_("All collections currently deprecated.")
+    )
+
+
 class CollectionVersionDocsSerializer(serializers.ModelSerializer):
     """A serializer to display the docs_blob of a CollectionVersion."""
 
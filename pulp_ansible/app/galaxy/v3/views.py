@@ -1,5 +1,6 @@
 import base64
 import re
+from collections import defaultdict
 from datetime import datetime
 from gettext import gettext as _
 
@@ -7,7 +8,8 @@ import semantic_version
 from django.conf import settings
 from django.core.cache import cache
 from django.db import DatabaseError, IntegrityError
-from django.db.models import Exists, F, OuterRef, Prefetch, Subquery
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.db.utils import InternalError as DatabaseInternalError
 from django.http import HttpResponseNotFound, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
@@ -28,6 +30,7 @@ from pulpcore.plugin.models import (
     Content,
     ContentArtifact,
     Distribution,
+    RepositoryVersion,
 )
 from pulpcore.plugin.serializers import AsyncOperationResponseSerializer
 from pulpcore.plugin.tasking import add_and_remove, dispatch, general_create
@@ -45,6 +48,8 @@ from pulp_ansible.app.galaxy.v3.pagination import LimitOffsetPagination
 from pulp_ansible.app.galaxy.v3.serializers import (
     ClientConfigurationSerializer,
     CollectionSerializer,
+    CollectionVersionBulkRequestSerializer,
+    CollectionVersionChangesSerializer,
     CollectionVersionDocsSerializer,
     CollectionVersionListSerializer,
     CollectionVersionSerializer,
@@ -964,6 +969,17 @@ class CollectionVersionViewSet(
             "requires_ansible",
             "collection",
         )
+        signatures_count_qs = (
+            filter_content_for_repo_version(
+                CollectionVersionSignature.objects, self._repository_version
+            )
+            .filter(signed_collection=OuterRef("pk"))
+            .order_by()
+            .values("signed_collection")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        queryset = queryset.annotate(signatures_count=Coalesce(Subquery(signatures_count_qs), 0))
 
         queryset = self.filter_queryset(queryset)
 
@@ -1105,6 +1121,239 @@ class UnpaginatedCollectionVersionViewSet(CollectionVersionViewSet):
         return StreamingHttpResponse(streamed)
 
 
+def with_collection_version_metadata(queryset, repo_version):
+    """
+    Prepare a CollectionVersion queryset for serializing the full metadata of every version.
+
+    Signatures, marks and the namespace metadata are those of `repo_version`.
+    """
+    return (
+        queryset.annotate(
+            namespace_sha256=Subquery(
+                filter_content_for_repo_version(AnsibleNamespaceMetadata.objects, repo_version)
+                .filter(name=OuterRef("namespace"))
+                .values("metadata_sha256"),
+            )
+        )
+        .prefetch_related(
+            Prefetch(
+                "marks",
+                queryset=filter_content_for_repo_version(
+                    CollectionVersionMark.objects, repo_version
+                ),
+            ),
+            Prefetch(
+                "signatures",
+                queryset=filter_content_for_repo_version(
+                    CollectionVersionSignature.objects, repo_version
+                ),
+            ),
+            Prefetch(
+                "contentartifact_set",
+                queryset=ContentArtifact.objects.select_related("artifact"),
+                to_attr="artifacts",
+            ),
+        )
+        .select_related("collection")
+        .order_by("namespace", "name", "pulp_created")
+    )
+
+
+class CollectionVersionBulkViewSet(
+    GalaxyAuthMixin,
+    ExceptionHandlerMixin,
+    AnsibleDistributionMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    ViewSet returning the metadata of the CollectionVersions of many collections in one request.
+    """
+
+    serializer_class = UnpaginatedCollectionVersionSerializer
+
+    DEFAULT_ACCESS_POLICY = {
+        "statements": [
+            {
+                "action": ["bulk"],
+                "principal": "authenticated",
+                "effect": "allow",
+                "condition": "v3_can_view_repo_content",
+            },
+        ],
+    }
+
+    def urlpattern(*args, **kwargs):
+        """Return url pattern for RBAC."""
+        return "pulp_ansible/v3/collection-versions/bulk"
+
+    def get_queryset(self):
+        """
+        Returns a CollectionVersions queryset for specified distribution.
+        """
+        if getattr(self, "swagger_fake_view", False):
+            return CollectionVersion.objects.none()
+
+        return filter_content_for_repo_version(CollectionVersion.objects, self._repository_version)
+
+    @extend_schema(
+        request=CollectionVersionBulkRequestSerializer,
+        responses={200: UnpaginatedCollectionVersionSerializer(many=True)},
+    )
+    def bulk(self, request, *args, **kwargs):
+        """
+        Returns the CollectionVersions matching a list of collections and version ranges.
+        """
+        request_serializer = CollectionVersionBulkRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+
+        specs = defaultdict(list)
+        for namespace, name, spec in request_serializer.validated_data["collections"]:
+            specs[(namespace, name)].append(spec)
+
+        query = Q()
+        for namespace, name in specs:
+            query |= Q(namespace=namespace, name=name)
+        queryset = self.get_queryset()
+        matched = [
+            pk
+            for pk, namespace, name, version in queryset.filter(query).values_list(
+                "pk", "namespace", "name", "version"
+            )
+            if any(semantic_version.Version(version) in spec for spec in specs[(namespace, name)])
+        ]
+
+        queryset = with_collection_version_metadata(
+            queryset.filter(pk__in=matched), self._repository_version
+        )
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class LegacyCollectionVersionBulkViewSet(CollectionVersionBulkViewSet):
+    """
+    Bulk CollectionVersion endpoint under the legacy v3 root.
+
+    Clients don't follow redirects of POST requests, so this view serves the request itself.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """Look up the distribution from the legacy path kwarg."""
+        path = self.kwargs.pop("path", settings.ANSIBLE_DEFAULT_DISTRIBUTION_PATH)
+        if path is None:
+            raise NotFound()
+        self.kwargs["distro_base_path"] = path
+        super().initial(request, *args, **kwargs)
+
+
+class CollectionVersionChangesViewSet(
+    GalaxyAuthMixin,
+    ExceptionHandlerMixin,
+    AnsibleDistributionMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    ViewSet for the changes to the CollectionVersions of a distribution since a cursor.
+
+    The cursor identifies a repository version. Downstream syncs pass the cursor of their last
+    sync to receive only the versions added and removed since then.
+    """
+
+    serializer_class = CollectionVersionChangesSerializer
+
+    DEFAULT_ACCESS_POLICY = _PERMISSIVE_ACCESS_POLICY
+
+    def urlpattern(*args, **kwargs):
+        """Return url pattern for RBAC."""
+        return "pulp_ansible/v3/collection-versions/changes"
+
+    def get_queryset(self):
+        """
+        Returns a CollectionVersions queryset for specified distribution.
+        """
+        if getattr(self, "swagger_fake_view", False):
+            return CollectionVersion.objects.none()
+
+        return filter_content_for_repo_version(CollectionVersion.objects, self._repository_version)
+
+    @staticmethod
+    def _base_version(since, repo_version):
+        """
+        Returns the repository version identified by the `since` cursor, if changes can be listed.
+        """
+        repository_pk, _sep, number = (since or "").partition(":")
+        if str(repo_version.repository_id) != repository_pk or not number.isdigit():
+            return None
+        if int(number) > repo_version.number:
+            return None
+        return RepositoryVersion.objects.filter(
+            repository_id=repo_version.repository_id, number=int(number), complete=True
+        ).first()
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "since",
+                str,
+                description=_("The cursor returned by an earlier request."),
+            )
+        ],
+        responses={200: CollectionVersionChangesSerializer},
+    )
+    def list(self, request, *args, **kwargs):
+        """
+        Returns the CollectionVersions added and removed since the `since` cursor.
+        """
+        repo_version = self._repository_version
+        changes = {
+            "cursor": f"{repo_version.repository_id}:{repo_version.number}",
+            "published": repo_version.pulp_created,
+            "full_sync_required": True,
+            "added": [],
+            "removed": [],
+            "namespaces": [],
+            "deprecated": [],
+        }
+
+        base_version = self._base_version(request.query_params.get("since"), repo_version)
+        if base_version is not None:
+            added = repo_version.added(base_version=base_version).values("pk")
+            removed = repo_version.removed(base_version=base_version).values("pk")
+            queryset = self.get_queryset()
+
+            # Signatures and marks removed from versions that are still present can't be told
+            # apart from the ones that were never there, so they require a full sync.
+            if not queryset.filter(
+                Q(signatures__pk__in=removed) | Q(marks__pk__in=removed)
+            ).exists():
+                changed = queryset.filter(
+                    Q(pk__in=added)
+                    | Q(
+                        pk__in=CollectionVersionSignature.objects.filter(pk__in=added).values(
+                            "signed_collection"
+                        )
+                    )
+                    | Q(
+                        pk__in=CollectionVersionMark.objects.filter(pk__in=added).values(
+                            "marked_collection"
+                        )
+                    )
+                )
+                changes["full_sync_required"] = False
+                changes["added"] = with_collection_version_metadata(changed, repo_version)
+                changes["removed"] = CollectionVersion.objects.filter(pk__in=removed).values(
+                    "namespace", "name", "version"
+                )
+                changes["namespaces"] = AnsibleNamespaceMetadata.objects.filter(
+                    pk__in=added
+                ).values("name", "metadata_sha256")
+                changes["deprecated"] = filter_content_for_repo_version(
+                    AnsibleCollectionDeprecated.objects, repo_version
+                ).values("namespace", "name")
+
+        serializer = self.get_serializer(changes)
+        return Response(serializer.data)
+
+
 class CollectionVersionDocsViewSet(
     GalaxyAuthMixin,
     CollectionVersionRetrieveMixin,
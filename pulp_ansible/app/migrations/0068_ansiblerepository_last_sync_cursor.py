@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ansible", "0067_collectionsynccheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ansiblerepository",
+            name="last_sync_cursor",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name="ansiblerepository",
+            name="last_sync_version",
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
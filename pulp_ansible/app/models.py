@@ -11,6 +11,7 @@ from django_lifecycle import (
     AFTER_CREATE,
     AFTER_DELETE,
     AFTER_UPDATE,
+    BEFORE_DELETE,
     BEFORE_SAVE,
     BEFORE_UPDATE,
     hook,
@@ -33,7 +34,7 @@ from pulpcore.plugin.models import (
 from pulpcore.plugin.repo_version_utils import remove_duplicates, validate_repo_version
 from pulpcore.plugin.util import get_domain_pk
 
-from .downloaders import AnsibleDownloaderFactory
+from .downloaders import AnsibleDownloaderFactory, MetadataCache
 from .utils import get_collection_deferred_fields
 
 log = getLogger(__name__)
@@ -459,6 +460,14 @@ class CollectionRemote(Remote, AutoAddObjPermsMixin):
         AnsibleRepository.objects.filter(
             remote_id=self.pk, last_synced_metadata_time__isnull=False
         ).update(last_synced_metadata_time=None)
+        AnsibleRepository.objects.filter(remote_id=self.pk, last_sync_cursor__isnull=False).update(
+            last_sync_cursor=None, last_sync_version=None
+        )
+
+    @hook(BEFORE_DELETE)
+    def _clear_metadata_cache(self):
+        if metadata_cache := MetadataCache.for_remote(self):
+            metadata_cache.clear()
 
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
@@ -505,6 +514,9 @@ class AnsibleRepository(Repository, AutoAddObjPermsMixin):
     Fields:
 
         last_synced_metadata_time (models.DateTimeField): Last synced metadata time.
+        last_sync_cursor (models.TextField): The remote's changes feed cursor at the last sync.
+        last_sync_version (models.PositiveIntegerField): The number of the latest repository
+            version when the last sync finished.
         private (models.BooleanField): Indicator if this repository is private
     """
 
@@ -520,6 +532,8 @@ class AnsibleRepository(Repository, AutoAddObjPermsMixin):
     REMOTE_TYPES = [RoleRemote, CollectionRemote, GitRemote]
 
     last_synced_metadata_time = models.DateTimeField(null=True)
+    last_sync_cursor = models.TextField(null=True)
+    last_sync_version = models.PositiveIntegerField(null=True)
     gpgkey = models.TextField(null=True)
     private = models.BooleanField(default=False)
 
@@ -586,6 +600,8 @@ class AnsibleRepository(Repository, AutoAddObjPermsMixin):
     @hook(BEFORE_UPDATE, when="remote", has_changed=True)
     def _reset_repository_last_synced_metadata_time(self):
         self.last_synced_metadata_time = None
+        self.last_sync_cursor = None
+        self.last_sync_version = None
 
 
 class AnsibleDistribution(Distribution, AutoAddObjPermsMixin):
@@ -627,3 +643,20 @@ class CrossRepositoryCollectionVersionIndex(models.Model):
     class Meta:
         default_related_name = "%(app_label)s_%(model_name)s"
         unique_together = ("repository", "repository_version", "collection_version")
+
+
+class CollectionSyncCheckpoint(models.Model):
+    """
+    Content saved by an unfinished collection sync of a repository from a remote.
+
+    A retried sync treats this content like the content of the repository, so it does not fetch
+    its metadata again. The checkpoint is cleared once a sync finishes.
+    """
+
+    repository = models.ForeignKey(AnsibleRepository, on_delete=models.CASCADE)
+    remote = models.ForeignKey(CollectionRemote, on_delete=models.CASCADE)
+    content = models.ForeignKey(Content, on_delete=models.CASCADE)
+
+    class Meta:
+        default_related_name = "%(app_label)s_%(model_name)s"
+        unique_together = ("repository", "remote", "content")
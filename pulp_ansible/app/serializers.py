@@ -1,4 +1,5 @@
 import json
+import os
 import typing as t
 from gettext import gettext as _
 
@@ -35,6 +36,7 @@ from pulp_ansible.app.schema import COPY_CONFIG_SCHEMA
 from pulp_ansible.app.tasks.signature import verify_signature_upload
 from pulp_ansible.app.tasks.upload import process_collection_artifact
 from pulp_ansible.app.tasks.utils import (
+    is_allowed_import_path,
     parse_collection_filename,
     parse_collections_requirements_file,
 )
@@ -185,11 +187,34 @@ class AnsibleRepositorySyncURLSerializer(RepositorySyncURLSerializer):
     optimize = serializers.BooleanField(
         help_text=_("Whether to optimize sync or not."), default=True
     )
+    dry_run = serializers.BooleanField(
+        help_text=_(
+            "If `True`, only report the collection versions the sync would add and remove, and "
+            "the size of the artifacts it would download, as the result of the task. No "
+            "artifacts are downloaded and no repository version is created. Only supported with "
+            "collection remotes."
+        ),
+        default=False,
+    )
 
     class Meta:
-        fields = RepositorySerializer.Meta.fields + ("optimize",)
+        fields = RepositorySerializer.Meta.fields + ("optimize", "dry_run")
         model = AnsibleRepository
 
+    def validate(self, data):
+        """
+        Validate that dry runs are only requested for collection remotes.
+        """
+        data = super().validate(data)
+        if data["dry_run"]:
+            repository = AnsibleRepository.objects.get(pk=self.context["repository_pk"])
+            remote = data.get("remote") or repository.remote
+            if not isinstance(remote.cast(), CollectionRemote):
+                raise serializers.ValidationError(
+                    {"dry_run": _("Dry runs are only supported when syncing collections.")}
+                )
+        return data
+
 
 class AnsibleRepositoryRebuildSerializer(serializers.Serializer):
     """
@@ -210,6 +235,61 @@ class AnsibleRepositoryRebuildSerializer(serializers.Serializer):
     )
 
 
+class AnsibleRepositoryImportCollectionsSerializer(serializers.Serializer):
+    """
+    Serializer for importing many collection tarballs into an Ansible Repository at once.
+    """
+
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        help_text=_(
+            "Collection tarballs to import. A file may also be a tar archive of collection "
+            "tarballs."
+        ),
+        required=False,
+        default=list,
+    )
+    path = serializers.CharField(
+        help_text=_(
+            "A directory on the Pulp workers to import all `.tar.gz` files in. It has to be "
+            "within one of the ALLOWED_IMPORT_PATHS."
+        ),
+        required=False,
+        default=None,
+    )
+
+    def validate_path(self, value):
+        """
+        Check that the path is an absolute, normalized path within ALLOWED_IMPORT_PATHS.
+
+        Only administrators may import from the file system of the workers.
+        """
+        if value is None:
+            return value
+        request = self.context.get("request")
+        if request is None or not request.user.is_superuser:
+            raise serializers.ValidationError(
+                _("Only administrators can import collections from a path.")
+            )
+        if not os.path.isabs(value) or value.rstrip("/") != os.path.normpath(value):
+            raise serializers.ValidationError(
+                _("The path '{}' needs to be an absolute, normalized pathname.").format(value)
+            )
+        if not is_allowed_import_path(value):
+            raise serializers.ValidationError(
+                _("The path '{}' does not start with any of the allowed import paths").format(value)
+            )
+        return value
+
+    def validate(self, data):
+        """
+        Check that there is something to import.
+        """
+        if not data["files"] and not data["path"]:
+            raise serializers.ValidationError(_("Either 'files' or 'path' has to be specified."))
+        return data
+
+
 class CollectionRemoteSerializer(RemoteSerializer):
     """
     A serializer for Collection Remotes.
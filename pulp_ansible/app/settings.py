@@ -27,6 +27,17 @@ ANSIBLE_API_HOSTNAME = "https://" + socket.getfqdn()
 ANSIBLE_CONTENT_HOSTNAME = "@format {this.CONTENT_ORIGIN}/pulp/content"
 ANSIBLE_SIGNATURE_REQUIRE_VERIFICATION = True
 ANSIBLE_SIGNING_TASK_LIMITER = 10
+ANSIBLE_SYNC_EXTRACTION_WORKERS = 4
+ANSIBLE_SYNC_CHECKPOINTS = False
+ANSIBLE_SYNC_METADATA_CACHE_DIR = None
+ANSIBLE_SYNC_METADATA_CACHE_MAX_SIZE = 100 * 1024 * 1024
+ANSIBLE_SYNC_PIPELINE_PROFILE = False
+ANSIBLE_SYNC_HOST_CONCURRENCY = 0
+ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY = 10
+ANSIBLE_SYNC_METADATA_INDEX_ON_DISK = False
+ANSIBLE_SYNC_GIT_BUILD_WORKERS = 2
+ANSIBLE_GIT_CACHE_DIR = None
+ANSIBLE_COLLECTION_IMPORT_WORKERS = 4
 ANSIBLE_DEFAULT_DISTRIBUTION_PATH = None
 ANSIBLE_URL_NAMESPACE = ""
 ANSIBLE_COLLECT_DOWNLOAD_LOG = False
@@ -1,31 +1,36 @@
 import asyncio
+import concurrent.futures
 import functools
 import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import shutil
 import tarfile
 import tempfile
-from collections import defaultdict
-from collections.abc import Coroutine
+import zlib
+from asyncio import FIRST_COMPLETED
+from collections import defaultdict, deque
+from collections.abc import Coroutine, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from gettext import gettext as _
 from pathlib import Path
-from urllib.parse import urljoin
-from uuid import uuid4
+from urllib.parse import urlencode, urljoin, urlparse
 
 import yaml
 from aiohttp.client_exceptions import ClientError, ClientResponseError
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import connection, transaction
 from django.db.models import Q
 from django.db.utils import IntegrityError
 from django.utils.dateparse import parse_datetime
-from galaxy_importer.collection import CollectionFilename, sync_collection
+from galaxy_importer.collection import CollectionFilename
 from galaxy_importer.collection import import_collection as process_collection
 from galaxy_importer.exceptions import ImporterError
-from git import GitCommandError, Repo
 from rest_framework.serializers import ValidationError
-from semantic_version import SimpleSpec, Version
-from semantic_version.base import Always
+from semantic_version import Version
 
 from pulpcore.plugin.exceptions import DigestValidationError, SyncError
 from pulpcore.plugin.models import (
@@ -58,7 +63,8 @@ from pulpcore.plugin.stages import (
 )
 from pulpcore.plugin.util import get_domain, get_url
 
-from pulp_ansible.app.constants import PAGE_SIZE
+from pulp_ansible.app.constants import BULK_VERSIONS_REQUEST_SIZE, PAGE_SIZE
+from pulp_ansible.app.downloaders import MetadataCache
 from pulp_ansible.app.models import (
     AnsibleCollectionDeprecated,
     AnsibleNamespace,
@@ -67,18 +73,34 @@ from pulp_ansible.app.models import (
     Collection,
     CollectionImport,
     CollectionRemote,
+    CollectionSyncCheckpoint,
     CollectionVersion,
     CollectionVersionMark,
     CollectionVersionSignature,
 )
 from pulp_ansible.app.serializers import CollectionVersionSerializer
+from pulp_ansible.app.tasks.git_cache import build_collection_from_git
+from pulp_ansible.app.tasks.profiling import (
+    profile_stage,
+    record_queries,
+    report_pipeline_profile,
+)
 from pulp_ansible.app.tasks.utils import (
+    CollectionVersionMetadataIndex,
+    DiskCollectionVersionMetadataIndex,
+    DiskSyncedVersions,
+    LocalCollectionTarball,
     RequirementsFileEntry,
+    SyncedVersions,
+    SyncMetadataStore,
     get_file_obj_from_tarball,
+    is_allowed_import_path,
+    iter_metadata_items,
     parse_collections_requirements_file,
     parse_metadata,
+    read_manifest_and_files,
 )
-from pulp_ansible.app.utils import set_collection_deferred_fields
+from pulp_ansible.app.utils import AnsibleSpec, set_collection_deferred_fields
 from pulp_ansible.exceptions import (
     AvailableVersionsNotFoundError,
     CollectionNotFound,
@@ -117,15 +139,6 @@ def async_cache(f):
     return _wrapped_f
 
 
-# semantic_version.SimpleSpec interpretes "*" as every single available version.
-# This includes more than just ">=0.0.0" which rejects prereleases of "0.0.0".
-class AnsibleSpec(SimpleSpec):
-    def __init__(self, expression):
-        super().__init__(expression)
-        if self.expression == "*":
-            self.clause = Always()
-
-
 @sync_to_async
 def _save_collection_version(collection_version, artifact):
     with transaction.atomic():
@@ -137,22 +150,19 @@ def _save_collection_version(collection_version, artifact):
         )
 
 
-async def declarative_content_from_git_repo(remote, url, git_ref=None, metadata_only=False):
-    """Returns a DeclarativeContent for the Collection in a Git repository."""
-    if git_ref:
-        try:
-            gitrepo = Repo.clone_from(
-                url, str(uuid4()), depth=1, branch=git_ref, multi_options=["--recurse-submodules"]
-            )
-        except GitCommandError:
-            gitrepo = Repo.clone_from(url, str(uuid4()), multi_options=["--recurse-submodules"])
-            gitrepo.git.checkout(git_ref)
-    else:
-        gitrepo = Repo.clone_from(
-            url, str(uuid4()), depth=1, multi_options=["--recurse-submodules"]
-        )
-    commit_sha = gitrepo.head.commit.hexsha
-    metadata, artifact_path = sync_collection(gitrepo.working_dir, ".")
+async def declarative_content_from_git_repo(
+    remote, url, git_ref=None, metadata_only=False, executor=None
+):
+    """
+    Returns a DeclarativeContent for the Collection in a Git repository.
+
+    The repository is cloned and the collection is built on `executor`, or on the default thread
+    pool of the event loop if no executor is given.
+    """
+    loop = asyncio.get_running_loop()
+    commit_sha, metadata, artifact_path = await loop.run_in_executor(
+        executor, build_collection_from_git, url, git_ref, settings.ANSIBLE_GIT_CACHE_DIR
+    )
     artifact = Artifact.init_and_validate(artifact_path)
     if metadata_only:
         metadata["artifact"] = None
@@ -214,7 +224,7 @@ async def declarative_content_from_git_repo(remote, url, git_ref=None, metadata_
     return d_content
 
 
-def sync(remote_pk, repository_pk, mirror, optimize, **kwargs):
+def sync(remote_pk, repository_pk, mirror, optimize, dry_run=False, **kwargs):
     """
     Sync Collections with ``remote_pk``, and save a new RepositoryVersion for ``repository_pk``.
 
@@ -223,6 +233,7 @@ def sync(remote_pk, repository_pk, mirror, optimize, **kwargs):
         repository_pk (str): The repository PK.
         mirror (bool): True for mirror mode, False for additive.
         optimize (boolean): Whether to optimize sync or not.
+        dry_run (boolean): Only report what the sync would change, see `plan_sync`.
 
     Raises:
         ValueError: If the remote does not specify a URL to sync.
@@ -236,11 +247,24 @@ def sync(remote_pk, repository_pk, mirror, optimize, **kwargs):
     if not remote.url:
         raise SyncError(_("A remote must have a url specified to synchronize."))
 
-    first_stage = CollectionSyncFirstStage(remote, repository, is_repo_remote, optimize)
+    if dry_run:
+        return plan_sync(remote, repository, is_repo_remote, mirror)
+
+    first_stage = CollectionSyncFirstStage(
+        remote, repository, is_repo_remote, optimize, mirror=mirror
+    )
     if first_stage.should_sync:
         set_collection_deferred_fields(["docs_blob", "manifest", "files", "contents"])
-        d_version = AnsibleDeclarativeVersion(first_stage, repository, mirror=mirror)
+        # Changes are applied on top of the repository, mirrored removals included
+        d_version = AnsibleDeclarativeVersion(
+            first_stage, repository, mirror=mirror and first_stage.changes is None
+        )
         repository_version = d_version.create()
+        CollectionSyncCheckpoint.objects.filter(repository=repository, remote=remote).delete()
+
+        repository.last_sync_cursor = first_stage.sync_cursor
+        repository.last_sync_version = repository.latest_version().number
+        repository.save(update_fields=["last_sync_cursor", "last_sync_version"])
 
         if repository_version is not None:
             repository.last_synced_metadata_time = first_stage.last_synced_metadata_time
@@ -253,6 +277,84 @@ def sync(remote_pk, repository_pk, mirror, optimize, **kwargs):
         log.debug(_("no-op: remote wasn't updated since last sync."))
 
 
+def plan_sync(remote, repository, is_repo_remote, mirror):
+    """
+    Compute what a sync would change in a repository, without downloading any artifact.
+
+    The metadata of the remote is read, including dependency resolution, and the resulting
+    collection versions are compared to the latest version of the repository. No repository
+    version is created.
+
+    Args:
+        remote (CollectionRemote): The remote to sync from.
+        repository (AnsibleRepository): The repository to sync into.
+        is_repo_remote (bool): Whether the remote is the repository's remote.
+        mirror (bool): True for mirror mode, False for additive.
+
+    Returns:
+        dict: The collection versions that would be `added` and `removed`, with their counts. The
+            `artifact_size` of the added versions, and the `download_size` of the artifacts a sync
+            would download, which excludes the artifacts Pulp already has and on-demand syncs.
+            The collection versions a sync would clone and build from git are listed in
+            `would_fetch` instead of being built, their size is unknown.
+    """
+    # The changes feed and the checkpoints only describe part of the remote
+    first_stage = CollectionSyncFirstStage(
+        remote, repository, is_repo_remote, optimize=False, mirror=mirror, dry_run=True
+    )
+    plan_stage = SyncPlanStage()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(create_pipeline([first_stage, plan_stage, EndStage()]))
+
+    present = {}
+    for namespace, name, version, size in CollectionVersion.objects.filter(
+        pk__in=repository.latest_version().content
+    ).values_list("namespace", "name", "version", "contentartifact__artifact__size"):
+        present[(namespace, name, version)] = size
+
+    added = {key: plan_stage.versions[key] for key in plan_stage.versions.keys() - present.keys()}
+    removed = sorted(present.keys() - plan_stage.versions.keys()) if mirror else []
+
+    download_size = 0
+    if remote.policy == Remote.IMMEDIATE:
+        # Versions sharing an artifact only download it once
+        sizes = dict(added.values())
+        existing = set(
+            Artifact.objects.filter(sha256__in=sizes.keys(), pulp_domain=get_domain()).values_list(
+                "sha256", flat=True
+            )
+        )
+        download_size = sum(size or 0 for sha256, size in sizes.items() if sha256 not in existing)
+
+    return {
+        "added_count": len(added),
+        "removed_count": len(removed),
+        "artifact_size": sum(size or 0 for sha256, size in added.values()),
+        "download_size": download_size,
+        "added": [
+            {"namespace": namespace, "name": name, "version": version, "size": size}
+            for (namespace, name, version), (sha256, size) in sorted(added.items())
+        ],
+        "removed": [
+            {"namespace": namespace, "name": name, "version": version}
+            for namespace, name, version in removed
+        ],
+        "would_fetch_count": len(plan_stage.git_versions),
+        "would_fetch": [
+            {
+                "namespace": namespace,
+                "name": name,
+                "version": version,
+                "git_url": git_url,
+                "git_ref": git_ref,
+            }
+            for (namespace, name, version), (git_url, git_ref) in sorted(
+                plan_stage.git_versions.items()
+            )
+        ],
+    }
+
+
 def import_collection(
     temp_file_pk,
     repository_pk=None,
@@ -298,17 +400,12 @@ def import_collection(
 
     try:
         with temp_file.file.open() as artifact_file:
-            with tarfile.open(fileobj=artifact_file, mode="r") as tar:
-                manifest_data = json.load(
-                    get_file_obj_from_tarball(tar, "MANIFEST.json", temp_file.file.name)
-                )
-                files_data = json.load(
-                    get_file_obj_from_tarball(tar, "FILES.json", temp_file.file.name)
-                )
             url = _get_backend_storage_url(artifact_file)
-            artifact_file.seek(0)
+            tarball = LocalCollectionTarball(artifact_file, temp_file.file.name)
+        with tarball:
+            manifest_data, files_data = tarball.read_manifest_and_files()
             importer_result = process_collection(
-                artifact_file, filename=filename, file_url=url, logger=user_facing_logger
+                tarball.file, filename=filename, file_url=url, logger=user_facing_logger
             )
         artifact = Artifact.from_pulp_temporary_file(temp_file)
         temp_file = None
@@ -346,6 +443,176 @@ def import_collection(
         CreatedResource.objects.create(content_object=repository)
 
 
+def _local_collection_tarballs(temp_files, path):
+    """
+    Yield the local paths of the collection tarballs to import, and whether they are copies.
+
+    Temporary files are copied into the working directory of the task. Those holding a tar
+    archive of collection tarballs, rather than a collection, are unpacked into it.
+    """
+    for temp_file in temp_files:
+        with (
+            temp_file.file.open() as src,
+            tempfile.NamedTemporaryFile(dir=".", suffix=".tar.gz", delete=False) as copy,
+        ):
+            shutil.copyfileobj(src, copy, 1024 * 1024)
+        is_collection = True
+        members = []
+        try:
+            with tarfile.open(copy.name, mode="r|*") as tar:
+                is_collection = False
+                for member in tar:
+                    if member.name.removeprefix("./") == "MANIFEST.json":
+                        is_collection = True
+                        break
+                    if member.isfile() and member.name.endswith(".tar.gz"):
+                        with tempfile.NamedTemporaryFile(
+                            dir=".", suffix=".tar.gz", delete=False
+                        ) as member_copy:
+                            shutil.copyfileobj(tar.extractfile(member), member_copy)
+                        members.append(member_copy.name)
+        except tarfile.TarError:
+            # Left for the importer to report
+            is_collection = True
+        if is_collection:
+            for member_path in members:
+                os.unlink(member_path)
+            yield copy.name, True
+        else:
+            os.unlink(copy.name)
+            for member_path in members:
+                yield member_path, True
+    if path:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(".tar.gz"):
+                    continue
+                tarball_path = os.path.join(root, name)
+                if not is_allowed_import_path(tarball_path):
+                    log.warning(
+                        _("Skipping {path}, it links outside of the allowed import paths.").format(
+                            path=tarball_path
+                        )
+                    )
+                    continue
+                yield tarball_path, False
+
+
+def _read_collection_tarball(path):
+    """Read the metadata of a local collection tarball. This does not access the database."""
+    with open(path, "rb") as tarball:
+        manifest_data, files_data = read_manifest_and_files(tarball, path)
+        tarball.seek(0)
+        importer_result = process_collection(tarball, filename=None, file_url=None, logger=log)
+    return importer_result, manifest_data, files_data
+
+
+def _save_imported_collection_version(path, importer_result, manifest_data, files_data):
+    """Save the Artifact and CollectionVersion of an imported tarball, or get the existing ones."""
+    artifact = Artifact.init_and_validate(path)
+    try:
+        with transaction.atomic():
+            artifact.save()
+    except IntegrityError:
+        artifact = Artifact.objects.get(sha256=artifact.sha256, pulp_domain=get_domain())
+    existing = CollectionVersion.objects.filter(sha256=artifact.sha256, _pulp_domain=get_domain())
+    if collection_version := existing.first():
+        return collection_version
+    importer_result["artifact_url"] = get_url(artifact)
+    importer_result["sha256"] = artifact.sha256
+    collection_version = create_collection_from_importer(importer_result)
+    collection_version.manifest = manifest_data
+    collection_version.files = files_data
+    try:
+        with transaction.atomic():
+            collection_version.save()
+            ContentArtifact.objects.create(
+                artifact=artifact,
+                content=collection_version,
+                relative_path=collection_version.relative_path,
+            )
+    except IntegrityError:
+        # Imported concurrently
+        collection_version = existing.get()
+    return collection_version
+
+
+def import_collections(repository_pk=None, temp_file_pks=None, path=None):
+    """
+    Import many collection tarballs and add them to a repository in a single new version.
+
+    The tarballs are read by galaxy-importer on a pool of `ANSIBLE_COLLECTION_IMPORT_WORKERS`
+    threads. Tarballs that fail to import are logged and counted in the
+    `import.collections.failed` progress report, the others are still imported. Collection
+    versions that already exist are added to the repository as they are.
+
+    Args:
+        repository_pk (str): Optional. The pk of the AnsibleRepository to add the collections to.
+        temp_file_pks (list): The pks of PulpTemporaryFiles holding collection tarballs, or tar
+            archives of collection tarballs.
+        path (str): A directory to import all the `.tar.gz` files in. Files that resolve to a
+            location outside of the `ALLOWED_IMPORT_PATHS` are skipped.
+    """
+    temp_files = PulpTemporaryFile.objects.filter(pk__in=temp_file_pks or [])
+    collection_version_pks = []
+    workers = settings.ANSIBLE_COLLECTION_IMPORT_WORKERS
+    with (
+        ProgressReport(
+            message=_("Importing collections"), code="import.collections", total=0
+        ) as pdone,
+        ProgressReport(
+            message=_("Importing collections (failed)"), code="import.collections.failed"
+        ) as pfailed,
+        ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        tarballs = _local_collection_tarballs(temp_files, path)
+        pending = {}
+
+        def submit_next():
+            for tarball_path, is_copy in tarballs:
+                future = executor.submit(_read_collection_tarball, tarball_path)
+                pending[future] = (tarball_path, is_copy)
+                pdone.total += 1
+                return True
+            return False
+
+        # Keep a bounded number of tarballs in flight, the importer results can be large
+        while len(pending) < 2 * workers and submit_next():
+            pass
+        while pending:
+            done, _not_done = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                tarball_path, is_copy = pending.pop(future)
+                try:
+                    collection_version = _save_imported_collection_version(
+                        tarball_path, *future.result()
+                    )
+                except Exception as exc:
+                    log.warning(
+                        _("Failed to import {path}: {error}").format(path=tarball_path, error=exc)
+                    )
+                    pfailed.increment()
+                else:
+                    collection_version_pks.append(collection_version.pk)
+                    pdone.increment()
+                finally:
+                    if is_copy:
+                        os.unlink(tarball_path)
+                submit_next()
+
+    temp_files.delete()
+
+    if repository_pk:
+        repository = AnsibleRepository.objects.get(pk=repository_pk)
+        content_q = CollectionVersion.objects.filter(pk__in=collection_version_pks)
+        with repository.new_version() as new_version:
+            new_version.add_content(content_q)
+        CreatedResource.objects.create(content_object=repository)
+
+
 def create_collection_from_importer(importer_result):
     """
     Process results from importer.
@@ -466,6 +733,8 @@ class AnsibleDeclarativeVersion(DeclarativeVersion):
     Subclassed Declarative version creates a custom pipeline for Ansible sync.
     """
 
+    stage_profiles = None
+
     def pipeline_stages(self, new_version):
         """
         Build a list of stages feeding into the ContentUnitAssociation stage.
@@ -487,11 +756,21 @@ class AnsibleDeclarativeVersion(DeclarativeVersion):
             ArtifactDownloader(resource_budget=resource_budget),
             ArtifactSaver(resource_budget=resource_budget),
             QueryExistingContents(),
+            CollectionMetadataExtractor(),
             DocsBlobDownloader(),
             AnsibleContentSaver(new_version),
+            SignatureAndMarkStage(),
+            QueryExistingContents(),
+            ContentSaver(),
             RemoteArtifactSaver(),
             ResolveContentFutures(),
         ]
+        if self.first_stage.use_checkpoints:
+            pipeline.append(SyncCheckpointStage(self.first_stage))
+        if settings.ANSIBLE_SYNC_PIPELINE_PROFILE:
+            self.stage_profiles = [
+                profile_stage(stage, position) for position, stage in enumerate(pipeline)
+            ]
 
         return pipeline
 
@@ -515,7 +794,22 @@ class AnsibleDeclarativeVersion(DeclarativeVersion):
                 stages.append(ContentAssociation(new_version, self.mirror))
                 stages.append(EndStage())
                 pipeline = create_pipeline(stages)
+                if self.stage_profiles:
+                    pipeline = record_queries(pipeline)
                 loop.run_until_complete(pipeline)
+                if self.stage_profiles:
+                    report_pipeline_profile(self.stage_profiles)
+
+                changes = self.first_stage.changes
+                if changes and changes["removed"] and self.first_stage.mirror:
+                    to_remove = Q()
+                    for cv in changes["removed"]:
+                        to_remove |= Q(
+                            namespace=cv["namespace"], name=cv["name"], version=cv["version"]
+                        )
+                    new_version.remove_content(
+                        CollectionVersion.objects.filter(to_remove, pulp_domain=get_domain())
+                    )
 
                 if deprecation_before_sync:
                     to_undeprecate = Q()
@@ -543,12 +837,118 @@ class UndeprecateStage(Stage):
                 await self.put(d_content)
 
 
+class SignatureAndMarkStage(Stage):
+    """
+    Emits the signatures and marks of synced CollectionVersions once those are saved.
+
+    The first stage attaches them to the DeclarativeContent of their CollectionVersion as
+    `signatures` and `marks` extra data, so parsing the metadata never waits for the save. The
+    emitted content still needs to pass a QueryExistingContents and a ContentSaver stage.
+    """
+
+    async def run(self):
+        """
+        The coroutine for this stage.
+        """
+        async for d_content in self.items():
+            signatures = d_content.extra_data.pop("signatures", [])
+            marks = d_content.extra_data.pop("marks", [])
+            await self.put(d_content)
+
+            collection_version = d_content.content
+            if not isinstance(collection_version, CollectionVersion):
+                continue
+            for signature in signatures:
+                sig = signature["signature"]
+                cv_signature = CollectionVersionSignature(
+                    signed_collection=collection_version,
+                    data=sig,
+                    digest=hashlib.sha256(sig.encode("utf-8")).hexdigest(),
+                    pubkey_fingerprint=signature["pubkey_fingerprint"],
+                )
+                await self.put(DeclarativeContent(content=cv_signature))
+
+            for mark_value in marks:
+                cv_mark = CollectionVersionMark(
+                    marked_collection=collection_version,
+                    value=mark_value,
+                )
+                await self.put(DeclarativeContent(content=cv_mark))
+
+
+class SyncCheckpointStage(Stage):
+    """
+    Records the content saved by a collection sync as a CollectionSyncCheckpoint.
+
+    Should the sync fail, a retried sync from the same remote skips fetching the metadata of the
+    checkpointed content. Each batch is committed on its own. Nothing is recorded once the first
+    stage found out that it does not use the checkpoints, see `_download_unpaginated_metadata`.
+    """
+
+    def __init__(self, first_stage):
+        super().__init__()
+        self.first_stage = first_stage
+
+    async def run(self):
+        """
+        The coroutine for this stage.
+        """
+        async for batch in self.batches():
+            if self.first_stage.use_checkpoints:
+                checkpoints = [
+                    CollectionSyncCheckpoint(
+                        repository=self.first_stage.repository,
+                        remote=self.first_stage.remote,
+                        content_id=d_content.content.pk,
+                    )
+                    for d_content in batch
+                    if d_content.content is not None and not d_content.content._state.adding
+                ]
+                await CollectionSyncCheckpoint.objects.abulk_create(
+                    checkpoints, ignore_conflicts=True
+                )
+            for d_content in batch:
+                await self.put(d_content)
+
+
+class SyncPlanStage(Stage):
+    """
+    Collects the collection versions a sync would contain, instead of saving them.
+
+    `versions` maps the `(namespace, name, version)` of each collection version to the sha256 and
+    size of its artifact, as announced by the remote metadata. `git_versions` maps the collection
+    versions a sync would build from git to their `git_url` and `git_ref`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.versions = {}
+        self.git_versions = {}
+
+    async def run(self):
+        """
+        The coroutine for this stage.
+        """
+        async for d_content in self.items():
+            content = d_content.content
+            if isinstance(content, CollectionVersion):
+                sha256 = size = None
+                if d_content.d_artifacts:
+                    artifact = d_content.d_artifacts[0].artifact
+                    sha256, size = artifact.sha256, artifact.size
+                key = (content.namespace, content.name, content.version)
+                self.versions[key] = (sha256, size)
+                if git_url := d_content.extra_data.get("git_url"):
+                    self.git_versions[key] = (git_url, d_content.extra_data["git_ref"])
+            await self.put(d_content)
+
+
 class CollectionSyncFirstStage(Stage):
     """
     The first stage of a pulp_ansible sync pipeline.
     """
 
-    def __init__(self, remote, repository, is_repo_remote, optimize):
+    def __init__(self, remote, repository, is_repo_remote, optimize, mirror=False, dry_run=False):
         """
         The first stage of a pulp_ansible sync pipeline.
 
@@ -557,6 +957,10 @@ class CollectionSyncFirstStage(Stage):
             repository (AnsibleRepository): The repository being syncedself.
             is_repo_remote (bool): True if the remote is the repository's remote.
             optimize (boolean): Whether to optimize sync or not.
+            mirror (boolean): Whether the sync is in mirror mode.
+            dry_run (boolean): Whether the content is only planned, see `plan_sync`. Collection
+                versions built from git are then emitted unbuilt, with their `git_url` and
+                `git_ref` as extra data.
 
         """
         super().__init__()
@@ -567,13 +971,25 @@ class CollectionSyncFirstStage(Stage):
         self.add_dependents = self.pending_requirements and self.remote.sync_dependencies
         self.signed_only = self.remote.signed_only
         self.sync_highest_versions = self.remote.sync_highest_versions
-        self.already_synced = defaultdict(set)
-        self._unpaginated_collection_metadata = None
+        self.metadata_store = None
+        self.already_synced = SyncedVersions()
+        self.git_build_executor = None
+        self._unpaginated_collection_deprecated = None
+        self._unpaginated_collection_versions = None
         self._unpaginated_collection_version_metadata = None
+        self._bulk_versions_url = None
+        self._bulk_requested = set()
+        self._bulk_pending = []
+        self._bulk_flush = None
+        self._bulk_versions = defaultdict(set)
         self.optimize = optimize
+        self.mirror = mirror
+        self.dry_run = dry_run
+        self.latest_repository_version = repository.latest_version()
         self.last_synced_metadata_time = None
         self.namespace_shas = {}
         self._unpaginated_namespace_metadata = None
+        self.metadata_cache = MetadataCache.for_remote(remote)
 
         # Interpret download policy
         self.deferred_download = self.remote.policy != Remote.IMMEDIATE
@@ -583,6 +999,35 @@ class CollectionSyncFirstStage(Stage):
             self._should_we_sync()
         )
 
+        # Remotes with a changes feed only send what changed since the last sync
+        self.changes = None
+        self.sync_cursor = None
+        if (
+            self.should_sync
+            and is_repo_remote
+            and optimize
+            and not self.pending_requirements
+            and not self.sync_highest_versions
+        ):
+            changes = asyncio.get_event_loop().run_until_complete(self._fetch_changes(mirror))
+            if changes is not None:
+                self.sync_cursor = changes["cursor"]
+                if not changes["full_sync_required"]:
+                    self.changes = changes
+
+        # Checkpoints save the detail requests of the versions an earlier sync saved. The changes
+        # feed and the collection_versions/all/ listing don't need any, see
+        # `_download_unpaginated_metadata`.
+        self.use_checkpoints = (
+            optimize and settings.ANSIBLE_SYNC_CHECKPOINTS and self.changes is None
+        )
+
+    def _metadata_downloader(self, url, **kwargs):
+        """
+        Returns a downloader for a metadata url, revalidating its cached response if there is one.
+        """
+        return self.remote.get_downloader(url=url, metadata_cache=self.metadata_cache, **kwargs)
+
     @async_cache
     async def _get_root_api(self, root):
         """
@@ -593,7 +1038,7 @@ class CollectionSyncFirstStage(Stage):
         if root == "https://galaxy.ansible.com" or root == "https://galaxy.ansible.com/":
             root = "https://galaxy.ansible.com/api/"
 
-        downloader = self.remote.get_downloader(url=root)
+        downloader = self._metadata_downloader(url=root)
 
         try:
             api_data = parse_metadata(await downloader.run())
@@ -602,7 +1047,7 @@ class CollectionSyncFirstStage(Stage):
                 raise
 
             root = urljoin(root, "api/")
-            downloader = self.remote.get_downloader(url=root)
+            downloader = self._metadata_downloader(url=root)
             api_data = parse_metadata(await downloader.run())
 
         if "available_versions" not in api_data:
@@ -632,7 +1077,7 @@ class CollectionSyncFirstStage(Stage):
     async def _fetch_collection_version_metadata(
         self, api_version, collection_version_url
     ) -> list[Coroutine]:
-        downloader = self.remote.get_downloader(url=collection_version_url)
+        downloader = self._metadata_downloader(url=collection_version_url)
         metadata = parse_metadata(await downloader.run())
         return await self._add_collection_version(api_version, collection_version_url, metadata)
 
@@ -648,11 +1093,11 @@ class CollectionSyncFirstStage(Stage):
         )
         fullname = f"{collection_version.namespace}.{collection_version.name}"
         version = collection_version.version
-        if version in self.already_synced[fullname]:
+        if (fullname, version) in self.already_synced:
             return []
 
         # Mark the collection version as being processed
-        self.already_synced[fullname].add(version)
+        self.already_synced.add(fullname, version)
         await self.parsing_metadata_progress_bar.aincrement()
 
         if fullname in self.exclude_info and Version(version) in self.exclude_info[fullname]:
@@ -695,6 +1140,11 @@ class CollectionSyncFirstStage(Stage):
         extra_data = {}
         if api_version != 2:  # V2 never implemented the docs-blob requests
             extra_data["docs_blob_url"] = f"{collection_version_url}docs-blob/"
+        # Emitted by the SignatureAndMarkStage once the CollectionVersion is saved
+        if signatures:
+            extra_data["signatures"] = signatures
+        if marks:
+            extra_data["marks"] = marks
 
         d_content = DeclarativeContent(
             content=collection_version,
@@ -704,24 +1154,91 @@ class CollectionSyncFirstStage(Stage):
         del metadata  # Free up memory
         await self.put(d_content)
 
-        if signatures or marks:
-            collection_version = await d_content.resolution()
-            for signature in signatures:
-                sig = signature["signature"]
-                cv_signature = CollectionVersionSignature(
-                    signed_collection=collection_version,
-                    data=sig,
-                    digest=hashlib.sha256(sig.encode("utf-8")).hexdigest(),
-                    pubkey_fingerprint=signature["pubkey_fingerprint"],
-                )
-                await self.put(DeclarativeContent(content=cv_signature))
+        return dependencies_coros
 
-            for mark_value in marks:
-                cv_mark = CollectionVersionMark(
-                    marked_collection=collection_version,
-                    value=mark_value,
+    def _known_content(self, content_qs):
+        """
+        Restrict `content_qs` to the content that is known to the sync.
+
+        That is the content of the latest repository version, plus the content saved by an
+        unfinished earlier sync from the same remote, if checkpoints are used.
+        """
+        known_qs = self.latest_repository_version.get_content(content_qs)
+        if self.use_checkpoints:
+            checkpoints = CollectionSyncCheckpoint.objects.filter(
+                repository=self.repository, remote=self.remote
+            )
+            known_qs = known_qs | content_qs.filter(pk__in=checkpoints.values("content_id"))
+        return known_qs
+
+    async def _get_known_collection_versions(self, namespace, name, versions):
+        """
+        Returns the given versions of a collection that are known to the sync.
+
+        The result maps each known version to its CollectionVersion and its known signatures, so
+        the detail metadata of those versions doesn't need to be fetched again.
+        """
+        known = {
+            collection_version.version: collection_version
+            async for collection_version in self._known_content(
+                CollectionVersion.objects.filter(
+                    namespace=namespace, name=name, version__in=versions
                 )
-                await self.put(DeclarativeContent(content=cv_mark))
+            )
+        }
+        if not known:
+            return {}
+
+        signatures = defaultdict(list)
+        async for signature in self._known_content(
+            CollectionVersionSignature.objects.filter(signed_collection__in=list(known.values()))
+        ):
+            signatures[signature.signed_collection_id].append(signature)
+        if self.signed_only:
+            known = {v: cv for v, cv in known.items() if signatures[cv.pk]}
+
+        # Namespace metadata is only announced by the detail metadata, keep the known one
+        if namespace not in self.namespace_shas:
+            namespace_metadata = await self._known_content(
+                AnsibleNamespaceMetadata.objects.filter(name=namespace)
+            ).afirst()
+            if namespace_metadata and namespace_metadata.metadata_sha256:
+                self.namespace_shas[namespace] = namespace_metadata.metadata_sha256
+
+        return {v: (cv, signatures[cv.pk]) for v, cv in known.items()}
+
+    async def _add_known_collection_version(
+        self, collection_version, signatures, marks
+    ) -> list[Coroutine]:
+        """Add a CollectionVersion that is already in the repository to the sync pipeline."""
+        fullname = f"{collection_version.namespace}.{collection_version.name}"
+        version = collection_version.version
+        if (fullname, version) in self.already_synced:
+            return []
+
+        # Mark the collection version as being processed
+        self.already_synced.add(fullname, version)
+        await self.parsing_metadata_progress_bar.aincrement()
+
+        if fullname in self.exclude_info and Version(version) in self.exclude_info[fullname]:
+            log.debug(_("{}-{} is in excludes list, skipping").format(fullname, version))
+            return []
+
+        dependencies_coros = (
+            self._require_dependencies(collection_version.dependencies)
+            if self.add_dependents
+            else []
+        )
+
+        await self.put(DeclarativeContent(content=collection_version))
+        for signature in signatures:
+            await self.put(DeclarativeContent(content=signature))
+        for mark_value in marks:
+            cv_mark = CollectionVersionMark(
+                marked_collection=collection_version,
+                value=mark_value,
+            )
+            await self.put(DeclarativeContent(content=cv_mark))
 
         return dependencies_coros
 
@@ -734,75 +1251,142 @@ class CollectionSyncFirstStage(Stage):
                 version_spec = AnsibleSpec(version_range)
                 if not any(
                     Version(synced_version) in version_spec
-                    for synced_version in self.already_synced[fullname]
+                    for synced_version in self.already_synced.versions(fullname)
                 ):
                     self.pending_requirements.append(new_req)
                     coros.append(self._fetch_collection_metadata(new_req))
         return coros
 
-    async def _add_namespace(self, name, namespace_sha):
-        """Adds A Namespace metadata content to the pipeline."""
+    async def _add_namespaces(self):
+        """
+        Add the Namespace metadata of the synced collections to the pipeline.
 
-        try:
-            ns = await AnsibleNamespaceMetadata.objects.aget(
-                metadata_sha256=namespace_sha, pulp_domain=get_domain()
+        Namespace metadata already known to Pulp is looked up with a single query. The rest is
+        fetched through the filtered namespaces listing if the remote supports it, and one by one
+        otherwise.
+        """
+        pending = dict(self.namespace_shas)
+        async for namespace in AnsibleNamespaceMetadata.objects.filter(
+            metadata_sha256__in=set(pending.values()), pulp_domain=get_domain()
+        ):
+            if pending.get(namespace.name) == namespace.metadata_sha256:
+                del pending[namespace.name]
+                await self.put(DeclarativeContent(namespace))
+                await self.parsing_namespace_progress_bar.aincrement()
+
+        if pending:
+            await self._fetch_namespace_listing(pending)
+        await self._run_metadata_coroutines(
+            (self._add_namespace(name) for name in pending),
+            self.parsing_namespace_progress_bar,
+        )
+
+    async def _fetch_namespace_listing(self, pending):
+        """
+        Fetch namespace metadata in chunks through the namespaces listing.
+
+        The listing is filtered by `metadata_sha256__in`. Found namespaces are removed from
+        `pending`. Fetching stops at the first response that shows the remote ignored the filter.
+        """
+        endpoint, api_version = await self._get_root_api(self.remote.url)
+        shas = sorted(set(pending.values()))
+        # Keep the URLs short, every sha256 takes 65 characters
+        chunk_size = 50
+        for i in range(0, len(shas), chunk_size):
+            chunk = set(shas[i : i + chunk_size])
+            query = urlencode({"metadata_sha256__in": ",".join(sorted(chunk)), "limit": chunk_size})
+            downloader = self._metadata_downloader(
+                url=f"{endpoint}/namespaces/?{query}",
+                silence_errors_for_response_status_codes={404},
             )
-            await self.put(DeclarativeContent(ns))
-            await self.parsing_namespace_progress_bar.aincrement()
-            return
-        except AnsibleNamespaceMetadata.DoesNotExist:
-            pass
+            try:
+                listing = parse_metadata(await downloader.run())
+                namespaces = listing["data"]
+            except (ClientResponseError, FileNotFoundError, KeyError, TypeError, ValueError):
+                return
+            if any(namespace.get("metadata_sha256") not in chunk for namespace in namespaces):
+                return
+            for namespace in namespaces:
+                name = namespace.get("name")
+                if name in pending and pending[name] == namespace["metadata_sha256"]:
+                    del pending[name]
+                    await self.put(self._namespace_declarative_content(namespace))
+                    await self.parsing_namespace_progress_bar.aincrement()
+
+    def _namespace_declarative_content(self, namespace):
+        """Build the DeclarativeContent for Namespace metadata fetched from the remote."""
+        name = namespace["name"]
+        links = namespace.get("links", None)
+
+        # clean up the galaxy API for pulp
+        if links:
+            namespace["links"] = {x["name"]: x["url"] for x in links}
+        else:
+            namespace["links"] = dict()
+
+        for key in ("pulp_href", "groups", "id", "related_fields", "users"):
+            namespace.pop(key, None)
+
+        url = namespace.pop("avatar_url", None)
+
+        da = (
+            [
+                DeclarativeFailsafeArtifact(
+                    Artifact(sha256=namespace.get("avatar_sha256")),
+                    url=url,
+                    remote=self.remote,
+                    relative_path=f"{name}-avatar",
+                    deferred_download=False,
+                    extra_data={"namespace": name},
+                )
+            ]
+            if url
+            else None
+        )
+
+        namespace = AnsibleNamespaceMetadata(**namespace)
+        return DeclarativeContent(namespace, d_artifacts=da)
 
+    async def _add_namespace(self, name) -> list[Coroutine]:
+        """Fetches a single Namespace metadata and adds it to the pipeline."""
         endpoint, api_version = await self._get_root_api(self.remote.url)
         namespace_url = f"{endpoint}/namespaces/{name}"
-        downloader = self.remote.get_downloader(
-            url=namespace_url, silence_errors_for_response_codes={404}
+        downloader = self._metadata_downloader(
+            url=namespace_url, silence_errors_for_response_status_codes={404}
         )
         try:
             result = await downloader.run()
         except FileNotFoundError:
-            pass
+            log.info(f"Failed to find namespace {name}")
         else:
-            namespace = parse_metadata(result)
-            links = namespace.get("links", None)
-
-            # clean up the galaxy API for pulp
-            if links:
-                namespace["links"] = {x["name"]: x["url"] for x in links}
-            else:
-                namespace["links"] = dict()
-
-            for key in ("pulp_href", "groups", "id", "related_fields", "users"):
-                namespace.pop(key, None)
-
-            url = namespace.pop("avatar_url", None)
-
-            da = (
-                [
-                    DeclarativeFailsafeArtifact(
-                        Artifact(sha256=namespace.get("avatar_sha256")),
-                        url=url,
-                        remote=self.remote,
-                        relative_path=f"{name}-avatar",
-                        deferred_download=False,
-                        extra_data={"namespace": name},
-                    )
-                ]
-                if url
-                else None
-            )
-
-            namespace = AnsibleNamespaceMetadata(**namespace)
-            dc = DeclarativeContent(namespace, d_artifacts=da)
-            await self.put(dc)
+            await self.put(self._namespace_declarative_content(parse_metadata(result)))
             await self.parsing_namespace_progress_bar.aincrement()
-            return
-
-        log.info(f"Failed to find namespace {name}")
+        return []
 
-    async def _add_collection_version_from_git(self, url, gitref, metadata_only) -> list[Coroutine]:
+    async def _add_collection_version_from_git(self, version_metadata) -> list[Coroutine]:
+        """Add a CollectionVersion another Pulp synced from git, building it from its git_url."""
+        url = version_metadata["git_url"]
+        gitref = version_metadata["git_commit_sha"]
+        if self.dry_run:
+            # Building the collection means cloning the repository, a plan only notes that it would
+            collection_version = CollectionVersion(
+                namespace=version_metadata["namespace"]["name"],
+                name=version_metadata["name"],
+                version=version_metadata["version"],
+            )
+            d_content = DeclarativeContent(
+                content=collection_version, extra_data={"git_url": url, "git_ref": gitref}
+            )
+            await self.put(d_content)
+            return []
+        if self.git_build_executor is None:
+            # Spawned, as forking the worker with its open connections and threads is unsafe
+            self.git_build_executor = ProcessPoolExecutor(
+                max_workers=settings.ANSIBLE_SYNC_GIT_BUILD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
         d_content = await declarative_content_from_git_repo(
-            self.remote, url, gitref, metadata_only=False
+            self.remote, url, gitref, metadata_only=False, executor=self.git_build_executor
         )
         await self.put(d_content)
         return []
@@ -816,7 +1400,7 @@ class CollectionSyncFirstStage(Stage):
         else:
             offset = (page_num - 1) * page_size
             versions_list_url = f"{url_without_get_params}?limit={page_size}&offset={offset}"
-        return self.remote.get_downloader(url=versions_list_url)
+        return self._metadata_downloader(url=versions_list_url)
 
     async def _fetch_paginated_collection_metadata(
         self, name, namespace, version_range, source=None
@@ -824,32 +1408,35 @@ class CollectionSyncFirstStage(Stage):
         root = source or self.remote.url
         collection_endpoint, api_version = await self._get_paginated_collection_api(root)
         collection_url = f"{collection_endpoint}{namespace}/{name}"
-        collection_metadata_downloader = self.remote.get_downloader(url=collection_url)
+        collection_metadata_downloader = self._metadata_downloader(url=collection_url)
         collection_metadata = parse_metadata(await collection_metadata_downloader.run())
 
-        matched_versions = []
-        page_num = 1
         version_spec = AnsibleSpec(version_range)
-        while True:
-            versions_list_downloader = self._collection_versions_list_downloader(
-                api_version, collection_endpoint, namespace, name, page_num, PAGE_SIZE
-            )
-            collection_versions_list = parse_metadata(await versions_list_downloader.run())
-            if api_version == 2:
-                collection_versions = collection_versions_list["results"]
-            else:
-                collection_versions = collection_versions_list["data"]
-            for collection_version in collection_versions:
-                if Version(collection_version["version"]) in version_spec:
-                    matched_versions.append(collection_version)
-            next_value = self._get_response_next_value(api_version, collection_versions_list)
-            if not next_value:
-                break
-            page_num = page_num + 1
+        collection_versions = await self._fetch_all_pages(
+            api_version,
+            functools.partial(
+                self._collection_versions_list_downloader,
+                api_version,
+                collection_endpoint,
+                namespace,
+                name,
+            ),
+        )
+        matched_versions = [
+            collection_version
+            for collection_version in collection_versions
+            if Version(collection_version["version"]) in version_spec
+        ]
 
         if self.sync_highest_versions:
             matched_versions = self._limit_to_highest_versions(matched_versions)
 
+        known_versions = {}
+        if self.optimize and matched_versions:
+            known_versions = await self._get_known_collection_versions(
+                namespace, name, [v["version"] for v in matched_versions]
+            )
+
         coros = []
         for collection_version in matched_versions:
             version_num = collection_version["version"]
@@ -859,12 +1446,21 @@ class CollectionSyncFirstStage(Stage):
                     content=AnsibleCollectionDeprecated(namespace=namespace, name=name),
                 )
                 await self.put(d_content)
-            coros.append(
-                self._fetch_collection_version_metadata(
-                    api_version,
-                    collection_version_detail_url,
+            known_version, signatures = known_versions.get(version_num, (None, []))
+            # Signatures added or revoked upstream are only announced by the detail metadata
+            if known_version and collection_version.get("signatures_count") == len(signatures):
+                coros.append(
+                    self._add_known_collection_version(
+                        known_version, signatures, collection_version.get("marks", [])
+                    )
+                )
+            else:
+                coros.append(
+                    self._fetch_collection_version_metadata(
+                        api_version,
+                        collection_version_detail_url,
+                    )
                 )
-            )
 
         self.parsing_metadata_progress_bar.total += len(coros)
         await self.parsing_metadata_progress_bar.asave(update_fields=["total"])
@@ -875,13 +1471,20 @@ class CollectionSyncFirstStage(Stage):
     ) -> list[Coroutine]:
         coros = []
 
+        if self._bulk_versions_url is not None:
+            # Dependencies are only known once their dependents are parsed
+            requirement = RequirementsFileEntry(f"{namespace}.{name}", version_range, None)
+            await self._request_bulk_collection_versions(requirement)
+
         try:
-            collection_metadata = self._unpaginated_collection_metadata[namespace][name]
-            versions_metadata = self._unpaginated_collection_version_metadata[namespace][name]
+            deprecated = self._unpaginated_collection_deprecated[(namespace, name)]
         except KeyError:
             raise CollectionNotFound(namespace, name, self.remote.url)
+        versions_metadata = []
+        if (namespace, name) in self._unpaginated_collection_version_metadata:
+            versions_metadata = self._unpaginated_collection_version_metadata.get(namespace, name)
 
-        if collection_metadata["deprecated"]:
+        if deprecated:
             d_content = DeclarativeContent(
                 content=AnsibleCollectionDeprecated(namespace=namespace, name=name),
             )
@@ -894,14 +1497,8 @@ class CollectionSyncFirstStage(Stage):
             matched_versions = self._limit_to_highest_versions(matched_versions)
 
         for version_metadata in matched_versions:
-            if git_url := version_metadata.get("git_url"):
-                coros.append(
-                    self._add_collection_version_from_git(
-                        git_url,
-                        version_metadata["git_commit_sha"],
-                        False,
-                    )
-                )
+            if version_metadata.get("git_url"):
+                coros.append(self._add_collection_version_from_git(version_metadata))
             else:
                 collection_version_url = urljoin(self.remote.url, f"{version_metadata['href']}")
                 coros.append(
@@ -926,13 +1523,62 @@ class CollectionSyncFirstStage(Stage):
     async def _fetch_collection_metadata(self, requirement) -> list[Coroutine]:
         namespace, name = requirement.name.split(".")
 
-        if self._unpaginated_collection_version_metadata and requirement.source is None:
+        if self._unpaginated_collection_version_metadata is not None and requirement.source is None:
             return await self._read_from_downloaded_metadata(name, namespace, requirement.version)
         else:
             return await self._fetch_paginated_collection_metadata(
                 name, namespace, requirement.version, requirement.source
             )
 
+    async def _fetch_all_pages(self, api_version, page_downloader):
+        """
+        Returns the items of every page of a paginated listing.
+
+        The first page tells how many items there are, so the remaining pages are fetched
+        concurrently, bounded by the remote's download concurrency and rate limit. The page size
+        the remote actually served is used for the later pages, in case it caps the requested one.
+
+        Args:
+            api_version (int): The api version of the listing.
+            page_downloader (callable): Returns the downloader for a page number and page size.
+
+        """
+        page_num = 1
+        page_size = PAGE_SIZE
+        pages = [parse_metadata(await page_downloader(page_num, page_size).run())]
+        items = []
+        while True:
+            for page in pages:
+                items.extend(self._get_response_items(api_version, page))
+            if not self._get_response_next_value(api_version, pages[-1]):
+                return items
+            if page_num == 1:
+                page_size = len(items) or PAGE_SIZE
+            count = self._get_response_count(api_version, pages[-1])
+            last_page = page_num + 1
+            if count:
+                last_page = max(last_page, -(-count // page_size))
+            results = await asyncio.gather(
+                *(
+                    page_downloader(num, page_size).run()
+                    for num in range(page_num + 1, last_page + 1)
+                )
+            )
+            pages = [parse_metadata(result) for result in results]
+            page_num = last_page
+
+    @staticmethod
+    def _get_response_items(api_version, response):
+        if api_version == 2:
+            return response["results"]
+        return response["data"]
+
+    @staticmethod
+    def _get_response_count(api_version, response):
+        if api_version == 2:
+            return response.get("count")
+        return response.get("meta", {}).get("count")
+
     @staticmethod
     def _get_response_next_value(api_version, response):
         if api_version == 2:
@@ -948,7 +1594,7 @@ class CollectionSyncFirstStage(Stage):
         else:
             offset = (page_num - 1) * page_size
             collection_list_url = f"{collection_endpoint}?limit={page_size}&offset={offset}"
-        return self.remote.get_downloader(url=collection_list_url)
+        return self._metadata_downloader(url=collection_list_url)
 
     async def _download_unpaginated_metadata(self):
         root_endpoint, api_version = await self._get_root_api(self.remote.url)
@@ -957,117 +1603,259 @@ class CollectionSyncFirstStage(Stage):
             loop = asyncio.get_event_loop()
 
             collection_endpoint = f"{root_endpoint}/collections/all/"
-            excludes_endpoint = f"{root_endpoint}/excludes/"
-            col_downloader = self.remote.get_downloader(
+            col_downloader = self._metadata_downloader(
                 url=collection_endpoint, silence_errors_for_response_status_codes={404}
             )
-            exc_downloader = self.remote.get_downloader(
-                url=excludes_endpoint, silence_errors_for_response_status_codes={404}
-            )
-            tasks = [loop.create_task(col_downloader.run()), loop.create_task(exc_downloader.run())]
-            col_results, exc_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            if not isinstance(exc_results, FileNotFoundError):
-                excludes_response = parse_metadata(exc_results)
-                if excludes_response:
-                    try:
-                        excludes_list = parse_collections_requirements_file(excludes_response)
-                    except ValidationError:
-                        pass
-                    else:
-                        excludes = {r.name: AnsibleSpec(r.version) for r in excludes_list}
-                        self.exclude_info.update(excludes)
+            tasks = [
+                loop.create_task(col_downloader.run()),
+                loop.create_task(self._download_excludes(root_endpoint)),
+            ]
+            col_results, _ = await asyncio.gather(*tasks, return_exceptions=True)
 
             if not isinstance(col_results, FileNotFoundError):
-                collection_metadata_list = parse_metadata(col_results)
-
-                self._unpaginated_collection_metadata = defaultdict(dict)
-                for collection in collection_metadata_list:
-                    namespace = collection["namespace"]
-                    name = collection["name"]
-                    self._unpaginated_collection_metadata[namespace][name] = collection
+                # The listing holds the full metadata, and the saved versions are recognized by
+                # the QueryExisting* stages, so there is nothing to checkpoint.
+                self.use_checkpoints = False
+
+                # Only whether a collection is deprecated is needed from the collection metadata
+                self._unpaginated_collection_deprecated = {}
+                for collection in iter_metadata_items(col_results):
+                    key = (collection["namespace"], collection["name"])
+                    self._unpaginated_collection_deprecated[key] = collection["deprecated"]
+
+                if self.pending_requirements and urlparse(root_endpoint).scheme in (
+                    "http",
+                    "https",
+                ):
+                    self._bulk_versions_url = f"{root_endpoint}/collection_versions/bulk/"
+                    if await self._fetch_bulk_collection_versions(self.pending_requirements):
+                        return
+                    self._bulk_versions_url = None
 
                 collection_version_endpoint = f"{root_endpoint}/collection_versions/all/"
-                downloader = self.remote.get_downloader(url=collection_version_endpoint)
-                collection_version_metadata_list = parse_metadata(await downloader.run())
+                downloader = self._metadata_downloader(url=collection_version_endpoint)
+                self._unpaginated_collection_versions = await downloader.run()
 
-                self._unpaginated_collection_version_metadata = defaultdict(
-                    lambda: defaultdict(list)
-                )
-                for collection_version_metadata in collection_version_metadata_list:
-                    namespace = collection_version_metadata["namespace"]["name"]
-                    name = collection_version_metadata["name"]
-                    self._unpaginated_collection_version_metadata[namespace][name].append(
-                        collection_version_metadata
-                    )
+                if self.pending_requirements:
+                    # Requirements are looked up per collection, so keep a compact index.
+                    # Syncing everything streams the downloaded file instead, see
+                    # `_iter_unpaginated_collection_versions`.
+                    self._build_unpaginated_collection_version_index()
+
+    async def _download_excludes(self, root_endpoint):
+        """Add the collection versions the remote excludes from syncs to `exclude_info`."""
+        downloader = self._metadata_downloader(
+            url=f"{root_endpoint}/excludes/", silence_errors_for_response_status_codes={404}
+        )
+        try:
+            excludes_response = parse_metadata(await downloader.run())
+        except FileNotFoundError:
+            return
+        if excludes_response:
+            try:
+                excludes_list = parse_collections_requirements_file(excludes_response)
+            except ValidationError:
+                return
+            self.exclude_info.update({r.name: AnsibleSpec(r.version) for r in excludes_list})
 
-    async def _find_all_collections_from_unpaginated_data(self) -> list[Coroutine]:
-        coros = []
+    async def _fetch_bulk_collection_versions(self, requirements):
+        """
+        Index the versions matching `requirements` with the remote's bulk endpoint.
 
-        for collection_namespace_dict in self._unpaginated_collection_metadata.values():
-            for collection in collection_namespace_dict.values():
-                if collection["deprecated"]:
-                    d_content = DeclarativeContent(
-                        content=AnsibleCollectionDeprecated(
-                            namespace=collection["namespace"], name=collection["name"]
-                        ),
-                    )
-                    await self.put(d_content)
+        pulp_ansible remotes return the metadata of every matching version in a single request,
+        instead of the whole `collection_versions/all/` listing or a request per version.
 
-        for collections_in_namespace in self._unpaginated_collection_version_metadata.values():
-            for collection_versions in collections_in_namespace.values():
-                for collection_version in collection_versions:
-                    collection_version_url = urljoin(
-                        self.remote.url, f"{collection_version['href']}"
-                    )
-                    coros.append(
-                        self._add_collection_version(
-                            self._api_version, collection_version_url, collection_version
-                        )
-                    )
+        Returns:
+            bool: False if the remote does not provide the bulk endpoint. Other servers answer
+                the unknown request with a client error or with `501 Not Implemented`.
 
-        self.parsing_metadata_progress_bar.total = len(coros)
+        """
+        entries = [f"{r.name}:{r.version}" for r in requirements if r.source is None]
+        entries = [entry for entry in dict.fromkeys(entries) if entry not in self._bulk_requested]
+        if self._unpaginated_collection_version_metadata is None:
+            self._unpaginated_collection_version_metadata = self._new_metadata_index()
+
+        for i in range(0, len(entries), BULK_VERSIONS_REQUEST_SIZE):
+            chunk = entries[i : i + BULK_VERSIONS_REQUEST_SIZE]
+            downloader = self.remote.get_downloader(
+                url=self._bulk_versions_url, post_data={"collections": chunk}
+            )
+            try:
+                result = await downloader.run()
+            except ClientResponseError as exc:
+                if exc.status == 501 or (400 <= exc.status < 500 and exc.status != 429):
+                    return False
+                raise
+            self._bulk_requested.update(chunk)
+            for metadata in iter_metadata_items(result):
+                namespace = metadata["namespace"]["name"]
+                name = metadata["name"]
+                # Entries with overlapping version ranges return the same versions
+                if metadata["version"] in self._bulk_versions[(namespace, name)]:
+                    continue
+                self._bulk_versions[(namespace, name)].add(metadata["version"])
+                self._unpaginated_collection_version_metadata.add(namespace, name, metadata)
+        return True
+
+    async def _request_bulk_collection_versions(self, requirement):
+        """
+        Index the versions matching a dependency with the remote's bulk endpoint.
+
+        The dependencies that are requested while a bulk request is being prepared join it, so a
+        round of dependency resolution costs a single request instead of one per dependency.
+        """
+        self._bulk_pending.append(requirement)
+        if self._bulk_flush is None:
+            self._bulk_flush = asyncio.ensure_future(self._flush_bulk_requests())
+        # Shielded, so a cancelled waiter doesn't cancel the request of the others
+        await asyncio.shield(self._bulk_flush)
+
+    async def _flush_bulk_requests(self):
+        # Let the dependencies that are ready to run join the request
+        await asyncio.sleep(0)
+        requirements, self._bulk_pending, self._bulk_flush = self._bulk_pending, [], None
+        await self._fetch_bulk_collection_versions(requirements)
+
+    def _new_metadata_index(self):
+        """
+        Returns an empty collection version metadata index.
+
+        The index lives in the metadata store if `ANSIBLE_SYNC_METADATA_INDEX_ON_DISK` is set.
+        """
+        if self.metadata_store is not None:
+            return DiskCollectionVersionMetadataIndex(self.metadata_store)
+        return CollectionVersionMetadataIndex()
+
+    def _build_unpaginated_collection_version_index(self):
+        """Index the downloaded collection_versions/all/ metadata by collection."""
+        wanted = None
+        if not self.add_dependents:
+            wanted = {r.name for r in self.pending_requirements if r.source is None}
+
+        self._unpaginated_collection_version_metadata = self._new_metadata_index()
+        for collection_version_metadata in iter_metadata_items(
+            self._unpaginated_collection_versions
+        ):
+            namespace = collection_version_metadata["namespace"]["name"]
+            name = collection_version_metadata["name"]
+            if wanted is not None and f"{namespace}.{name}" not in wanted:
+                continue
+            self._unpaginated_collection_version_metadata.add(
+                namespace, name, collection_version_metadata
+            )
+
+    async def _find_all_collections_from_unpaginated_data(self) -> Iterator[Coroutine]:
+        for (namespace, name), deprecated in self._unpaginated_collection_deprecated.items():
+            if deprecated:
+                d_content = DeclarativeContent(
+                    content=AnsibleCollectionDeprecated(namespace=namespace, name=name),
+                )
+                await self.put(d_content)
+
+        self.parsing_metadata_progress_bar.total = 0
         await self.parsing_metadata_progress_bar.asave(update_fields=["total"])
-        return coros
+        return self._iter_unpaginated_collection_versions()
+
+    def _iter_unpaginated_collection_versions(self) -> Iterator[Coroutine]:
+        """
+        Lazily parse the downloaded collection_versions/all/ metadata.
+
+        One coroutine is yielded per collection version, so content already flows through the
+        pipeline while the rest of the metadata is still being parsed.
+        """
+        for collection_version in iter_metadata_items(self._unpaginated_collection_versions):
+            collection_version_url = urljoin(self.remote.url, f"{collection_version['href']}")
+            self.parsing_metadata_progress_bar.total += 1
+            yield self._add_collection_version(
+                self._api_version, collection_version_url, collection_version
+            )
 
-    async def _find_all_collections(self) -> list[Coroutine]:
-        if self._unpaginated_collection_version_metadata:
+    async def _find_all_collections(self) -> Iterable[Coroutine]:
+        if self._unpaginated_collection_versions is not None:
             return await self._find_all_collections_from_unpaginated_data()
 
         collection_endpoint, api_version = await self._get_paginated_collection_api(self.remote.url)
 
+        collections = await self._fetch_all_pages(
+            api_version,
+            functools.partial(self._collection_list_downloader, api_version, collection_endpoint),
+        )
         coros = []
-        page_num = 1
-        while True:
-            collection_list_downloader = self._collection_list_downloader(
-                api_version, collection_endpoint, page_num, PAGE_SIZE
-            )
-            collection_list = parse_metadata(await collection_list_downloader.run())
-
+        for collection in collections:
             if api_version == 2:
-                collections = collection_list["results"]
+                namespace = collection["namespace"]["name"]
             else:
-                collections = collection_list["data"]
+                namespace = collection["namespace"]
+            name = collection["name"]
+            requirements_file = RequirementsFileEntry(
+                name=".".join([namespace, name]),
+                version="*",
+                source=None,
+            )
+            coros.append(self._fetch_collection_metadata(requirements_file))
 
-            for collection in collections:
-                if api_version == 2:
-                    namespace = collection["namespace"]["name"]
-                else:
-                    namespace = collection["namespace"]
-                name = collection["name"]
-                requirements_file = RequirementsFileEntry(
-                    name=".".join([namespace, name]),
-                    version="*",
-                    source=None,
-                )
-                coros.append(self._fetch_collection_metadata(requirements_file))
+        self.parsing_metadata_progress_bar.total = len(coros)
+        await self.parsing_metadata_progress_bar.asave(update_fields=["total"])
+        return coros
 
-            next_value = self._get_response_next_value(api_version, collection_list)
-            if not next_value:
-                break
-            page_num = page_num + 1
+    async def _fetch_changes(self, mirror):
+        """
+        Returns the remote's changes since the last sync, or None if the remote has no changes feed.
 
-        self.parsing_metadata_progress_bar.total = len(coros)
+        The changes are only usable if the repository still holds what the last sync left. In
+        mirror mode that means no repository version was created since.
+        """
+        root_endpoint, api_version = await self._get_root_api(self.remote.url)
+        if api_version < 3 or urlparse(root_endpoint).scheme not in ("http", "https"):
+            return None
+
+        url = f"{root_endpoint}/collection_versions/changes/"
+        if self.repository.last_sync_cursor and (
+            not mirror or self.latest_repository_version.number == self.repository.last_sync_version
+        ):
+            url = f"{url}?{urlencode({'since': self.repository.last_sync_cursor})}"
+
+        downloader = self._metadata_downloader(
+            url=url, silence_errors_for_response_status_codes={404}
+        )
+        try:
+            changes = parse_metadata(await downloader.run())
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return None
+        if not isinstance(changes, dict) or "cursor" not in changes:
+            return None
+        self._api_version = api_version
+        self._changes_root_endpoint = root_endpoint
+        return changes
+
+    async def _find_changed_collections(self) -> list[Coroutine]:
+        """Add the collection versions the changes feed reports as added or updated."""
+        # The feed does not know about the excludes, they apply to the added versions all the same
+        await self._download_excludes(self._changes_root_endpoint)
+
+        for deprecated in self.changes["deprecated"]:
+            d_content = DeclarativeContent(
+                content=AnsibleCollectionDeprecated(
+                    namespace=deprecated["namespace"], name=deprecated["name"]
+                ),
+            )
+            await self.put(d_content)
+
+        for namespace in self.changes["namespaces"]:
+            self.namespace_shas[namespace["name"]] = namespace["metadata_sha256"]
+
+        coros = []
+        for version_metadata in self.changes["added"]:
+            if version_metadata.get("git_url"):
+                coros.append(self._add_collection_version_from_git(version_metadata))
+            else:
+                collection_version_url = urljoin(self.remote.url, f"{version_metadata['href']}")
+                coros.append(
+                    self._add_collection_version(
+                        self._api_version, collection_version_url, version_metadata
+                    )
+                )
+        self.parsing_metadata_progress_bar.total += len(coros)
         await self.parsing_metadata_progress_bar.asave(update_fields=["total"])
         return coros
 
@@ -1077,7 +1865,7 @@ class CollectionSyncFirstStage(Stage):
         async with ProgressReport(message=msg, code="sync.no_change") as noop:
             root, api_version = await self._get_root_api(self.remote.url)
             if api_version == 3:
-                downloader = self.remote.get_downloader(
+                downloader = self._metadata_downloader(
                     url=root, silence_errors_for_response_status_codes={404}
                 )
                 try:
@@ -1108,47 +1896,100 @@ class CollectionSyncFirstStage(Stage):
 
         return True
 
+    async def _run_metadata_coroutines(self, coros, pb):
+        """
+        Run the metadata coroutines on a bounded work queue.
+
+        The number of queued and in flight coroutines is shown in the suffix of the progress
+        report `pb`.
+
+        At most as many coroutines as the remote's `download_concurrency` run at once. Requests
+        to the hosts of requirements with a `source` go through the remote's session as well, so
+        that is the number of connections they can use. A new coroutine is started as soon as a
+        running one finishes. The coroutines returned by a finished one, e.g. the fetching of its
+        dependencies, are queued ahead of the remaining input, so deep dependency trees never wait
+        for unrelated long-tail requests.
+        """
+        limit = self.remote.download_concurrency or self.remote.DEFAULT_DOWNLOAD_CONCURRENCY
+        coros = iter(coros)
+        queued = deque()
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < limit:
+                    if queued:
+                        coro = queued.popleft()
+                    elif (coro := next(coros, None)) is None:
+                        break
+                    in_flight.add(asyncio.ensure_future(coro))
+                if not in_flight:
+                    break
+                pb.suffix = _("{in_flight} in flight, {queued} queued").format(
+                    in_flight=len(in_flight), queued=len(queued)
+                )
+                # Progress reports only write to the database every few seconds
+                await pb.asave()
+                done, in_flight = await asyncio.wait(in_flight, return_when=FIRST_COMPLETED)
+                for task in done:
+                    queued.extend(task.result())
+        finally:
+            for task in in_flight:
+                task.cancel()
+            for coro in queued:
+                coro.close()
+        pb.suffix = None
+        await pb.asave()
+
     async def run(self):
         """
         Build and emit `DeclarativeContent` from the ansible metadata.
+
+        With `ANSIBLE_SYNC_METADATA_INDEX_ON_DISK` set, the indexed remote metadata and the synced
+        versions are kept in a temporary SQLite database instead of in memory.
         """
+        if settings.ANSIBLE_SYNC_METADATA_INDEX_ON_DISK:
+            self.metadata_store = SyncMetadataStore()
+            self.already_synced = DiskSyncedVersions(self.metadata_store)
+        try:
+            await self._emit_content()
+        finally:
+            if self.git_build_executor is not None:
+                self.git_build_executor.shutdown(cancel_futures=True)
+            if self.metadata_store is not None:
+                self.metadata_store.close()
+            if self.metadata_cache is not None:
+                await asyncio.to_thread(
+                    self.metadata_cache.prune, settings.ANSIBLE_SYNC_METADATA_CACHE_MAX_SIZE
+                )
+
+    async def _emit_content(self):
+        """Emit the collection and namespace content of the sync."""
         tasks = []
-        new_tasks = []
-        loop = asyncio.get_event_loop()
 
         msg = _("Parsing CollectionVersion Metadata")
         async with ProgressReport(message=msg, code="sync.parsing.metadata", total=0) as pb:
             self.parsing_metadata_progress_bar = pb
-            await self._download_unpaginated_metadata()
-
-            if self.pending_requirements:
-                for requirement_entry in self.pending_requirements:
-                    tasks.append(self._fetch_collection_metadata(requirement_entry))
+            if self.changes is not None:
+                tasks = await self._find_changed_collections()
             else:
-                tasks.extend(await self._find_all_collections())
-            # Process in chunks to limit memory usage
-            while True:
-                for i in range(0, len(tasks), 100):
-                    results = await asyncio.gather(*tasks[i : i + 100])
-                    for sublist in results:
-                        new_tasks.extend(sublist)
-
-                if not new_tasks:
-                    break
-                tasks = new_tasks
-                new_tasks = []
+                await self._download_unpaginated_metadata()
+                if self.pending_requirements:
+                    for requirement_entry in self.pending_requirements:
+                        tasks.append(self._fetch_collection_metadata(requirement_entry))
+                else:
+                    # This may be a lazy iterator that keeps parsing the remote metadata while the
+                    # content of the first coroutines already flows through the pipeline.
+                    tasks = await self._find_all_collections()
+            await self._run_metadata_coroutines(tasks, pb)
             # Ensure PR 'total' is correct before stage finishes
             pb.total = pb.done
 
-        tasks = []
         msg = _("Parsing Namespace Metadata")
         async with ProgressReport(
             message=msg, code="sync.parsing.namespace", total=len(self.namespace_shas)
         ) as pr:
             self.parsing_namespace_progress_bar = pr
-            for namespace, namespace_sha in self.namespace_shas.items():
-                tasks.append(loop.create_task(self._add_namespace(namespace, namespace_sha)))
-            await asyncio.gather(*tasks)
+            await self._add_namespaces()
             # Ensuring the total is correct, as some avatar download might fail
             pr.total = pr.done
 
@@ -1176,6 +2017,10 @@ class DocsBlobDownloader(GenericDownloader):
     """
     Stage for downloading docs_blob.
 
+    At most `ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY` docs blobs are downloaded at once. They are kept
+    in memory, compressed, in the `docs_blob` extra data until :class:`AnsibleContentSaver`
+    writes them to the database.
+
     Args:
         max_concurrent_content (int): The maximum number of
             :class:`~pulpcore.plugin.stages.DeclarativeContent` instances to handle simultaneously.
@@ -1187,6 +2032,13 @@ class DocsBlobDownloader(GenericDownloader):
     PROGRESS_REPORTING_MESSAGE = "Downloading Docs Blob"
     PROGRESS_REPORTING_CODE = "sync.downloading.docs_blob"
 
+    async def run(self):
+        """
+        The coroutine for this stage.
+        """
+        self.download_slots = asyncio.Semaphore(settings.ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY)
+        await super().run()
+
     async def _handle_content_unit(self, d_content):
         """Handle one content unit.
 
@@ -1199,17 +2051,121 @@ class DocsBlobDownloader(GenericDownloader):
             if docs_blob_url := d_content.extra_data.get("docs_blob_url"):
                 remote = d_content.d_artifacts[0].remote
                 downloader = remote.get_downloader(
-                    url=docs_blob_url, silence_errors_for_response_status_codes={404}
+                    url=docs_blob_url,
+                    silence_errors_for_response_status_codes={404},
+                    in_memory=True,
                 )
-                download_result = await downloader.run()
-                downloaded += 1
-                if Path(download_result.path).exists():
-                    d_content.extra_data["docs_blob_path"] = download_result.path
+                try:
+                    async with self.download_slots:
+                        download_result = await downloader.run()
+                except FileNotFoundError:
+                    log.info(f"Failed to find docs blob {docs_blob_url}")
+                else:
+                    downloaded += 1
+                    body = getattr(downloader, "body", None)
+                    path = download_result.path
+                    if body is None and path and Path(path).exists():
+                        # Not an http(s) remote, the body was written to a file
+                        body = await asyncio.to_thread(Path(path).read_bytes)
+                    if body is not None:
+                        # zlib releases the GIL, so this doesn't block the event loop
+                        d_content.extra_data["docs_blob"] = await asyncio.to_thread(
+                            zlib.compress, body, 1
+                        )
 
         await self.put(d_content)
         return downloaded
 
 
+def extract_collection_version_metadata(d_content):
+    """
+    Read the metadata needed to save a synced CollectionVersion from its tarball.
+
+    Args:
+        d_content (:class:`~pulpcore.plugin.stages.DeclarativeContent`): The declarative content of
+            the CollectionVersion. Its first artifact must already be saved.
+
+    Returns:
+        dict: The raw FILES.json string as `files_raw` and the parsed MANIFEST.json as `manifest`.
+            `requires_ansible` is only set if the collection has runtime metadata.
+    """
+    d_artifact = d_content.d_artifacts[0]
+    artifact = d_artifact.artifact
+    d_artifact_files = d_content.extra_data.get("d_artifact_files", {})
+
+    metadata = {}
+    # TODO change logic when implementing normal on-demand syncing
+    # Special Case for Git sync w/ metadata_only=True
+    if artifact_file_name := d_artifact_files.get(d_artifact):
+        artifact_file = open(artifact_file_name, mode="rb")
+    else:
+        artifact_file = artifact.file.open()
+    with artifact_file, tarfile.open(fileobj=artifact_file, mode="r") as tar:
+        files_fo = get_file_obj_from_tarball(tar, "FILES.json", artifact.file.name)
+        metadata["files_raw"] = files_fo.read().decode("utf-8")
+
+        runtime_metadata = get_file_obj_from_tarball(
+            tar, "meta/runtime.yml", artifact.file.name, raise_exc=False
+        )
+        if runtime_metadata:
+            runtime_yaml = yaml.safe_load(runtime_metadata)
+            if runtime_yaml:
+                metadata["requires_ansible"] = runtime_yaml.get("requires_ansible")
+        metadata["manifest"] = json.load(
+            get_file_obj_from_tarball(tar, "MANIFEST.json", artifact.file.name)
+        )
+    return metadata
+
+
+class CollectionMetadataExtractor(GenericDownloader):
+    """
+    Stage for reading the metadata of new CollectionVersions from their downloaded tarballs.
+
+    The tarballs are decompressed on a thread pool of `ANSIBLE_SYNC_EXTRACTION_WORKERS` threads,
+    so this overlaps with the downloads and the database work of the other stages. The result is
+    handed to :class:`AnsibleContentSaver` in the `collection_metadata` extra data.
+
+    Args:
+        max_concurrent_content (int): The maximum number of
+            :class:`~pulpcore.plugin.stages.DeclarativeContent` instances to handle simultaneously.
+            Default is 200.
+        args: unused positional arguments passed along to :class:`~pulpcore.plugin.stages.Stage`.
+        kwargs: unused keyword arguments passed along to :class:`~pulpcore.plugin.stages.Stage`.
+    """
+
+    PROGRESS_REPORTING_MESSAGE = "Extracting Collection Metadata"
+    PROGRESS_REPORTING_CODE = "sync.extracting.metadata"
+
+    async def run(self):
+        """
+        The coroutine for this stage.
+        """
+        with ThreadPoolExecutor(max_workers=settings.ANSIBLE_SYNC_EXTRACTION_WORKERS) as executor:
+            self.executor = executor
+            await super().run()
+
+    async def _handle_content_unit(self, d_content):
+        """Handle one content unit.
+
+        Returns:
+            The number of extracted tarballs
+        """
+        extracted = 0
+        if (
+            isinstance(d_content.content, CollectionVersion)
+            and d_content.content._state.adding
+            and d_content.d_artifacts
+        ):
+            loop = asyncio.get_running_loop()
+            d_content.extra_data["collection_metadata"] = await loop.run_in_executor(
+                self.executor, extract_collection_version_metadata, d_content
+            )
+            extracted += 1
+
+        await self.put(d_content)
+        return extracted
+
+
 class AnsibleContentSaver(ContentSaver):
     """
     A modification of ContentSaver stage that additionally saves Ansible plugin specific items.
@@ -1217,6 +2173,9 @@ class AnsibleContentSaver(ContentSaver):
     Saves Collection objects related to the CollectionVersion content unit.
     """
 
+    # Flush the batched files/docs_blob UPDATE once the collected documents reach this size
+    POST_SAVE_UPDATE_MAX_BYTES = 64 * 1024 * 1024
+
     def __init__(self, repository_version, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.repository_version = repository_version
@@ -1232,6 +2191,19 @@ class AnsibleContentSaver(ContentSaver):
         # Sort the batch by natural key to prevent deadlocks
         # Keep this here until added to Pulpcore
         batch.sort(key=lambda x: "".join(map(str, x.content.natural_key())))
+        collection_keys = set()
+        namespace_names = set()
+        for d_content in batch:
+            if d_content is None:
+                continue
+            content = d_content.content
+            if isinstance(content, CollectionVersion) and content._state.adding:
+                collection_keys.add((content.namespace, content.name))
+            elif isinstance(content, AnsibleNamespaceMetadata):
+                namespace_names.add(content.name)
+        collections = self._get_or_create_collections(collection_keys)
+        namespaces = self._get_or_create_namespaces(namespace_names)
+
         for d_content in batch:
             if d_content is None:
                 continue
@@ -1239,11 +2211,9 @@ class AnsibleContentSaver(ContentSaver):
                 d_content.extra_data["pre_save_pulp_id"] = d_content.content.pulp_id
                 d_content.extra_data["pre_save_adding"] = d_content.content._state.adding
                 if d_content.content._state.adding:
-                    d_content.content = self._handle_collection_version(d_content)
+                    d_content.content = self._handle_collection_version(d_content, collections)
             elif isinstance(d_content.content, AnsibleNamespaceMetadata):
-                name = d_content.content.name
-                namespace, created = AnsibleNamespace.objects.get_or_create(name=name)
-                d_content.content.namespace = namespace
+                d_content.content.namespace = namespaces[d_content.content.name]
                 if d_content.d_artifacts:
                     da = d_content.d_artifacts[0]
                     # Check to see if avatar failed to download, update metadata if so,
@@ -1253,12 +2223,71 @@ class AnsibleContentSaver(ContentSaver):
                         d_content.content.avatar_sha256 = None
                         d_content.content.metadata_sha256 = None
 
+    @staticmethod
+    def _get_or_create_collections(keys):
+        """
+        Returns the Collections for a set of (namespace, name), creating the missing ones in bulk.
+
+        The Collections are looked up by their exact (namespace, name) pairs, in chunks to bound
+        the size of the query.
+        """
+        if not keys:
+            return {}
+        domain = get_domain()
+        chunk_size = 500
+
+        def _query(keys):
+            collections = {}
+            keys = sorted(keys)
+            for i in range(0, len(keys), chunk_size):
+                query = Q()
+                for namespace, name in keys[i : i + chunk_size]:
+                    query |= Q(namespace=namespace, name=name)
+                for c in Collection.objects.filter(query, pulp_domain=domain):
+                    collections[(c.namespace, c.name)] = c
+            return collections
+
+        collections = _query(keys)
+        if missing := sorted(keys - collections.keys()):
+            Collection.objects.bulk_create(
+                [Collection(namespace=ns, name=name, pulp_domain=domain) for ns, name in missing],
+                ignore_conflicts=True,
+            )
+            collections.update(_query(missing))
+        return collections
+
+    @staticmethod
+    def _get_or_create_namespaces(names):
+        """Returns the AnsibleNamespaces for a set of names, creating the missing ones in bulk."""
+        if not names:
+            return {}
+        domain = get_domain()
+
+        def _query():
+            qs = AnsibleNamespace.objects.filter(pulp_domain=domain, name__in=names)
+            return {namespace.name: namespace for namespace in qs}
+
+        namespaces = _query()
+        if missing := sorted(names - namespaces.keys()):
+            AnsibleNamespace.objects.bulk_create(
+                [AnsibleNamespace(name=name, pulp_domain=domain) for name in missing],
+                ignore_conflicts=True,
+            )
+            namespaces = _query()
+        return namespaces
+
     def _post_save(self, batch):
         """
-        Update the collection version with the docs_blob and files efficiently
+        Update the collection versions with the docs_blob and files efficiently.
+
+        All rows of the batch are written with a single UPDATE joined against unnested arrays. The
+        statement is flushed early when the collected documents exceed
+        `POST_SAVE_UPDATE_MAX_BYTES` to bound the memory usage.
         """
         update_count = 0
         skip_count = 0
+        rows = []
+        rows_size = 0
         with connection.cursor() as cursor:
             for d_content in batch:
                 if d_content and isinstance(d_content.content, CollectionVersion):
@@ -1270,78 +2299,68 @@ class AnsibleContentSaver(ContentSaver):
                         skip_count += 1
                         continue
                     files = d_content.extra_data.pop("files_raw")
-                    if docs_blob_path := d_content.extra_data.get("docs_blob_path"):
-                        with open(docs_blob_path, "r") as docs_blob_file:
-                            blob = docs_blob_file.read()
-                        sql = (
-                            "UPDATE ansible_collectionversion"
-                            " SET docs_blob = (%s::jsonb)->'docs_blob',"
-                            " files = (%s::jsonb)"
-                            " WHERE content_ptr_id = %s"
-                        )
-                        cursor.execute(
-                            sql,
-                            [blob, files, str(collection_version.pulp_id)],
-                        )
-                    else:
-                        sql = (
-                            "UPDATE ansible_collectionversion"
-                            " SET files = (%s::jsonb)"
-                            " WHERE content_ptr_id = %s"
-                        )
-                        cursor.execute(
-                            sql,
-                            [files, str(collection_version.pulp_id)],
-                        )
+                    blob = None
+                    if docs_blob := d_content.extra_data.pop("docs_blob", None):
+                        blob = zlib.decompress(docs_blob).decode("utf-8")
+                    rows.append((str(collection_version.pulp_id), files, blob))
+                    rows_size += len(files) + len(blob or "")
                     update_count += 1
+                    if rows_size >= self.POST_SAVE_UPDATE_MAX_BYTES:
+                        self._bulk_update_files_and_docs_blob(cursor, rows)
+                        rows = []
+                        rows_size = 0
+            if rows:
+                self._bulk_update_files_and_docs_blob(cursor, rows)
         log.info(
             f"_post_save: updated={update_count}, skipped={skip_count}, batch_size={len(batch)}"
         )
 
-    def _handle_collection_version(self, d_content):
-        collection_version = d_content.content
+    @staticmethod
+    def _bulk_update_files_and_docs_blob(cursor, rows):
+        """
+        Update files and docs_blob of many collection versions in one statement.
 
-        collection, created = Collection.objects.get_or_create(
-            namespace=d_content.content.namespace, name=d_content.content.name
+        Args:
+            cursor: The database cursor to use.
+            rows (list): Tuples of (content_ptr_id, files, docs_blob) where files and docs_blob
+                are raw JSON strings. A docs_blob of None leaves the stored docs_blob untouched.
+        """
+        ids, files, blobs = zip(*rows)
+        sql = (
+            "UPDATE ansible_collectionversion AS cv"
+            " SET files = v.files::jsonb,"
+            " docs_blob = CASE WHEN v.blob IS NULL THEN cv.docs_blob"
+            " ELSE (v.blob::jsonb)->'docs_blob' END"
+            " FROM unnest(%s::uuid[], %s::text[], %s::text[]) AS v(content_ptr_id, files, blob)"
+            " WHERE cv.content_ptr_id = v.content_ptr_id"
         )
-        collection_version.collection = collection
+        cursor.execute(sql, [list(ids), list(files), list(blobs)])
 
-        d_artifact_files = d_content.extra_data.get("d_artifact_files", {})
+    def _handle_collection_version(self, d_content, collections):
+        collection_version = d_content.content
+        collection_version.collection = collections[
+            (collection_version.namespace, collection_version.name)
+        ]
 
-        for d_artifact in d_content.d_artifacts:
-            artifact = d_artifact.artifact
-            # TODO change logic when implementing normal on-demand syncing
-            # Special Case for Git sync w/ metadata_only=True
-            if artifact_file_name := d_artifact_files.get(d_artifact):
-                artifact_file = open(artifact_file_name, mode="rb")
-            else:
-                artifact_file = artifact.file.open()
-            with tarfile.open(fileobj=artifact_file, mode="r") as tar:
-                # Defer loading FILES.json to avoid memory usage
-                files_fo = get_file_obj_from_tarball(tar, "FILES.json", artifact.file.name)
-                d_content.extra_data["files_raw"] = files_fo.read().decode("utf-8")
-
-                runtime_metadata = get_file_obj_from_tarball(
-                    tar, "meta/runtime.yml", artifact.file.name, raise_exc=False
-                )
-                if runtime_metadata:
-                    runtime_yaml = yaml.safe_load(runtime_metadata)
-                    if runtime_yaml:
-                        collection_version.requires_ansible = runtime_yaml.get("requires_ansible")
-                manifest_data = json.load(
-                    get_file_obj_from_tarball(tar, "MANIFEST.json", artifact.file.name)
-                )
-                collection_version.manifest = manifest_data
-                info = manifest_data["collection_info"]
-            artifact_file.close()
+        # Usually extracted by the CollectionMetadataExtractor stage already
+        metadata = d_content.extra_data.pop("collection_metadata", None)
+        if metadata is None:
+            metadata = extract_collection_version_metadata(d_content)
 
-            # Remove fields not used by this model
-            info.pop("license_file")
-            info.pop("readme")
+        # Defer loading FILES.json to avoid memory usage
+        d_content.extra_data["files_raw"] = metadata["files_raw"]
+        if "requires_ansible" in metadata:
+            collection_version.requires_ansible = metadata["requires_ansible"]
+        collection_version.manifest = metadata["manifest"]
+        info = metadata["manifest"]["collection_info"]
 
-            # Update with the additional data from the Collection
-            for attr_name, attr_value in info.items():
-                if attr_value is None:
-                    continue
-                setattr(collection_version, attr_name, attr_value)
-            return collection_version
+        # Remove fields not used by this model
+        info.pop("license_file")
+        info.pop("readme")
+
+        # Update with the additional data from the Collection
+        for attr_name, attr_value in info.items():
+            if attr_value is None:
+                continue
+            setattr(collection_version, attr_name, attr_value)
+        return collection_version
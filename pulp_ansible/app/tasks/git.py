@@ -15,6 +15,7 @@ from pulpcore.plugin.stages import (
 from pulp_ansible.app.models import AnsibleRepository, GitRemote
 from pulp_ansible.app.tasks.collections import (
     AnsibleContentSaver,
+    CollectionMetadataExtractor,
     declarative_content_from_git_repo,
 )
 
@@ -74,6 +75,7 @@ class GitDeclarativeVersion(DeclarativeVersion):
             QueryExistingArtifacts(),
             ArtifactSaver(),
             QueryExistingContents(),
+            CollectionMetadataExtractor(),
             # TODO: Use DocsBlobDownloader stage for Docs Blob support?
             AnsibleContentSaver(new_version),
             RemoteArtifactSaver(),
@@ -0,0 +1,139 @@
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+from galaxy_importer.collection import sync_collection
+from git import BadName, GitCommandError, Repo
+
+
+class GitMirrorCache:
+    """
+    Worker-local cache of bare mirrors of the git repositories collections are synced from.
+
+    A mirror is cloned once per url and brought up to date with `git fetch` on later syncs. Each
+    sync checks the ref it needs out into its own worktree of the mirror. Mirrors are locked while
+    they are fetched, so workers on the same host can share the cache directory.
+
+    Args:
+        path (str): The directory holding the mirrors.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _mirror_path(self, url):
+        return self.path / "{}.git".format(hashlib.sha256(url.encode()).hexdigest())
+
+    @contextmanager
+    def _lock(self, mirror_path):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(f"{mirror_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _update(self, url, mirror_path):
+        if (mirror_path / "HEAD").exists():
+            mirror = Repo(mirror_path)
+            mirror.git.fetch("--prune", "origin")
+            # Forget the worktrees of syncs that did not clean up after themselves
+            mirror.git.worktree("prune")
+            return mirror
+        clone_path = mirror_path.with_suffix(".tmp")
+        shutil.rmtree(clone_path, ignore_errors=True)
+        Repo.clone_from(url, clone_path, mirror=True)
+        os.replace(clone_path, mirror_path)
+        return Repo(mirror_path)
+
+    @staticmethod
+    def _resolve(mirror, git_ref):
+        try:
+            return mirror.commit(git_ref or "HEAD").hexsha
+        except (BadName, ValueError):
+            # Commits no branch or tag points to are not part of the mirror
+            mirror.git.fetch("origin", git_ref)
+            return mirror.commit("FETCH_HEAD").hexsha
+
+    def checkout(self, url, git_ref=None):
+        """
+        Check `git_ref` of the repository at `url` out into a new worktree of its mirror.
+
+        Args:
+            url (str): The url of the git repository.
+            git_ref (str): A branch, tag or commit sha. Defaults to the default branch.
+
+        Returns:
+            git.Repo: The worktree, in a new directory of the current working directory. It has
+                to be released with `remove_worktree`.
+        """
+        mirror_path = self._mirror_path(url)
+        with self._lock(mirror_path):
+            mirror = self._update(url, mirror_path)
+            commit_sha = self._resolve(mirror, git_ref)
+            worktree_path = os.path.abspath(str(uuid4()))
+            mirror.git.worktree("add", "--detach", worktree_path, commit_sha)
+        worktree = Repo(worktree_path)
+        worktree.git.submodule("update", "--init", "--recursive")
+        return worktree
+
+    def remove_worktree(self, url, worktree):
+        """
+        Delete a worktree `checkout` created for the repository at `url`.
+        """
+        mirror_path = self._mirror_path(url)
+        # `git worktree remove` refuses to remove worktrees with submodules
+        shutil.rmtree(worktree.working_dir, ignore_errors=True)
+        with self._lock(mirror_path):
+            try:
+                Repo(mirror_path).git.worktree("prune")
+            except GitCommandError:
+                pass
+
+
+def _clone_git_repo(url, git_ref=None):
+    if git_ref:
+        try:
+            gitrepo = Repo.clone_from(
+                url, str(uuid4()), depth=1, branch=git_ref, multi_options=["--recurse-submodules"]
+            )
+        except GitCommandError:
+            gitrepo = Repo.clone_from(url, str(uuid4()), multi_options=["--recurse-submodules"])
+            gitrepo.git.checkout(git_ref)
+    else:
+        gitrepo = Repo.clone_from(
+            url, str(uuid4()), depth=1, multi_options=["--recurse-submodules"]
+        )
+    return gitrepo
+
+
+def build_collection_from_git(url, git_ref=None, cache_dir=None):
+    """
+    Check out a git repository and build the collection in it.
+
+    This does not need a database connection, so syncs can run it in worker processes.
+
+    Args:
+        url (str): The url of the git repository.
+        git_ref (str): A branch, tag or commit sha. Defaults to the default branch.
+        cache_dir (str): The directory of the :class:`GitMirrorCache` to check the repository
+            out of. The repository is cloned into the current working directory if it is None.
+
+    Returns:
+        tuple: The sha of the commit checked out, the metadata galaxy-importer read from the
+            collection, and the absolute path of the built collection tarball.
+    """
+    git_cache = GitMirrorCache(cache_dir) if cache_dir else None
+    if git_cache:
+        gitrepo = git_cache.checkout(url, git_ref)
+    else:
+        gitrepo = _clone_git_repo(url, git_ref)
+    try:
+        commit_sha = gitrepo.head.commit.hexsha
+        metadata, artifact_path = sync_collection(gitrepo.working_dir, os.getcwd())
+    finally:
+        if git_cache:
+            git_cache.remove_worktree(url, gitrepo)
+    return commit_sha, metadata, os.path.abspath(artifact_path)
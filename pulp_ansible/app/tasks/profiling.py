@@ -0,0 +1,222 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from gettext import gettext as _
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from pulpcore.plugin.constants import TASK_STATES
+from pulpcore.plugin.models import ProgressReport
+
+log = logging.getLogger(__name__)
+
+_current_profile = ContextVar("pulp_ansible_stage_profile", default=None)
+
+
+class StageProfile:
+    """
+    Counters describing the work one stage did during a sync.
+
+    Attributes:
+        name (str): The name of the stage.
+        position (int): The position of the stage in the pipeline.
+        items_in (int): The number of items the stage received.
+        items_out (int): The number of items the stage passed on.
+        batches (int): The number of batches the stage received.
+        max_batch_size (int): The size of the largest batch the stage received.
+        upstream_wait (float): Seconds spent waiting for the previous stage to hand over items.
+        put_wait (float): Seconds spent waiting for the next stage to accept items.
+        db_time (float): Seconds spent executing database queries.
+        db_queries (int): The number of database queries executed.
+        wall_time (float): Seconds the stage was running.
+    """
+
+    def __init__(self, name, position):
+        self.name = name
+        self.position = position
+        self.items_in = 0
+        self.items_out = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.upstream_wait = 0.0
+        self.put_wait = 0.0
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.wall_time = 0.0
+
+    @property
+    def busy_time(self):
+        """Seconds the stage was neither waiting on its neighbours nor on the database."""
+        return max(0.0, self.wall_time - self.upstream_wait - self.put_wait - self.db_time)
+
+    def as_dict(self):
+        """Return the profile as a dict suitable for structured logging."""
+        return {
+            "stage": self.name,
+            "position": self.position,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "upstream_wait": round(self.upstream_wait, 3),
+            "put_wait": round(self.put_wait, 3),
+            "db_time": round(self.db_time, 3),
+            "db_queries": self.db_queries,
+            "busy_time": round(self.busy_time, 3),
+            "wall_time": round(self.wall_time, 3),
+        }
+
+    def summary(self):
+        """Return a short human readable summary of the timings."""
+        summary = _(
+            "upstream wait {upstream:.2f}s, put wait {put:.2f}s, "
+            "db {db:.2f}s ({queries} queries), busy {busy:.2f}s"
+        ).format(
+            upstream=self.upstream_wait,
+            put=self.put_wait,
+            db=self.db_time,
+            queries=self.db_queries,
+            busy=self.busy_time,
+        )
+        if self.batches:
+            summary += _(", {batches} batches of {avg:.1f} (max {max})").format(
+                batches=self.batches,
+                avg=self.items_in / self.batches,
+                max=self.max_batch_size,
+            )
+        return summary
+
+
+def profile_stage(stage, position):
+    """
+    Instrument a stage so it records a `StageProfile` while it runs.
+
+    The stage's `items`, `batches`, `put` and `run` methods are wrapped on the instance, so the
+    stage keeps its identity in the pipeline. Time spent waiting for input, or for the next stage
+    to accept output, overlaps with work for stages that process items concurrently.
+
+    Args:
+        stage (pulpcore.plugin.stages.Stage): The stage to instrument.
+        position (int): The position of the stage in the pipeline.
+
+    Returns:
+        The StageProfile the stage records into.
+    """
+    profile = StageProfile(stage.__class__.__name__, position)
+    items, batches, put, run = stage.items, stage.batches, stage.put, stage.run
+
+    async def profiled_items():
+        iterator = items()
+        while True:
+            start = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                profile.upstream_wait += time.perf_counter() - start
+            profile.items_in += 1
+            yield item
+
+    async def profiled_batches(*args, **kwargs):
+        iterator = batches(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                batch = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                profile.upstream_wait += time.perf_counter() - start
+            profile.items_in += len(batch)
+            profile.batches += 1
+            profile.max_batch_size = max(profile.max_batch_size, len(batch))
+            yield batch
+
+    async def profiled_put(item):
+        start = time.perf_counter()
+        try:
+            await put(item)
+        finally:
+            profile.put_wait += time.perf_counter() - start
+        profile.items_out += 1
+
+    async def profiled_run():
+        # Tasks and threads started by the stage inherit the context, so their queries count too
+        _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await run()
+        finally:
+            profile.wall_time = time.perf_counter() - start
+
+    stage.items = profiled_items
+    stage.batches = profiled_batches
+    stage.put = profiled_put
+    stage.run = profiled_run
+    return profile
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_time += time.perf_counter() - start
+        profile.db_queries += 1
+
+
+def _install_query_recorder():
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _uninstall_query_recorder():
+    if _record_query in connection.execute_wrappers:
+        connection.execute_wrappers.remove(_record_query)
+
+
+async def record_queries(pipeline):
+    """
+    Run `pipeline` while attributing database queries to the profiled stage issuing them.
+
+    Queries are recorded on the connections of the event loop thread and of the thread running
+    `sync_to_async` calls.
+    """
+    _install_query_recorder()
+    await sync_to_async(_install_query_recorder)()
+    try:
+        await pipeline
+    finally:
+        await sync_to_async(_uninstall_query_recorder)()
+        _uninstall_query_recorder()
+
+
+def report_pipeline_profile(profiles):
+    """
+    Log the stage profiles and save one progress report per stage on the current task.
+
+    The progress reports count the items a stage received as `total` and the items it passed on
+    as `done`, the timings are in the `suffix`.
+    """
+    log.info(
+        _("Sync pipeline profile: {profile}").format(
+            profile=json.dumps([profile.as_dict() for profile in profiles])
+        )
+    )
+    for profile in profiles:
+        ProgressReport(
+            message=_("Pipeline stage {position}: {name}").format(
+                position=profile.position, name=profile.name
+            ),
+            code="sync.pipeline.stage",
+            state=TASK_STATES.COMPLETED,
+            total=profile.items_in,
+            done=profile.items_out,
+            suffix=profile.summary(),
+        ).save()
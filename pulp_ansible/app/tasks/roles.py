@@ -4,6 +4,8 @@ import math
 from asyncio import FIRST_COMPLETED
 from gettext import gettext as _
 
+from django.db.models import Q
+
 from pulpcore.plugin.exceptions import SyncError
 from pulpcore.plugin.models import Artifact, ProgressReport, Remote
 from pulpcore.plugin.stages import (
@@ -12,6 +14,7 @@ from pulpcore.plugin.stages import (
     DeclarativeVersion,
     Stage,
 )
+from pulpcore.plugin.util import get_domain
 
 from pulp_ansible.app.constants import PAGE_SIZE
 from pulp_ansible.app.models import AnsibleRepository, Role, RoleRemote
@@ -54,7 +57,7 @@ def synchronize(remote_pk, repository_pk, mirror=False):
     log.info(
         _("Synchronizing: repository=%(r)s remote=%(p)s"), {"r": repository.name, "p": remote.name}
     )
-    first_stage = RoleFirstStage(remote)
+    first_stage = RoleFirstStage(remote, repository, mirror=mirror)
     d_version = DeclarativeVersion(first_stage, repository, mirror=mirror)
     repository_version = d_version.create()
     if RepositoryVersionSerializer is not None and repository_version:
@@ -66,18 +69,26 @@ def synchronize(remote_pk, repository_pk, mirror=False):
 class RoleFirstStage(Stage):
     """
     The first stage of a pulp_ansible sync pipeline for roles.
+
+    Role versions already in the repository are not emitted again by additive syncs. Role
+    versions Pulp already has the tarball of are emitted without an artifact, so they aren't
+    downloaded again.
     """
 
-    def __init__(self, remote):
+    def __init__(self, remote, repository=None, mirror=False):
         """
         The first stage of a pulp_ansible sync pipeline.
 
         Args:
             remote (RoleRemote): The remote data to be used when syncing
+            repository (AnsibleRepository): The repository being synced, if any.
+            mirror (bool): True for mirror mode, False for additive.
 
         """
         super().__init__()
         self.remote = remote
+        self.mirror = mirror
+        self.latest_repository_version = repository.latest_version() if repository else None
 
         # Interpret download policy
         self.deferred_download = self.remote.policy != Remote.IMMEDIATE
@@ -89,36 +100,88 @@ class RoleFirstStage(Stage):
         async with ProgressReport(
             message="Parsing Role Metadata", code="sync.parsing.metadata"
         ) as pb:
-            async for metadata in self._fetch_roles():
-                for version in metadata["summary_fields"]["versions"]:
-                    url = GITHUB_URL % (
-                        metadata["github_user"],
-                        metadata["github_repo"],
-                        version["name"],
-                    )
-                    role = Role(
-                        version=version["name"],
-                        name=metadata["name"],
-                        namespace=metadata["namespace"],
-                    )
-                    relative_path = "%s/%s/%s.tar.gz" % (
-                        metadata["namespace"],
-                        metadata["name"],
-                        version["name"],
-                    )
-                    d_artifact = DeclarativeArtifact(
-                        artifact=Artifact(),
-                        url=url,
-                        relative_path=relative_path,
-                        remote=self.remote,
-                        deferred_download=self.deferred_download,
-                    )
-                    d_content = DeclarativeContent(content=role, d_artifacts=[d_artifact])
-                    await pb.aincrement()
-                    await self.put(d_content)
-
-    async def _fetch_roles(self):
+            async for page in self._fetch_role_pages():
+                in_repository, known = await self._get_known_roles(page)
+                for metadata in page:
+                    for version in metadata["summary_fields"]["versions"]:
+                        key = (metadata["namespace"], metadata["name"], version["name"])
+                        await pb.aincrement()
+                        if key in in_repository and not self.mirror:
+                            # Additive syncs keep the content of the repository anyway
+                            continue
+                        if key in known:
+                            d_content = DeclarativeContent(content=known[key])
+                        else:
+                            d_content = self._new_role(metadata, version["name"])
+                        await self.put(d_content)
+
+    def _new_role(self, metadata, version):
+        url = GITHUB_URL % (
+            metadata["github_user"],
+            metadata["github_repo"],
+            version,
+        )
+        role = Role(
+            version=version,
+            name=metadata["name"],
+            namespace=metadata["namespace"],
+        )
+        relative_path = "%s/%s/%s.tar.gz" % (
+            metadata["namespace"],
+            metadata["name"],
+            version,
+        )
+        d_artifact = DeclarativeArtifact(
+            artifact=Artifact(),
+            url=url,
+            relative_path=relative_path,
+            remote=self.remote,
+            deferred_download=self.deferred_download,
+        )
+        return DeclarativeContent(content=role, d_artifacts=[d_artifact])
+
+    async def _get_known_roles(self, roles):
+        """
+        Look up the versions of `roles` that Pulp already has.
+
+        Returns:
+            tuple: The set of `(namespace, name, version)` in the latest repository version, and
+                a dict of the known Roles keyed by `(namespace, name, version)`. Roles are known if
+                they are in the repository or their tarball was downloaded already.
+        """
+        if not roles:
+            return set(), {}
+        roles_filter = Q()
+        for role in roles:
+            roles_filter |= Q(namespace=role["namespace"], name=role["name"])
+        role_qs = Role.objects.filter(roles_filter, _pulp_domain=get_domain())
+        known_filter = Q(contentartifact__artifact__isnull=False)
+        in_repository = set()
+        if self.latest_repository_version:
+            repository_content = self.latest_repository_version.content
+            in_repository = {
+                key
+                async for key in role_qs.filter(pk__in=repository_content).values_list(
+                    "namespace", "name", "version"
+                )
+            }
+            known_filter |= Q(pk__in=repository_content)
+        known = {
+            (role.namespace, role.name, role.version): role
+            async for role in role_qs.filter(known_filter).distinct()
+        }
+        return in_repository, known
+
+    async def _fetch_role_pages(self):
+        """
+        Fetch the roles in a remote repository.
+
+        Returns:
+            async generator: lists of dicts describing the roles of a page from galaxy api
+
+        """
         async for metadata in self._fetch_galaxy_pages():
+            page = []
             for result in metadata["results"]:
                 role = {
                     "name": result["name"],
@@ -127,12 +190,16 @@ class RoleFirstStage(Stage):
                     "github_user": result["github_user"],
                     "github_repo": result["github_repo"],
                 }
-                yield role
+                page.append(role)
+            yield page
 
     async def _fetch_galaxy_pages(self):
         """
         Fetch the roles in a remote repository.
 
+        At most as many pages as the remote's download concurrency allows are fetched at once. A
+        new page is requested whenever one finished.
+
         Returns:
             async generator: dicts that represent pages from galaxy api
 
@@ -155,13 +222,17 @@ class RoleFirstStage(Stage):
             yield metadata
             await progress_bar.aincrement()
 
-            # Concurrent downloads are limited by aiohttp...
-            not_done = set(
-                remote.get_downloader(url=get_page_url(remote.url, api_version, page)).run()
-                for page in range(2, page_count + 1)
-            )
-
-            while not_done:
+            window = remote.download_concurrency or remote.DEFAULT_DOWNLOAD_CONCURRENCY
+            pages = iter(range(2, page_count + 1))
+            not_done = set()
+            while True:
+                for page in pages:
+                    url = get_page_url(remote.url, api_version, page)
+                    not_done.add(asyncio.ensure_future(remote.get_downloader(url=url).run()))
+                    if len(not_done) >= window:
+                        break
+                if not not_done:
+                    break
                 done, not_done = await asyncio.wait(not_done, return_when=FIRST_COMPLETED)
                 for item in done:
                     yield parse_metadata(item.result())
@@ -1,6 +1,4 @@
-import json
 import logging
-import tarfile
 
 from django.db import transaction
 from galaxy_importer.collection import import_collection
@@ -9,7 +7,7 @@ from pulpcore.plugin.models import Task
 from pulpcore.plugin.util import get_url
 
 from pulp_ansible.app.models import Collection, CollectionImport
-from pulp_ansible.app.tasks.utils import CollectionFilename, get_file_obj_from_tarball
+from pulp_ansible.app.tasks.utils import CollectionFilename, LocalCollectionTarball
 
 log = logging.getLogger(__name__)
 
@@ -36,15 +34,12 @@ def process_collection_artifact(artifact, namespace, name, version):
     # Extra CollectionVersion metadata
     with artifact.file.open() as artifact_file:
         url = _get_backend_storage_url(artifact_file)
+        tarball = LocalCollectionTarball(artifact_file, artifact.file.name)
+    with tarball:
         importer_result = import_collection(
-            artifact_file, filename=filename, file_url=url, logger=user_facing_logger
+            tarball.file, filename=filename, file_url=url, logger=user_facing_logger
         )
-        artifact_file.seek(0)
-        with tarfile.open(fileobj=artifact_file, mode="r") as tar:
-            manifest_data = json.load(
-                get_file_obj_from_tarball(tar, "MANIFEST.json", artifact.file.name)
-            )
-            files_data = json.load(get_file_obj_from_tarball(tar, "FILES.json", artifact.file.name))
+        manifest_data, files_data = tarball.read_manifest_and_files()
 
     # Set CollectionVersion metadata
     collection_info = importer_result["metadata"]
@@ -1,11 +1,18 @@
 import json
 import logging
+import os
 import re
-from collections import namedtuple
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+from collections import defaultdict, namedtuple
 from gettext import gettext as _
 from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
+import json_stream
 import yaml
+from django.conf import settings
 from galaxy_importer.schema import MAX_LENGTH_NAME, MAX_LENGTH_VERSION
 from rest_framework.serializers import ValidationError
 from yaml.error import YAMLError
@@ -101,6 +108,177 @@ def parse_metadata(download_result):
         return json.load(fd)
 
 
+def iter_metadata_items(download_result):
+    """
+    Incrementally parses a JSON file containing a list, yielding one item at a time.
+
+    Only the item currently being yielded is held in memory, which keeps the memory usage flat
+    regardless of the size of the list.
+    """
+    with open(download_result.path) as fd:
+        for item in json_stream.load(fd):
+            yield json_stream.to_standard_types(item)
+
+
+class CollectionVersionMetadataIndex:
+    """
+    A compact, per-collection index of collection version metadata records.
+
+    Records are stored JSON-encoded and only decoded again when the versions of a collection are
+    requested. This is much smaller than keeping the nested dicts of a whole remote catalog alive.
+    """
+
+    def __init__(self):
+        self._records = defaultdict(list)
+
+    def __bool__(self):
+        return bool(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def add(self, namespace, name, record):
+        """Add a collection version metadata record to the index."""
+        encoded = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        self._records[(namespace, name)].append(encoded)
+
+    def get(self, namespace, name):
+        """
+        Returns the collection version metadata records of a collection.
+
+        Raises:
+            KeyError: If the collection is not part of the index.
+        """
+        if (namespace, name) not in self._records:
+            raise KeyError((namespace, name))
+        return [json.loads(record) for record in self._records[(namespace, name)]]
+
+
+class SyncMetadataStore:
+    """
+    A SQLite database in a temporary file for sync metadata that grows with the remote.
+
+    The pages SQLite caches are bounded, so the memory usage stays flat however large the remote
+    catalog is. The file is deleted when the store is closed.
+
+    Args:
+        directory (str): The directory to create the database in. Defaults to the working
+            directory, which is the task's temporary directory within a task.
+    """
+
+    def __init__(self, directory="."):
+        self._file = tempfile.NamedTemporaryFile(dir=directory, suffix=".sqlite3")
+        self.connection = sqlite3.connect(self._file.name, isolation_level=None)
+        # The database is thrown away after the sync, so durability doesn't matter
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+
+    def close(self):
+        """Close the database and delete its file."""
+        self.connection.close()
+        self._file.close()
+
+
+class DiskCollectionVersionMetadataIndex:
+    """
+    A `CollectionVersionMetadataIndex` keeping the records in a `SyncMetadataStore`.
+    """
+
+    def __init__(self, store):
+        self.connection = store.connection
+        # A new index replaces the previous one of the store, like a new in-memory index would
+        self.connection.execute("DROP TABLE IF EXISTS cv_metadata")
+        self.connection.execute("CREATE TABLE cv_metadata (namespace TEXT, name TEXT, record BLOB)")
+        self.connection.execute(
+            "CREATE INDEX cv_metadata_collection ON cv_metadata(namespace, name)"
+        )
+
+    def __bool__(self):
+        return self.connection.execute("SELECT 1 FROM cv_metadata LIMIT 1").fetchone() is not None
+
+    def __len__(self):
+        query = "SELECT COUNT(*) FROM (SELECT DISTINCT namespace, name FROM cv_metadata)"
+        return self.connection.execute(query).fetchone()[0]
+
+    def __contains__(self, key):
+        query = "SELECT 1 FROM cv_metadata WHERE namespace = ? AND name = ? LIMIT 1"
+        return self.connection.execute(query, key).fetchone() is not None
+
+    def add(self, namespace, name, record):
+        """Add a collection version metadata record to the index."""
+        encoded = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        self.connection.execute(
+            "INSERT INTO cv_metadata VALUES (?, ?, ?)", (namespace, name, encoded)
+        )
+
+    def get(self, namespace, name):
+        """
+        Returns the collection version metadata records of a collection.
+
+        Raises:
+            KeyError: If the collection is not part of the index.
+        """
+        rows = self.connection.execute(
+            "SELECT record FROM cv_metadata WHERE namespace = ? AND name = ? ORDER BY rowid",
+            (namespace, name),
+        ).fetchall()
+        if not rows:
+            raise KeyError((namespace, name))
+        return [json.loads(record) for (record,) in rows]
+
+
+class SyncedVersions:
+    """
+    The versions of each collection a sync has processed, keyed by `namespace.name`.
+    """
+
+    def __init__(self):
+        self._versions = defaultdict(set)
+
+    def __contains__(self, key):
+        fullname, version = key
+        return version in self._versions.get(fullname, ())
+
+    def add(self, fullname, version):
+        """Mark a version of a collection as processed."""
+        self._versions[fullname].add(version)
+
+    def versions(self, fullname):
+        """Returns the processed versions of a collection."""
+        return set(self._versions.get(fullname, ()))
+
+
+class DiskSyncedVersions:
+    """
+    `SyncedVersions` keeping the versions in a `SyncMetadataStore`.
+    """
+
+    def __init__(self, store):
+        self.connection = store.connection
+        self.connection.execute(
+            "CREATE TABLE synced_versions"
+            " (fullname TEXT, version TEXT, PRIMARY KEY (fullname, version))"
+        )
+
+    def __contains__(self, key):
+        query = "SELECT 1 FROM synced_versions WHERE fullname = ? AND version = ?"
+        return self.connection.execute(query, key).fetchone() is not None
+
+    def add(self, fullname, version):
+        """Mark a version of a collection as processed."""
+        self.connection.execute(
+            "INSERT OR IGNORE INTO synced_versions VALUES (?, ?)", (fullname, version)
+        )
+
+    def versions(self, fullname):
+        """Returns the processed versions of a collection."""
+        query = "SELECT version FROM synced_versions WHERE fullname = ?"
+        return {version for (version,) in self.connection.execute(query, (fullname,))}
+
+
 RequirementsFileEntry = namedtuple("RequirementsFileEntry", ["name", "version", "source"])
 
 
@@ -185,6 +363,20 @@ def parse_collections_requirements_file(requirements_file_string):
     return collection_info
 
 
+def is_allowed_import_path(path):
+    """
+    Returns whether `path` resolves to a location within one of the `ALLOWED_IMPORT_PATHS`.
+
+    Symlinks are resolved, so they can't point out of the allowed directories.
+    """
+    realpath = os.path.realpath(path)
+    for allowed_path in settings.ALLOWED_IMPORT_PATHS:
+        allowed_path = os.path.realpath(allowed_path)
+        if os.path.commonpath([realpath, allowed_path]) == allowed_path:
+            return True
+    return False
+
+
 def get_file_obj_from_tarball(tar, file_path, artifact_path, raise_exc=True):
     """
     Get file obj from tarball.
@@ -216,3 +408,82 @@ def get_file_obj_from_tarball(tar, file_path, artifact_path, raise_exc=True):
         raise CollectionFileNotFoundError(file_path=file_path)
 
     return file_obj
+
+
+class LocalCollectionTarball:
+    """
+    A collection tarball copied from storage into a local temporary file.
+
+    Storage backends like S3 stream the file anew on every read. Copying the tarball once lets
+    galaxy-importer and :meth:`read_manifest_and_files` both read the local copy. The copy is made
+    in the current working directory and deleted when the tarball is closed.
+
+    Args:
+        file: The file object of the tarball in storage.
+        name (str): The name of the tarball, used in log and error messages.
+    """
+
+    def __init__(self, file, name):
+        self.name = name
+        self.file = tempfile.NamedTemporaryFile(dir=".", suffix=".tar.gz")
+        shutil.copyfileobj(file, self.file, 1024 * 1024)
+        self.file.seek(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Delete the local copy."""
+        self.file.close()
+
+    def read_manifest_and_files(self):
+        """
+        Read MANIFEST.json and FILES.json from the tarball.
+
+        Returns:
+            tuple: The parsed MANIFEST.json and FILES.json.
+
+        Raises:
+            CollectionFileNotFoundError: If the tarball lacks one of the files.
+        """
+        self.file.seek(0)
+        try:
+            return read_manifest_and_files(self.file, self.name)
+        finally:
+            self.file.seek(0)
+
+
+def read_manifest_and_files(file, name):
+    """
+    Read MANIFEST.json and FILES.json from a collection tarball.
+
+    The tarball is read as a stream up to the last of the two files. Tarballs built by
+    `ansible-galaxy` start with them, so only their head is decompressed.
+
+    Args:
+        file: The file object of the tarball.
+        name (str): The name of the tarball, used in log and error messages.
+
+    Returns:
+        tuple: The parsed MANIFEST.json and FILES.json.
+
+    Raises:
+        CollectionFileNotFoundError: If the tarball lacks one of the files.
+    """
+    log.info(_("Reading MANIFEST.json and FILES.json from {name}").format(name=name))
+    wanted = ("MANIFEST.json", "FILES.json")
+    found = {}
+    with tarfile.open(fileobj=file, mode="r|*") as tar:
+        for member in tar:
+            path = member.name.removeprefix("./")
+            if path in wanted and member.isfile():
+                found[path] = json.load(tar.extractfile(member))
+                if len(found) == len(wanted):
+                    break
+    for path in wanted:
+        if path not in found:
+            raise CollectionFileNotFoundError(file_path=path)
+    return found["MANIFEST.json"], found["FILES.json"]
@@ -105,6 +105,21 @@ legacy_v3_collection_urls = [
         ),
         name="legacy-v3-metadata-collection-versions-list",
     ),
+    # the bulk endpoint is read with POST requests, which aren't redirected either
+    path(
+        "collection_versions/bulk/",
+        views_v3.LegacyCollectionVersionBulkViewSet.as_view({"post": "bulk"}),
+        name="legacy-v3-metadata-collection-versions-bulk",
+    ),
+    path(
+        "collection_versions/changes/",
+        views_v3.redirect_view_generator(
+            {"get": "list"},
+            url="metadata-collection-versions-changes",
+            viewset=views_v3.CollectionVersionChangesViewSet,
+        ),
+        name="legacy-v3-metadata-collection-versions-changes",
+    ),
     path(
         "namespaces/",
         views_v3.redirect_view_generator(
@@ -169,6 +184,16 @@ v3_collection_urls = [
         views_v3.UnpaginatedCollectionVersionViewSet.as_view({"get": "list"}),
         name="metadata-collection-versions-list",
     ),
+    path(
+        "bulk-versions/",
+        views_v3.CollectionVersionBulkViewSet.as_view({"post": "bulk"}),
+        name="metadata-collection-versions-bulk",
+    ),
+    path(
+        "changes/",
+        views_v3.CollectionVersionChangesViewSet.as_view({"get": "list"}),
+        name="metadata-collection-versions-changes",
+    ),
 ]
 
 v3_collection_detail_urls = [
@@ -2,12 +2,23 @@ from contextvars import ContextVar
 
 from django.db.models import CharField, OuterRef, Q, Subquery
 from django.db.models.functions import Cast, JSONObject
+from semantic_version import SimpleSpec
+from semantic_version.base import Always
 
 from pulpcore.plugin.models import RepositoryContent, RepositoryVersion, Task
 
 _collection_deferred_fields = ContextVar("collection_deferred_fields", default=[])
 
 
+# semantic_version.SimpleSpec interpretes "*" as every single available version.
+# This includes more than just ">=0.0.0" which rejects prereleases of "0.0.0".
+class AnsibleSpec(SimpleSpec):
+    def __init__(self, expression):
+        super().__init__(expression)
+        if self.expression == "*":
+            self.clause = Always()
+
+
 def set_collection_deferred_fields(fields):
     """Set which CollectionVersion fields to defer."""
     _collection_deferred_fields.set(fields)
@@ -58,6 +58,7 @@ from .models import (
 from .serializers import (
     AnsibleDistributionSerializer,
     AnsibleNamespaceMetadataSerializer,
+    AnsibleRepositoryImportCollectionsSerializer,
     AnsibleRepositoryMarkSerializer,
     AnsibleRepositoryRebuildSerializer,
     AnsibleRepositorySerializer,
@@ -77,7 +78,10 @@ from .serializers import (
     RoleSerializer,
     TagSerializer,
 )
-from .tasks.collections import rebuild_repository_collection_versions_metadata
+from .tasks.collections import (
+    import_collections,
+    rebuild_repository_collection_versions_metadata,
+)
 from .tasks.collections import sync as collection_sync
 from .tasks.copy import copy_content, copy_or_move_and_sign
 from .tasks.git import synchronize as git_sync
@@ -596,7 +600,7 @@ class AnsibleRepositoryViewSet(RepositoryViewSet, ModifyRepositoryActionMixin, R
                 ],
             },
             {
-                "action": ["modify", "mark", "unmark"],
+                "action": ["modify", "mark", "unmark", "import_collections"],
                 "principal": "authenticated",
                 "effect": "allow",
                 "condition": [
@@ -729,10 +733,18 @@ class AnsibleRepositoryViewSet(RepositoryViewSet, ModifyRepositoryActionMixin, R
         elif isinstance(remote, GitRemote):
             sync_func = git_sync
 
+        exclusive_resources = [repository]
+        shared_resources = [remote]
+        if serializer.validated_data["dry_run"]:
+            # A dry run doesn't change the repository
+            sync_kwargs["dry_run"] = True
+            exclusive_resources = []
+            shared_resources = [repository, remote]
+
         result = dispatch(
             sync_func,
-            exclusive_resources=[repository],
-            shared_resources=[remote],
+            exclusive_resources=exclusive_resources,
+            shared_resources=shared_resources,
             kwargs=sync_kwargs,
         )
         return OperationPostponedResponse(result, request)
@@ -761,6 +773,44 @@ class AnsibleRepositoryViewSet(RepositoryViewSet, ModifyRepositoryActionMixin, R
         )
         return OperationPostponedResponse(result, request)
 
+    @extend_schema(
+        description="Trigger an asynchronous task to import many collection tarballs and add "
+        "them to the repository in a single new version.",
+        responses={202: AsyncOperationResponseSerializer},
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        serializer_class=AnsibleRepositoryImportCollectionsSerializer,
+        parser_classes=(MultiPartParser, FormParser),
+    )
+    def import_collections(self, request, pk, **kwargs):
+        """
+        Dispatches a batch collection import task.
+        """
+        repository = self.get_object()
+        serializer = AnsibleRepositoryImportCollectionsSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        temp_file_pks = []
+        for file in serializer.validated_data["files"]:
+            temp_file = PulpTemporaryFile.init_and_validate(file)
+            temp_file.save()
+            temp_file_pks.append(temp_file.pk)
+
+        result = dispatch(
+            import_collections,
+            exclusive_resources=[repository],
+            kwargs={
+                "repository_pk": repository.pk,
+                "temp_file_pks": temp_file_pks,
+                "path": serializer.validated_data["path"],
+            },
+        )
+        return OperationPostponedResponse(result, request)
+
     @extend_schema(
         description="Trigger an asynchronous task to sign Ansible content.",
         responses={202: AsyncOperationResponseSerializer},
@@ -1,6 +1,7 @@
 """Tests related to sync ansible plugin collection content type."""
 
 import hashlib
+import tarfile
 from pathlib import Path
 
 import pytest
@@ -133,3 +134,55 @@ def test_duplicate_collection_key(
     assert content_unit_1.sha256 == sha256_1
     content_unit_2 = ansible_bindings.ContentCollectionVersionsApi.read(content_unit_href2)
     assert content_unit_2.sha256 == sha256_2
+
+
+@pytest.mark.parallel
+def test_import_collections(
+    ansible_bindings,
+    ansible_repo_factory,
+    ansible_collection_factory,
+    monitor_task,
+    tmp_path,
+):
+    """Import collection tarballs and an archive of tarballs into one repository version."""
+    repository = ansible_repo_factory()
+    namespace = randstr()
+    collections = [
+        ansible_collection_factory(config={"namespace": namespace, "version": version})
+        for version in ("1.0.0", "2.0.0", "3.0.0")
+    ]
+    archive = tmp_path / "collections.tar"
+    with tarfile.open(archive, mode="w") as tar:
+        for collection in collections[1:]:
+            tar.add(collection.filename, arcname=Path(collection.filename).name)
+
+    response = ansible_bindings.RepositoriesAnsibleApi.import_collections(
+        repository.pulp_href, files=[collections[0].filename, str(archive)]
+    )
+    monitor_task(response.task)
+
+    repository = ansible_bindings.RepositoriesAnsibleApi.read(repository.pulp_href)
+    assert repository.latest_version_href.endswith("/versions/1/")
+    content = ansible_bindings.ContentCollectionVersionsApi.list(
+        repository_version=repository.latest_version_href
+    )
+    assert content.count == 3
+    assert {(cv.namespace, cv.name, cv.version) for cv in content.results} == {
+        (namespace, collection.name, collection.version) for collection in collections
+    }
+
+    # Importing a tarball again adds the existing collection version
+    other_repository = ansible_repo_factory()
+    response = ansible_bindings.RepositoriesAnsibleApi.import_collections(
+        other_repository.pulp_href, files=[collections[0].filename]
+    )
+    task = monitor_task(response.task)
+    assert not [
+        pr for pr in task.progress_reports if pr.code == "import.collections.failed" and pr.done
+    ]
+    other_repository = ansible_bindings.RepositoriesAnsibleApi.read(other_repository.pulp_href)
+    other_content = ansible_bindings.ContentCollectionVersionsApi.list(
+        repository_version=other_repository.latest_version_href
+    )
+    assert other_content.count == 1
+    assert other_content.results[0].pulp_href in {cv.pulp_href for cv in content.results}
@@ -232,3 +232,56 @@ def test_sync_signatures_only(
         "ansible.collection_version": 1,
         "ansible.collection_signature": 1,
     }
+
+
+def test_sync_signatures_added_upstream(
+    ansible_bindings,
+    build_and_upload_collection,
+    ascii_armored_detached_signing_service,
+    ansible_repo_factory,
+    ansible_distribution_factory,
+    ansible_collection_remote_factory,
+    monitor_task,
+):
+    """Test that optimized syncs pick up signatures added upstream to known versions."""
+    upstream = ansible_repo_factory()
+    collection, collection_url = build_and_upload_collection(ansible_repo=upstream)
+    distro = ansible_distribution_factory(repository=upstream)
+
+    repository = ansible_repo_factory()
+    remote = ansible_collection_remote_factory(
+        url=distro.client_url,
+        requirements_file=f"collections:\n  - {collection.namespace}.{collection.name}",
+        include_pulp_auth=True,
+    )
+    repository_sync_data = AnsibleRepositorySyncURL(remote=remote.pulp_href)
+    monitor_task(
+        ansible_bindings.RepositoriesAnsibleApi.sync(
+            repository.pulp_href, repository_sync_data
+        ).task
+    )
+
+    # Sign the collection upstream, its listing reports the new signature
+    body = {
+        "content_units": [collection_url],
+        "signing_service": ascii_armored_detached_signing_service.pulp_href,
+    }
+    monitor_task(ansible_bindings.RepositoriesAnsibleApi.sign(upstream.pulp_href, body).task)
+    versions = ansible_bindings.PulpAnsibleApiV3CollectionsVersionsApi.list(
+        collection.name, collection.namespace, distro.base_path
+    )
+    assert [version.signatures_count for version in versions.data] == [1]
+
+    monitor_task(
+        ansible_bindings.RepositoriesAnsibleApi.sync(
+            repository.pulp_href, repository_sync_data
+        ).task
+    )
+    repository = ansible_bindings.RepositoriesAnsibleApi.read(repository.pulp_href)
+    repository_version = ansible_bindings.RepositoriesAnsibleVersionsApi.read(
+        repository.latest_version_href
+    )
+    assert content_counts(repository_version) == {
+        "ansible.collection_version": 1,
+        "ansible.collection_signature": 1,
+    }
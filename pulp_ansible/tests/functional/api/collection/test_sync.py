@@ -367,3 +367,32 @@ def test_sync_progress_report(
             assert pr.total == pr.done
         if pr.message == "Parsing Namespace Metadata":
             assert pr.total == pr.done == 1
+
+
+@pytest.mark.parallel
+def test_sync_dry_run(
+    ansible_bindings,
+    ansible_repo,
+    ansible_collection_remote_factory,
+    monitor_task,
+):
+    """Checks that a dry run reports the changes of a sync without making them."""
+    remote = ansible_collection_remote_factory(
+        url="https://galaxy.ansible.com",
+        requirements_file="collections:\n  - testing.k8s_demo_collection",
+        sync_dependencies=False,
+    )
+    body = {"remote": remote.pulp_href, "dry_run": True}
+    task = monitor_task(
+        ansible_bindings.RepositoriesAnsibleApi.sync(ansible_repo.pulp_href, body).task
+    )
+
+    assert task.created_resources == []
+    assert task.result["added_count"] == len(task.result["added"]) > 0
+    assert task.result["removed"] == []
+    assert {cv["name"] for cv in task.result["added"]} == {"k8s_demo_collection"}
+    assert task.result["artifact_size"] == sum(cv["size"] for cv in task.result["added"])
+    assert 0 < task.result["download_size"] <= task.result["artifact_size"]
+
+    repository = ansible_bindings.RepositoriesAnsibleApi.read(ansible_repo.pulp_href)
+    assert repository.latest_version_href.endswith("/versions/0/")
@@ -219,6 +219,58 @@ class TestCollection:
         assert version["version"] == "1.0.0"
         assert version["href"] == collection_detail["highest_version"]["href"]
 
+    def test_collection_version_bulk(
+        self, http_session, collection_artifact, collection_upload, pulp_dist
+    ):
+        """Test fetching the metadata of several collections' versions in one request."""
+        url = get_galaxy_url(pulp_dist.base_path, "v3/collection_versions/bulk/")
+        fullname = f"{collection_artifact.namespace}.{collection_artifact.name}"
+
+        response = http_session.post(
+            url, json={"collections": [f"{fullname}:>=1.0.0", fullname, "absent.not_present"]}
+        )
+        response.raise_for_status()
+        versions = response.json()
+        assert len(versions) == 1
+        assert versions[0]["version"] == "1.0.0"
+        assert versions[0]["namespace"]["name"] == collection_artifact.namespace
+        assert versions[0]["artifact"]["sha256"]
+        assert "signatures" in versions[0]
+
+        response = http_session.post(url, json={"collections": [f"{fullname}:>1.0.0"]})
+        response.raise_for_status()
+        assert response.json() == []
+
+        response = http_session.post(url, json={"collections": ["not-a-collection"]})
+        assert response.status_code == 400
+
+    def test_collection_version_changes(
+        self, http_session, ansible_collection_factory, collection_upload, pulp_dist
+    ):
+        """Test listing the collection versions changed since a cursor."""
+        url = get_galaxy_url(pulp_dist.base_path, "v3/collection_versions/changes/")
+        response = http_session.get(url)
+        response.raise_for_status()
+        changes = response.json()
+        assert changes["full_sync_required"] is True
+
+        new_artifact = ansible_collection_factory()
+        upload_collection(http_session, new_artifact.filename, pulp_dist.base_path)
+
+        response = http_session.get(url, params={"since": changes["cursor"]})
+        response.raise_for_status()
+        changes_since = response.json()
+        assert changes_since["full_sync_required"] is False
+        assert changes_since["cursor"] != changes["cursor"]
+        assert [(cv["namespace"]["name"], cv["name"]) for cv in changes_since["added"]] == [
+            (new_artifact.namespace, new_artifact.name)
+        ]
+        assert changes_since["removed"] == []
+
+        response = http_session.get(url, params={"since": changes_since["cursor"]})
+        response.raise_for_status()
+        assert response.json()["added"] == []
+
     def test_collection_version_filter_by_q(
         self,
         ansible_bindings,
@@ -0,0 +1,510 @@
+"""
+A local stand-in for a Galaxy v3 API used to benchmark collection syncs.
+
+The server generates a configurable number of namespaces, collections and versions with
+deterministic artifacts and serves them from a background thread. It counts the requests it
+answers so a benchmark can report the request rate a sync achieved.
+
+Example::
+
+    with FakeGalaxy(namespaces=5, collections=20, versions=3) as galaxy:
+        remote = {"name": "bench", "url": galaxy.url}
+"""
+
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+from collections import Counter
+
+from aiohttp import web
+
+PUBLISHED = "2024-01-01T00:00:00.000000Z"
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def build_collection_tarball(namespace, name, version, dependencies=None):
+    """
+    Build a minimal, deterministic collection tarball.
+
+    Args:
+        namespace (str): The namespace of the collection.
+        name (str): The name of the collection.
+        version (str): The version of the collection.
+        dependencies (dict): The collection dependencies, keyed by `namespace.name`.
+
+    Returns:
+        The gzipped tarball as bytes.
+    """
+    readme = f"# {namespace}.{name}\n\nGenerated for benchmarking.\n".encode()
+    files = {
+        "files": [
+            {
+                "name": ".",
+                "ftype": "dir",
+                "chksum_type": None,
+                "chksum_sha256": None,
+                "format": 1,
+            },
+            {
+                "name": "README.md",
+                "ftype": "file",
+                "chksum_type": "sha256",
+                "chksum_sha256": _sha256(readme),
+                "format": 1,
+            },
+        ],
+        "format": 1,
+    }
+    files_json = json.dumps(files).encode()
+    manifest = {
+        "collection_info": {
+            "namespace": namespace,
+            "name": name,
+            "version": version,
+            "authors": ["Pulp Benchmark"],
+            "readme": "README.md",
+            "tags": ["benchmark"],
+            "description": f"Benchmark collection {namespace}.{name}",
+            "license": ["GPL-3.0-or-later"],
+            "license_file": None,
+            "dependencies": dependencies or {},
+            "repository": f"https://example.com/{namespace}/{name}",
+            "documentation": "",
+            "homepage": "",
+            "issues": "",
+        },
+        "file_manifest_file": {
+            "name": "FILES.json",
+            "ftype": "file",
+            "chksum_type": "sha256",
+            "chksum_sha256": _sha256(files_json),
+            "format": 1,
+        },
+        "format": 1,
+    }
+    manifest_json = json.dumps(manifest).encode()
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode="w") as tar:
+            for filename, data in (
+                ("MANIFEST.json", manifest_json),
+                ("FILES.json", files_json),
+                ("README.md", readme),
+            ):
+                info = tarfile.TarInfo(filename)
+                info.size = len(data)
+                info.mtime = 0
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def namespace_metadata(name):
+    """
+    Build the Galaxy representation of a namespace with a matching `metadata_sha256`.
+
+    The digest is calculated the same way `AnsibleNamespaceMetadata` does, over the links in the
+    form Pulp stores them.
+    """
+    links = {"homepage": f"https://example.com/{name}"}
+    metadata = {
+        "name": name,
+        "company": "Pulp Benchmark",
+        "email": "",
+        "description": f"Benchmark namespace {name}",
+        "resources": "",
+        "links": links,
+        "avatar_sha256": None,
+    }
+    digest = _sha256(json.dumps(metadata, sort_keys=True).encode("utf-8"))
+    metadata["links"] = [{"name": key, "url": url} for key, url in links.items()]
+    metadata["metadata_sha256"] = digest
+    return metadata
+
+
+class FakeGalaxy:
+    """
+    A Galaxy v3 API serving generated collections from a background thread.
+
+    Collections are named `<prefix>_ns<i>.<prefix>_c<j>` and get versions `1.0.0`, `1.1.0`, ...
+    With `dependencies` set, every collection depends on up to that many collections generated
+    before it, so dependency resolution is exercised too.
+
+    Args:
+        namespaces (int): The number of namespaces.
+        collections (int): The number of collections per namespace.
+        versions (int): The number of versions per collection.
+        signatures (int): The number of signatures served per collection version.
+        dependencies (int): The number of dependencies per collection.
+        unpaginated (bool): Whether to serve the `collections/all/` and
+            `collection_versions/all/` endpoints. Without them syncs use the paginated listings.
+        page_size (int): The maximum page size of the paginated listings.
+        prefix (str): A prefix for all names, so each run can produce content new to Pulp.
+        host (str): The address to bind to.
+        public_host (str): The host name Pulp uses to reach this server. Defaults to the
+            `PULP_ANSIBLE_FAKE_GALAXY_HOST` environment variable, or `localhost`.
+        port (int): The port to bind to, 0 picks a free port.
+    """
+
+    def __init__(
+        self,
+        namespaces=10,
+        collections=10,
+        versions=3,
+        signatures=0,
+        dependencies=0,
+        unpaginated=True,
+        page_size=100,
+        prefix="bench",
+        host="0.0.0.0",
+        public_host=None,
+        port=0,
+    ):
+        self.unpaginated = unpaginated
+        self.page_size = page_size
+        self.signatures = signatures
+        self.host = host
+        self.public_host = public_host or os.environ.get(
+            "PULP_ANSIBLE_FAKE_GALAXY_HOST", "localhost"
+        )
+        self.port = port
+        self.request_count = 0
+        self.requests_by_endpoint = Counter()
+
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+        self.namespaces = {}
+        self.collections = {}
+        self.artifacts = {}
+        generated = []
+        for i in range(namespaces):
+            namespace = f"{prefix}_ns{i}"
+            self.namespaces[namespace] = namespace_metadata(namespace)
+            for j in range(collections):
+                name = f"{prefix}_c{j}"
+                deps = (
+                    {f"{ns}.{n}": "*" for ns, n in generated[-dependencies:]}
+                    if dependencies
+                    else {}
+                )
+                generated.append((namespace, name))
+                self.collections[(namespace, name)] = [
+                    self._generate_version(namespace, name, f"1.{k}.0", deps)
+                    for k in range(versions)
+                ]
+
+    @property
+    def version_count(self):
+        """The number of collection versions served."""
+        return sum(len(versions) for versions in self.collections.values())
+
+    @property
+    def base_url(self):
+        """The root URL of the server."""
+        return f"http://{self.public_host}:{self.port}"
+
+    @property
+    def url(self):
+        """The URL to use for a CollectionRemote."""
+        return f"{self.base_url}/api/"
+
+    def _generate_version(self, namespace, name, version, dependencies):
+        filename = f"{namespace}-{name}-{version}.tar.gz"
+        tarball = build_collection_tarball(namespace, name, version, dependencies)
+        self.artifacts[filename] = tarball
+        return {
+            "version": version,
+            "filename": filename,
+            "sha256": _sha256(tarball),
+            "size": len(tarball),
+            "dependencies": dependencies,
+        }
+
+    def _collection_href(self, namespace, name):
+        return f"/api/v3/collections/{namespace}/{name}/"
+
+    def _version_summary(self, namespace, name, version):
+        return {
+            "version": version["version"],
+            "href": f"{self._collection_href(namespace, name)}versions/{version['version']}/",
+            "created_at": PUBLISHED,
+            "updated_at": PUBLISHED,
+            "requires_ansible": ">=2.9",
+            "marks": [],
+        }
+
+    def _version_detail(self, namespace, name, version):
+        detail = self._version_summary(namespace, name, version)
+        detail.update(
+            {
+                "artifact": {
+                    "filename": version["filename"],
+                    "sha256": version["sha256"],
+                    "size": version["size"],
+                },
+                "collection": {
+                    "id": f"{namespace}.{name}",
+                    "name": name,
+                    "href": self._collection_href(namespace, name),
+                },
+                "download_url": f"{self.base_url}/download/{version['filename']}",
+                "name": name,
+                "namespace": {
+                    "name": namespace,
+                    "metadata_sha256": self.namespaces[namespace]["metadata_sha256"],
+                },
+                "signatures": [
+                    {
+                        "signature": f"{version['sha256']}-{i}",
+                        "pubkey_fingerprint": f"{i:040x}",
+                        "signing_service": "benchmark",
+                        "pulp_created": PUBLISHED,
+                    }
+                    for i in range(self.signatures)
+                ],
+                "metadata": {
+                    "authors": ["Pulp Benchmark"],
+                    "contents": [],
+                    "dependencies": version["dependencies"],
+                    "description": f"Benchmark collection {namespace}.{name}",
+                    "documentation": "",
+                    "homepage": "",
+                    "issues": "",
+                    "license": ["GPL-3.0-or-later"],
+                    "repository": f"https://example.com/{namespace}/{name}",
+                    "tags": ["benchmark"],
+                },
+                "git_url": None,
+                "git_commit_sha": None,
+            }
+        )
+        return detail
+
+    def _collection(self, namespace, name):
+        versions = self.collections[(namespace, name)]
+        href = self._collection_href(namespace, name)
+        return {
+            "href": href,
+            "namespace": namespace,
+            "name": name,
+            "deprecated": False,
+            "versions_url": f"{href}versions/",
+            "highest_version": {"href": f"{href}versions/{versions[-1]['version']}/"},
+            "created_at": PUBLISHED,
+            "updated_at": PUBLISHED,
+        }
+
+    def _page(self, request, items):
+        limit = min(int(request.query.get("limit", self.page_size)), self.page_size)
+        offset = int(request.query.get("offset", 0))
+        path = request.path
+
+        def link(page_offset):
+            return f"{path}?limit={limit}&offset={page_offset}"
+
+        last = max(0, (len(items) - 1) // limit * limit)
+        return web.json_response(
+            {
+                "meta": {"count": len(items)},
+                "links": {
+                    "first": link(0),
+                    "previous": link(max(0, offset - limit)) if offset else None,
+                    "next": link(offset + limit) if offset + limit < len(items) else None,
+                    "last": link(last),
+                },
+                "data": items[offset : offset + limit],
+            }
+        )
+
+    def _lookup(self, request):
+        key = (request.match_info["namespace"], request.match_info["name"])
+        if key not in self.collections:
+            raise web.HTTPNotFound()
+        return key
+
+    @web.middleware
+    async def _count_requests(self, request, handler):
+        self.request_count += 1
+        route = request.match_info.route.resource
+        self.requests_by_endpoint[route.canonical if route else request.path] += 1
+        return await handler(request)
+
+    async def _root(self, request):
+        return web.json_response({"available_versions": {"v3": "v3/"}})
+
+    async def _v3_root(self, request):
+        return web.json_response({"published": PUBLISHED})
+
+    async def _collections_all(self, request):
+        if not self.unpaginated:
+            raise web.HTTPNotFound()
+        return web.json_response([self._collection(*key) for key in self.collections])
+
+    async def _collection_versions_all(self, request):
+        if not self.unpaginated:
+            raise web.HTTPNotFound()
+        return web.json_response(
+            [
+                self._version_detail(namespace, name, version)
+                for (namespace, name), versions in self.collections.items()
+                for version in versions
+            ]
+        )
+
+    async def _collections(self, request):
+        return self._page(request, [self._collection(*key) for key in self.collections])
+
+    async def _collection_detail(self, request):
+        return web.json_response(self._collection(*self._lookup(request)))
+
+    async def _versions(self, request):
+        namespace, name = self._lookup(request)
+        versions = self.collections[(namespace, name)]
+        return self._page(
+            request, [self._version_summary(namespace, name, version) for version in versions]
+        )
+
+    async def _version(self, request):
+        namespace, name = self._lookup(request)
+        for version in self.collections[(namespace, name)]:
+            if version["version"] == request.match_info["version"]:
+                return web.json_response(self._version_detail(namespace, name, version))
+        raise web.HTTPNotFound()
+
+    async def _docs_blob(self, request):
+        namespace, name = self._lookup(request)
+        readme = f"<h1>{namespace}.{name}</h1>"
+        return web.json_response(
+            {
+                "docs_blob": {
+                    "collection_readme": {"name": "README.md", "html": readme},
+                    "documentation_files": [],
+                    "contents": [],
+                }
+            }
+        )
+
+    async def _namespaces(self, request):
+        namespaces = list(self.namespaces.values())
+        if shas := request.query.get("metadata_sha256__in"):
+            shas = set(shas.split(","))
+            namespaces = [ns for ns in namespaces if ns["metadata_sha256"] in shas]
+        return self._page(request, namespaces)
+
+    async def _namespace(self, request):
+        try:
+            return web.json_response(self.namespaces[request.match_info["namespace"]])
+        except KeyError:
+            raise web.HTTPNotFound()
+
+    async def _download(self, request):
+        try:
+            tarball = self.artifacts[request.match_info["filename"]]
+        except KeyError:
+            raise web.HTTPNotFound()
+        return web.Response(body=tarball, content_type="application/gzip")
+
+    def make_app(self):
+        """Build the aiohttp application serving the generated collections."""
+        app = web.Application(middlewares=[self._count_requests])
+        collection = "/api/v3/collections/{namespace}/{name}/"
+        app.router.add_get("/api/", self._root)
+        app.router.add_get("/api/v3/", self._v3_root)
+        app.router.add_get("/api/v3/collections/all/", self._collections_all)
+        app.router.add_get("/api/v3/collection_versions/all/", self._collection_versions_all)
+        app.router.add_get("/api/v3/collections/", self._collections)
+        app.router.add_get(collection, self._collection_detail)
+        # Pulp requests the collection and namespace details without a trailing slash
+        app.router.add_get(collection.rstrip("/"), self._collection_detail)
+        app.router.add_get(f"{collection}versions/", self._versions)
+        app.router.add_get(f"{collection}versions/{{version}}/", self._version)
+        app.router.add_get(f"{collection}versions/{{version}}/docs-blob/", self._docs_blob)
+        app.router.add_get("/api/v3/namespaces/", self._namespaces)
+        app.router.add_get("/api/v3/namespaces/{namespace}/", self._namespace)
+        app.router.add_get("/api/v3/namespaces/{namespace}", self._namespace)
+        app.router.add_get("/download/{filename}", self._download)
+        return app
+
+    def start(self):
+        """Start serving from a background thread."""
+        started = threading.Event()
+
+        async def serve():
+            self._runner = web.AppRunner(self.make_app())
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = self._runner.addresses[0][1]
+            started.set()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        if not started.wait(timeout=30):
+            raise RuntimeError("The fake Galaxy server did not start.")
+        return self
+
+    def stop(self):
+        """Stop serving and wait for the background thread to finish."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def reset_counters(self):
+        """Reset the request counters."""
+        self.request_count = 0
+        self.requests_by_endpoint.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve generated collections over Galaxy v3.")
+    parser.add_argument("--namespaces", type=int, default=10)
+    parser.add_argument("--collections", type=int, default=10)
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--signatures", type=int, default=0)
+    parser.add_argument("--dependencies", type=int, default=0)
+    parser.add_argument("--paginated-only", action="store_true")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    with FakeGalaxy(
+        namespaces=args.namespaces,
+        collections=args.collections,
+        versions=args.versions,
+        signatures=args.signatures,
+        dependencies=args.dependencies,
+        unpaginated=not args.paginated_only,
+        port=args.port,
+    ) as galaxy:
+        print(f"Serving {galaxy.version_count} collection versions at {galaxy.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
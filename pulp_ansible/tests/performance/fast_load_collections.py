@@ -9,8 +9,11 @@ from pulpcore.plugin.tasking import (  # noqa otherwise E402: module level not a
     dispatch,
 )
 
-from pulp_ansible.app.tasks.test_tasks import (  # noqa otherwise E402: module level not at top of file
-    import_collection_from_path,
+from pulp_ansible.app.models import (  # noqa otherwise E402: module level not at top of file
+    AnsibleRepository,
+)
+from pulp_ansible.app.tasks.collections import (  # noqa otherwise E402: module level not at top of file
+    import_collections,
 )
 
 parser = argparse.ArgumentParser(description="Quickly load collections form a folder.")
@@ -21,16 +24,26 @@ parser.add_argument(
     type=str,
     nargs=1,
     required=True,
-    help="The full path to a director containing collection tarballs.",
+    help="The full path to a directory containing collection tarballs. It has to be within one "
+    "of the ALLOWED_IMPORT_PATHS.",
+)
+parser.add_argument(
+    "--repository",
+    metavar="NAME",
+    type=str,
+    help="The name of a repository to add all collections to in a single version.",
 )
 
 args = parser.parse_args()
 
 
 if __name__ == "__main__":
-    for root, dirs, files in os.walk(args.collections_dir[0]):
-        for file in files:
-            if file.endswith(".tar.gz"):
-                async_result = dispatch(
-                    import_collection_from_path, args=(os.path.join(root, file),)
-                )
+    kwargs = {"path": os.path.abspath(args.collections_dir[0])}
+    exclusive_resources = []
+    if args.repository:
+        repository = AnsibleRepository.objects.get(name=args.repository)
+        kwargs["repository_pk"] = repository.pk
+        exclusive_resources.append(repository)
+    async_result = dispatch(
+        import_collections, exclusive_resources=exclusive_resources, kwargs=kwargs
+    )
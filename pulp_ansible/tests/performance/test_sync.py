@@ -0,0 +1,188 @@
+"""
+End-to-end collection sync benchmarks against a local fake Galaxy server.
+
+The scale of the generated data is controlled through environment variables:
+
+- `PULP_ANSIBLE_BENCHMARK_NAMESPACES` (default 5)
+- `PULP_ANSIBLE_BENCHMARK_COLLECTIONS` collections per namespace (default 20)
+- `PULP_ANSIBLE_BENCHMARK_VERSIONS` versions per collection (default 3)
+- `PULP_ANSIBLE_BENCHMARK_SIGNATURES` signatures per version (default 0)
+- `PULP_ANSIBLE_BENCHMARK_DEPENDENCIES` dependencies per collection (default 0)
+- `PULP_ANSIBLE_BENCHMARK_REPORT` a file to append the JSON results to
+
+Pulp needs to reach the fake server, which listens on all interfaces. Set
+`PULP_ANSIBLE_FAKE_GALAXY_HOST` when Pulp does not run on the same host as the tests.
+
+The per-stage timings and database query counts are only reported when the Pulp under test has
+`ANSIBLE_SYNC_PIPELINE_PROFILE` enabled.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from pulp_ansible.tests.functional.utils import randstr
+from pulp_ansible.tests.performance.fake_galaxy import FakeGalaxy
+
+
+def _scale(name, default):
+    return int(os.environ.get(f"PULP_ANSIBLE_BENCHMARK_{name}", default))
+
+
+class PeakRSSSampler:
+    """
+    Samples the resident memory of the Pulp worker processes visible through /proc.
+
+    `peak` stays None when no worker process can be found, e.g. when Pulp runs in another
+    container than the tests.
+    """
+
+    def __init__(self, match="pulpcore-worker", interval=0.1):
+        self.match = match.encode()
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _worker_rss(self):
+        rss = []
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+                    if self.match not in cmdline.read():
+                        continue
+                with open(f"/proc/{pid}/status") as status:
+                    for line in status:
+                        if line.startswith("VmRSS:"):
+                            rss.append(int(line.split()[1]) * 1024)
+                            break
+            except OSError:
+                continue
+        return rss
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = self._worker_rss()
+            if rss:
+                self.peak = max(self.peak or 0, *rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def report(name, results):
+    """Print the benchmark results and append them to the report file, if one is configured."""
+    print(f"\n{name}")
+    for key, value in results.items():
+        if key != "progress_reports":
+            print(f"  {key}: {value}")
+    stages = []
+    for progress_report in results["progress_reports"]:
+        if progress_report["code"] == "sync.pipeline.stage":
+            stages.append(progress_report)
+        else:
+            print(f"  {progress_report['message']}: {progress_report['done']}")
+    if stages:
+        for stage in stages:
+            print(
+                f"  {stage['message']}: {stage['total']} in, {stage['done']} out, {stage['suffix']}"
+            )
+    else:
+        print("  no stage profile, enable ANSIBLE_SYNC_PIPELINE_PROFILE to record one")
+    if path := os.environ.get("PULP_ANSIBLE_BENCHMARK_REPORT"):
+        with open(path, "a") as report_file:
+            report_file.write(json.dumps({"name": name, **results}) + "\n")
+
+
+@pytest.fixture(params=[True, False], ids=["unpaginated", "paginated"])
+def fake_galaxy(request):
+    """A fake Galaxy serving collections that are new to Pulp."""
+    with FakeGalaxy(
+        namespaces=_scale("NAMESPACES", 5),
+        collections=_scale("COLLECTIONS", 20),
+        versions=_scale("VERSIONS", 3),
+        signatures=_scale("SIGNATURES", 0),
+        dependencies=_scale("DEPENDENCIES", 0),
+        unpaginated=request.param,
+        prefix=randstr(),
+    ) as galaxy:
+        yield galaxy
+
+
+def test_sync_throughput(
+    ansible_bindings,
+    ansible_repository_factory,
+    gen_object_with_cleanup,
+    monitor_task,
+    fake_galaxy,
+):
+    """
+    Sync all collections of the fake Galaxy, then resync them, and report the throughput.
+
+    The first resync is not optimized, so it checks every collection version again. The second
+    one shows the cost of an optimized sync from an unchanged remote.
+    """
+    # Not created by the remote factory, which rate limits the remote
+    remote = gen_object_with_cleanup(
+        ansible_bindings.RemotesCollectionApi,
+        {"name": str(uuid.uuid4()), "url": fake_galaxy.url},
+    )
+    repository = ansible_repository_factory(remote=remote.pulp_href)
+
+    # The fake server never changes, so an optimized resync skips all the work
+    runs = (
+        ("sync", {}),
+        ("resync", {"optimize": False}),
+        ("optimized resync", {}),
+    )
+    for run, body in runs:
+        fake_galaxy.reset_counters()
+        with PeakRSSSampler() as sampler:
+            start = time.monotonic()
+            response = ansible_bindings.RepositoriesAnsibleApi.sync(repository.pulp_href, body)
+            task = monitor_task(response.task)
+            elapsed = time.monotonic() - start
+
+        task_duration = (task.finished_at - task.started_at).total_seconds()
+        report(
+            f"{run} of {fake_galaxy.version_count} collection versions "
+            f"({'unpaginated' if fake_galaxy.unpaginated else 'paginated'})",
+            {
+                "wall_time": round(elapsed, 3),
+                "task_time": round(task_duration, 3),
+                "requests": fake_galaxy.request_count,
+                "requests_per_second": round(fake_galaxy.request_count / task_duration, 1),
+                "peak_worker_rss": sampler.peak,
+                "requests_by_endpoint": dict(fake_galaxy.requests_by_endpoint),
+                "progress_reports": [
+                    {
+                        "message": pr.message,
+                        "code": pr.code,
+                        "done": pr.done,
+                        "total": pr.total,
+                        "suffix": pr.suffix,
+                    }
+                    for pr in task.progress_reports
+                ],
+            },
+        )
+
+    repository = ansible_bindings.RepositoriesAnsibleApi.read(repository.pulp_href)
+    content = ansible_bindings.ContentCollectionVersionsApi.list(
+        repository_version=repository.latest_version_href, limit=1
+    )
+    assert content.count == fake_galaxy.version_count
@@ -0,0 +1,1110 @@
+import asyncio
+import atexit
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
+
+from aiohttp.client_exceptions import ClientResponseError
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from git import Actor, Repo
+from semantic_version import Version
+
+from pulpcore.plugin.models import Artifact, Content, Domain
+from pulpcore.plugin.stages import (
+    ContentSaver,
+    DeclarativeArtifact,
+    DeclarativeContent,
+    QueryExistingContents,
+)
+from pulpcore.plugin.util import get_domain
+
+from pulp_ansible.app.models import (
+    AnsibleNamespaceMetadata,
+    AnsibleRepository,
+    Collection,
+    CollectionRemote,
+    CollectionSyncCheckpoint,
+    CollectionVersion,
+    CollectionVersionSignature,
+)
+from pulp_ansible.app.tasks.collections import (
+    AnsibleContentSaver,
+    CollectionSyncFirstStage,
+    DocsBlobDownloader,
+    SignatureAndMarkStage,
+    SyncCheckpointStage,
+    extract_collection_version_metadata,
+    plan_sync,
+    sync,
+)
+from pulp_ansible.app.tasks.utils import (
+    CollectionVersionMetadataIndex,
+    RequirementsFileEntry,
+    SyncedVersions,
+)
+from pulp_ansible.tests.performance.fake_galaxy import FakeGalaxy
+
+from .utils import FakeProgressReport, build_cv, randstr, run_stage
+
+
+def _first_stage():
+    """Build a first stage without touching the database or the remote."""
+    return CollectionSyncFirstStage.__new__(CollectionSyncFirstStage)
+
+
+class TestRunMetadataCoroutines(SimpleTestCase):
+    """Test the bounded metadata work queue of the collection sync first stage."""
+
+    def _first_stage(self, download_concurrency):
+        first_stage = _first_stage()
+        first_stage.remote = SimpleNamespace(
+            download_concurrency=download_concurrency, DEFAULT_DOWNLOAD_CONCURRENCY=10
+        )
+        return first_stage
+
+    def _progress_report(self):
+        """A progress report recording the suffix of each save."""
+        pb = SimpleNamespace(suffix=None, saved_suffixes=[])
+
+        async def asave():
+            pb.saved_suffixes.append(pb.suffix)
+
+        pb.asave = asave
+        return pb
+
+    def test_concurrency_is_bounded(self):
+        """No more coroutines than the remote's download concurrency run at the same time."""
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return []
+
+        for download_concurrency, expected_peak in ((2, 2), (None, 10)):
+            with self.subTest(download_concurrency=download_concurrency):
+                first_stage = self._first_stage(download_concurrency)
+                peak = 0
+                coros = (work() for _ in range(20))
+                asyncio.run(first_stage._run_metadata_coroutines(coros, self._progress_report()))
+                self.assertEqual(peak, expected_peak)
+
+    def test_queue_depth_is_saved(self):
+        """The queued and in flight counts are saved on the progress report, and then cleared."""
+        first_stage = self._first_stage(1)
+
+        async def work(children=0):
+            return [work() for _ in range(children)]
+
+        pb = self._progress_report()
+        asyncio.run(first_stage._run_metadata_coroutines([work(children=2)], pb))
+        self.assertEqual(
+            pb.saved_suffixes,
+            ["1 in flight, 0 queued", "1 in flight, 1 queued", "1 in flight, 0 queued", None],
+        )
+
+    def test_returned_coroutines_are_run_first(self):
+        """Coroutines returned by a finished coroutine run before the remaining input."""
+        first_stage = self._first_stage(1)
+        order = []
+
+        async def work(name, children=()):
+            order.append(name)
+            return [work(child) for child in children]
+
+        coros = [work("a", children=["a1", "a2"]), work("b")]
+        asyncio.run(first_stage._run_metadata_coroutines(coros, self._progress_report()))
+        self.assertEqual(order, ["a", "a1", "a2", "b"])
+
+    def test_errors_are_raised(self):
+        """An exception in one coroutine is raised and the other coroutines are cancelled."""
+        first_stage = self._first_stage(5)
+
+        async def fail():
+            raise ValueError("boom")
+
+        async def hang():
+            await asyncio.sleep(60)
+            return []
+
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                first_stage._run_metadata_coroutines(
+                    [hang(), fail(), hang()], self._progress_report()
+                )
+            )
+
+
+class TestFetchAllPages(SimpleTestCase):
+    """Test fetching the pages of a paginated listing."""
+
+    def _page_downloader(self, total, served_page_size, requests):
+        """Serve a v3 listing of `total` items, capping pages at `served_page_size` items."""
+
+        def page_downloader(page_num, page_size):
+            requests.append((page_num, page_size))
+            offset = (page_num - 1) * page_size
+            data = list(range(offset, min(offset + min(page_size, served_page_size), total)))
+            next_link = "next" if offset + len(data) < total else None
+            page = {"meta": {"count": total}, "links": {"next": next_link}, "data": data}
+            return SimpleNamespace(run=mock.AsyncMock(return_value=page))
+
+        return page_downloader
+
+    def _fetch_all_pages(self, page_downloader):
+        with mock.patch(
+            "pulp_ansible.app.tasks.collections.parse_metadata", side_effect=lambda page: page
+        ):
+            return asyncio.run(_first_stage()._fetch_all_pages(3, page_downloader))
+
+    def test_single_page(self):
+        """A listing that fits on one page is fetched with a single request."""
+        requests = []
+        items = self._fetch_all_pages(self._page_downloader(42, 100, requests))
+        self.assertEqual(items, list(range(42)))
+        self.assertEqual(requests, [(1, 100)])
+
+    def test_remaining_pages_from_count(self):
+        """All pages are requested after the first one, using the page size actually served."""
+        requests = []
+        items = self._fetch_all_pages(self._page_downloader(250, 30, requests))
+        self.assertEqual(items, list(range(250)))
+        self.assertEqual(requests, [(1, 100)] + [(num, 30) for num in range(2, 10)])
+
+
+class TestFetchBulkCollectionVersions(SimpleTestCase):
+    """Test the fallback for remotes without the bulk collection versions endpoint."""
+
+    def _fetch(self, status):
+        first_stage = _first_stage()
+        first_stage._bulk_requested = set()
+        first_stage._bulk_versions_url = "https://galaxy.example.com/api/v3/bulk/"
+        first_stage._unpaginated_collection_version_metadata = mock.Mock()
+        downloader = mock.Mock()
+        downloader.run = mock.AsyncMock(side_effect=ClientResponseError(None, (), status=status))
+        first_stage.remote = mock.Mock(get_downloader=mock.Mock(return_value=downloader))
+        requirements = [RequirementsFileEntry(name="foo.bar", version="*", source=None)]
+        return asyncio.run(first_stage._fetch_bulk_collection_versions(requirements))
+
+    def test_falls_back_on_client_errors(self):
+        """Client errors and 501 mean the remote has no bulk endpoint."""
+        for status in (400, 401, 403, 404, 405, 501):
+            with self.subTest(status=status):
+                self.assertFalse(self._fetch(status))
+
+    def test_raises_other_errors(self):
+        """Throttling and server errors fail the sync."""
+        for status in (429, 500, 503):
+            with self.subTest(status=status):
+                with self.assertRaises(ClientResponseError):
+                    self._fetch(status)
+
+    def test_dependencies_are_requested_together(self):
+        """The dependencies requested at once are fetched with a single request."""
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".json")
+        self.addCleanup(tmp.close)
+        tmp.write("[]")
+        tmp.flush()
+        requests = []
+
+        def get_downloader(url, post_data):
+            requests.append(post_data["collections"])
+            return mock.Mock(run=mock.AsyncMock(return_value=SimpleNamespace(path=tmp.name)))
+
+        first_stage = _first_stage()
+        first_stage.remote = mock.Mock(get_downloader=get_downloader)
+        first_stage._bulk_versions_url = "https://galaxy.example.com/api/v3/bulk/"
+        first_stage._bulk_requested = set()
+        first_stage._bulk_versions = defaultdict(set)
+        first_stage._bulk_pending = []
+        first_stage._bulk_flush = None
+        first_stage._unpaginated_collection_version_metadata = CollectionVersionMetadataIndex()
+        first_stage._unpaginated_collection_deprecated = {
+            ("foo", name): False for name in ("a", "b", "c", "d")
+        }
+        first_stage.sync_highest_versions = False
+        first_stage.parsing_metadata_progress_bar = FakeProgressReport(total=0)
+
+        async def resolve(*requirements):
+            await asyncio.gather(
+                *(
+                    first_stage._fetch_collection_metadata(
+                        RequirementsFileEntry(name=name, version=version, source=None)
+                    )
+                    for name, version in requirements
+                )
+            )
+
+        async def sync():
+            await resolve(("foo.a", "*"), ("foo.b", ">=1.0.0"), ("foo.c", "*"))
+            await resolve(("foo.d", "*"), ("foo.a", "*"))
+
+        asyncio.run(sync())
+        self.assertEqual(requests, [["foo.a:*", "foo.b:>=1.0.0", "foo.c:*"], ["foo.d:*"]])
+
+
+class TestFindChangedCollections(SimpleTestCase):
+    """Test syncing the collection versions the changes feed reports."""
+
+    def test_excludes_are_fetched(self):
+        """The remote's excludes are fetched, so they apply to the changed versions too."""
+        tmp = tempfile.NamedTemporaryFile(mode="w", suffix=".json")
+        self.addCleanup(tmp.close)
+        json.dump({"collections": [{"name": "foo.bar", "version": "1.0.0"}]}, tmp)
+        tmp.flush()
+
+        first_stage = _first_stage()
+        first_stage.exclude_info = {}
+        first_stage.namespace_shas = {}
+        first_stage._api_version = 3
+        first_stage._changes_root_endpoint = "https://galaxy.example.com/api/v3"
+        first_stage.remote = SimpleNamespace(url="https://galaxy.example.com/")
+        first_stage.changes = {
+            "deprecated": [],
+            "namespaces": [],
+            "added": [{"href": "/api/v3/collections/foo/bar/versions/1.0.0/"}],
+        }
+        first_stage.parsing_metadata_progress_bar = mock.Mock(total=0, asave=mock.AsyncMock())
+        downloader = mock.Mock(run=mock.AsyncMock(return_value=SimpleNamespace(path=tmp.name)))
+        first_stage._metadata_downloader = mock.Mock(return_value=downloader)
+        first_stage._add_collection_version = mock.Mock()
+
+        coros = asyncio.run(first_stage._find_changed_collections())
+        first_stage._metadata_downloader.assert_called_once_with(
+            url="https://galaxy.example.com/api/v3/excludes/",
+            silence_errors_for_response_status_codes={404},
+        )
+        self.assertEqual(list(first_stage.exclude_info), ["foo.bar"])
+        self.assertIn(Version("1.0.0"), first_stage.exclude_info["foo.bar"])
+        self.assertEqual(len(coros), 1)
+
+
+class TestExtractCollectionVersionMetadata(SimpleTestCase):
+    """Test reading the sync metadata from a collection tarball."""
+
+    def _d_content(self, members):
+        """Build a declarative content whose artifact is a tarball with the given members."""
+        tmp = tempfile.NamedTemporaryFile(suffix=".tar.gz")
+        self.addCleanup(tmp.close)
+        with tarfile.open(fileobj=tmp, mode="w:gz") as tar:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        tmp.flush()
+
+        class File:
+            name = tmp.name
+
+            def open(self):
+                return open(tmp.name, "rb")
+
+        d_artifact = mock.Mock(artifact=SimpleNamespace(file=File()))
+        return SimpleNamespace(d_artifacts=[d_artifact], extra_data={})
+
+    def test_extract(self):
+        """FILES.json is returned raw, MANIFEST.json parsed and requires_ansible read."""
+        manifest = {"collection_info": {"namespace": "foo", "name": "bar"}}
+        d_content = self._d_content(
+            {
+                "MANIFEST.json": json.dumps(manifest).encode(),
+                "FILES.json": b'{"files": []}',
+                "meta/runtime.yml": b'requires_ansible: ">=2.13"\n',
+            }
+        )
+        metadata = extract_collection_version_metadata(d_content)
+        self.assertEqual(metadata["files_raw"], '{"files": []}')
+        self.assertEqual(metadata["manifest"], manifest)
+        self.assertEqual(metadata["requires_ansible"], ">=2.13")
+
+    def test_extract_without_runtime_metadata(self):
+        """requires_ansible is left out if the collection has no meta/runtime.yml."""
+        d_content = self._d_content(
+            {"./MANIFEST.json": b'{"collection_info": {}}', "./FILES.json": b"{}"}
+        )
+        metadata = extract_collection_version_metadata(d_content)
+        self.assertNotIn("requires_ansible", metadata)
+
+
+class TestSyncCheckpoints(TestCase):
+    """Test resuming failed collection syncs from their checkpoints."""
+
+    def setUp(self):
+        self.repository = AnsibleRepository.objects.create(name=randstr())
+        self.remote = CollectionRemote.objects.create(
+            name=randstr(), url="https://galaxy.example.com/"
+        )
+        self.collection_version = build_cv("foo", "bar", "1.0.0")
+
+    def _first_stage(self, use_checkpoints=True):
+        first_stage = _first_stage()
+        first_stage.repository = self.repository
+        first_stage.remote = self.remote
+        first_stage.latest_repository_version = self.repository.latest_version()
+        first_stage.use_checkpoints = use_checkpoints
+        first_stage.signed_only = False
+        first_stage.namespace_shas = {}
+        return first_stage
+
+    def _checkpoint(self, remote=None):
+        CollectionSyncCheckpoint.objects.create(
+            repository=self.repository,
+            remote=remote or self.remote,
+            content=self.collection_version,
+        )
+
+    def test_saved_content_is_checkpointed(self):
+        """The content that passed the savers is recorded, the unsaved content isn't."""
+        unsaved = CollectionVersion(namespace="foo", name="baz", version="1.0.0")
+        items = [
+            DeclarativeContent(content=self.collection_version),
+            DeclarativeContent(content=unsaved),
+        ]
+
+        emitted = async_to_sync(run_stage)(SyncCheckpointStage(self._first_stage()), items)
+        self.assertEqual(emitted, items)
+        self.assertEqual(
+            list(CollectionSyncCheckpoint.objects.values_list("content", flat=True)),
+            [self.collection_version.pk],
+        )
+
+    def test_nothing_is_checkpointed_without_checkpoints(self):
+        """Nothing is recorded once the first stage stopped using checkpoints."""
+        first_stage = self._first_stage(use_checkpoints=False)
+        items = [DeclarativeContent(content=self.collection_version)]
+
+        async_to_sync(run_stage)(SyncCheckpointStage(first_stage), items)
+        self.assertFalse(CollectionSyncCheckpoint.objects.exists())
+
+    def test_retried_sync_knows_checkpointed_versions(self):
+        """The versions a failed sync from the same remote saved are known to the retry."""
+        self._checkpoint()
+        first_stage = self._first_stage()
+
+        known = async_to_sync(first_stage._get_known_collection_versions)(
+            "foo", "bar", ["1.0.0", "2.0.0"]
+        )
+        self.assertEqual(known, {"1.0.0": (self.collection_version, [])})
+
+        first_stage.use_checkpoints = False
+        known = async_to_sync(first_stage._get_known_collection_versions)("foo", "bar", ["1.0.0"])
+        self.assertEqual(known, {})
+
+    def test_checkpoints_of_other_remotes_are_ignored(self):
+        """Checkpoints only apply to retries from the remote that recorded them."""
+        other_remote = CollectionRemote.objects.create(
+            name=randstr(), url="https://other.example.com/"
+        )
+        self._checkpoint(remote=other_remote)
+
+        known = async_to_sync(self._first_stage()._get_known_collection_versions)(
+            "foo", "bar", ["1.0.0"]
+        )
+        self.assertEqual(known, {})
+
+    @mock.patch("pulp_ansible.app.tasks.collections.set_collection_deferred_fields")
+    @mock.patch("pulp_ansible.app.tasks.collections.AnsibleDeclarativeVersion")
+    @mock.patch("pulp_ansible.app.tasks.collections.CollectionSyncFirstStage")
+    def test_checkpoints_are_cleared_on_success(self, first_stage, declarative_version, _):
+        """A finished sync clears the checkpoints, a failed one keeps them for its retry."""
+        first_stage.return_value = mock.Mock(should_sync=True, changes=None, sync_cursor=None)
+        self._checkpoint()
+
+        declarative_version.return_value.create.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            sync(self.remote.pk, self.repository.pk, mirror=False, optimize=True)
+        self.assertTrue(CollectionSyncCheckpoint.objects.exists())
+
+        declarative_version.return_value.create.side_effect = None
+        declarative_version.return_value.create.return_value = None
+        sync(self.remote.pk, self.repository.pk, mirror=False, optimize=True)
+        self.assertFalse(CollectionSyncCheckpoint.objects.exists())
+
+
+class TestSignatureAndMarkStage(TestCase):
+    """Test saving the signatures and marks attached to synced collection versions."""
+
+    def setUp(self):
+        self.existing = build_cv("foo", "bar", "1.0.0")
+        self.existing_signature = CollectionVersionSignature.objects.create(
+            signed_collection=self.existing,
+            data="existing",
+            digest=randstr(),
+            pubkey_fingerprint="0" * 40,
+        )
+
+    def _signature(self, fingerprint):
+        return {"signature": f"signature by {fingerprint}", "pubkey_fingerprint": fingerprint}
+
+    def _save(self, items):
+        """Run `items` through the savers around SignatureAndMarkStage, as a sync does."""
+
+        async def run():
+            emitted = items
+            for stage in (
+                QueryExistingContents(),
+                ContentSaver(),
+                SignatureAndMarkStage(),
+                QueryExistingContents(),
+                ContentSaver(),
+            ):
+                emitted = await run_stage(stage, emitted)
+            return emitted
+
+        return async_to_sync(run)()
+
+    def test_signatures_and_marks_are_linked(self):
+        """Signatures and marks are saved for both new and already saved collection versions."""
+        collection, _ = Collection.objects.get_or_create(namespace="foo", name="baz")
+        new = CollectionVersion(
+            collection=collection, namespace="foo", name="baz", version="1.0.0", sha256=randstr()
+        )
+        # A sync parses an unsaved copy of collection versions that are already saved
+        existing_copy = CollectionVersion(
+            collection=self.existing.collection,
+            namespace="foo",
+            name="bar",
+            version="1.0.0",
+            sha256=self.existing.sha256,
+        )
+        items = [
+            DeclarativeContent(
+                content=new,
+                extra_data={"signatures": [self._signature("1" * 40)], "marks": ["new"]},
+            ),
+            DeclarativeContent(
+                content=existing_copy,
+                extra_data={
+                    "signatures": [self._signature("0" * 40), self._signature("2" * 40)],
+                    "marks": ["existing"],
+                },
+            ),
+        ]
+
+        emitted = self._save(items)
+
+        self.assertEqual(len(emitted), 7)
+        self.assertEqual([d_content.extra_data for d_content in items], [{}, {}])
+        new = CollectionVersion.objects.get(namespace="foo", name="baz")
+        self.assertEqual(
+            sorted(new.signatures.values_list("pubkey_fingerprint", "data")),
+            [("1" * 40, f"signature by {'1' * 40}")],
+        )
+        self.assertEqual(list(new.marks.values_list("value", flat=True)), ["new"])
+        self.assertEqual(
+            sorted(self.existing.signatures.values_list("pubkey_fingerprint", flat=True)),
+            ["0" * 40, "2" * 40],
+        )
+        self.assertEqual(
+            self.existing.signatures.get(pubkey_fingerprint="0" * 40), self.existing_signature
+        )
+        self.assertEqual(list(self.existing.marks.values_list("value", flat=True)), ["existing"])
+
+    def test_other_content_is_passed_on(self):
+        """Content other than collection versions is passed on without its extra data."""
+        namespace = AnsibleNamespaceMetadata(name="foo", company="", metadata_sha256=randstr())
+        items = [DeclarativeContent(content=namespace, extra_data={"marks": ["ignored"]})]
+
+        emitted = async_to_sync(run_stage)(SignatureAndMarkStage(), items)
+        self.assertEqual(emitted, items)
+        self.assertEqual(items[0].extra_data, {})
+
+
+class TestPostSaveUpdate(TestCase):
+    """Test the batched files and docs_blob UPDATE of AnsibleContentSaver."""
+
+    def setUp(self):
+        self.old_docs_blob = {"collection_readme": {"html": "<p>old</p>"}}
+        self.collection_versions = [build_cv("foo", "bar", f"{i}.0.0") for i in range(5)]
+        CollectionVersion.objects.update(docs_blob=self.old_docs_blob)
+
+    def _d_content(self, collection_version, docs_blob=True, adding=True):
+        files = {
+            "files": [{"name": f"README-{collection_version.version}.md", "chksum_sha256": None}],
+            "format": 1,
+        }
+        extra_data = {
+            "pre_save_adding": adding,
+            "pre_save_pulp_id": collection_version.pulp_id,
+            "files_raw": json.dumps(files, ensure_ascii=False),
+        }
+        if docs_blob:
+            blob = {
+                "docs_blob": {
+                    "collection_readme": {"name": "README.md", "html": "<p>caf\u00e9 ☕ \\n</p>"},
+                    "contents": [{"content_name": collection_version.version, "doc": None}],
+                }
+            }
+            extra_data["docs_blob"] = zlib.compress(json.dumps(blob).encode("utf-8"))
+        return DeclarativeContent(content=collection_version, extra_data=extra_data)
+
+    def _orm_saved(self, d_content):
+        """Returns the files and docs_blob the ORM stores for the documents of `d_content`."""
+        reference = build_cv("ref", "ref", d_content.content.version)
+        files = json.loads(d_content.extra_data["files_raw"])
+        docs_blob = self.old_docs_blob
+        if "docs_blob" in d_content.extra_data:
+            docs_blob = json.loads(zlib.decompress(d_content.extra_data["docs_blob"]))["docs_blob"]
+        CollectionVersion.objects.filter(pk=reference.pk).update(files=files, docs_blob=docs_blob)
+        return self._stored(reference)
+
+    def _stored(self, collection_version):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT files::text, docs_blob::text FROM ansible_collectionversion"
+                " WHERE content_ptr_id = %s",
+                [str(collection_version.pk)],
+            )
+            return cursor.fetchone()
+
+    def _post_save(self, max_bytes):
+        """Run `_post_save`, returning the stored documents, the expected ones and the UPDATEs."""
+        cvs = self.collection_versions
+        batch = [
+            self._d_content(cvs[0]),
+            self._d_content(cvs[1], docs_blob=False),
+            self._d_content(cvs[2], adding=False),
+            None,
+            self._d_content(cvs[3]),
+        ]
+        expected = {cv.pk: self._stored(cv) for cv in cvs}
+        for d_content in (batch[0], batch[1], batch[4]):
+            expected[d_content.content.pk] = self._orm_saved(d_content)
+        saver = AnsibleContentSaver.__new__(AnsibleContentSaver)
+        saver.POST_SAVE_UPDATE_MAX_BYTES = max_bytes
+
+        with mock.patch.object(
+            AnsibleContentSaver,
+            "_bulk_update_files_and_docs_blob",
+            wraps=AnsibleContentSaver._bulk_update_files_and_docs_blob,
+        ) as update:
+            saver._post_save(batch)
+
+        return {cv.pk: self._stored(cv) for cv in cvs}, expected, update.call_args_list
+
+    def test_single_update(self):
+        """All documents of a batch are written by one UPDATE, as the ORM stores them."""
+        stored, expected, updates = self._post_save(AnsibleContentSaver.POST_SAVE_UPDATE_MAX_BYTES)
+        self.assertEqual(stored, expected)
+        self.assertEqual([len(call.args[1]) for call in updates], [3])
+
+    def test_flushed_updates(self):
+        """Documents exceeding the size bound are flushed, and stored as the ORM stores them."""
+        stored, expected, updates = self._post_save(1)
+        self.assertEqual(stored, expected)
+        self.assertEqual([len(call.args[1]) for call in updates], [1, 1, 1])
+
+
+class TestGetOrCreateCollections(TestCase):
+    """Test looking up and creating the Collections of a save batch in bulk."""
+
+    def test_existing_collections_are_reused(self):
+        """Only the requested pairs are returned, reusing the existing Collections."""
+        existing = Collection.objects.create(namespace="foo", name="bar")
+        Collection.objects.create(namespace="baz", name="qux")
+
+        collections = AnsibleContentSaver._get_or_create_collections(
+            {("foo", "bar"), ("foo", "qux"), ("baz", "bar")}
+        )
+        self.assertEqual(set(collections), {("foo", "bar"), ("foo", "qux"), ("baz", "bar")})
+        self.assertEqual(collections[("foo", "bar")], existing)
+        self.assertEqual(Collection.objects.count(), 4)
+
+    def test_many_collections(self):
+        """Collections are looked up and created for more pairs than fit in one query."""
+        Collection.objects.create(namespace="ns0", name="c0")
+        keys = {(f"ns{i % 3}", f"c{i}") for i in range(1200)}
+
+        collections = AnsibleContentSaver._get_or_create_collections(keys)
+        self.assertEqual(set(collections), keys)
+        self.assertEqual(
+            {(c.namespace, c.name) for c in Collection.objects.all()},
+            keys,
+        )
+
+    def test_collections_of_other_domains_are_ignored(self):
+        """Collections are only reused from the current domain."""
+        domain = Domain.objects.create(
+            name=randstr(),
+            storage_class="pulpcore.app.models.storage.FileSystem",
+            storage_settings={"MEDIA_ROOT": "/var/lib/pulp/media/"},
+        )
+        other = Collection.objects.create(namespace="foo", name="bar", pulp_domain=domain)
+
+        collections = AnsibleContentSaver._get_or_create_collections({("foo", "bar")})
+        self.assertNotEqual(collections[("foo", "bar")], other)
+        self.assertEqual(collections[("foo", "bar")].pulp_domain, get_domain())
+
+    def test_concurrently_created_collections_are_reused(self):
+        """Collections another sync created in the meantime are reused instead of failing."""
+        bulk_create = Collection.objects.bulk_create
+        concurrent = []
+
+        def create_concurrently(objs, **kwargs):
+            concurrent.append(Collection.objects.create(namespace="foo", name="bar"))
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Collection.objects, "bulk_create", side_effect=create_concurrently):
+            collections = AnsibleContentSaver._get_or_create_collections(
+                {("foo", "bar"), ("foo", "baz")}
+            )
+        self.assertEqual(collections[("foo", "bar")], concurrent[0])
+        self.assertEqual(Collection.objects.count(), 2)
+
+
+class TestSkipKnownVersions(TestCase):
+    """Test reusing the collection versions a paginated sync finds in the repository."""
+
+    def setUp(self):
+        self.collection_version = build_cv("foo", "bar", "1.0.0")
+        self.signature = CollectionVersionSignature.objects.create(
+            signed_collection=self.collection_version,
+            data="signature",
+            digest=randstr(),
+            pubkey_fingerprint=randstr(),
+        )
+        self.repository = AnsibleRepository.objects.create(name=randstr())
+        with self.repository.new_version() as new_version:
+            new_version.add_content(
+                Content.objects.filter(pk__in=[self.collection_version.pk, self.signature.pk])
+            )
+
+    def _first_stage(self):
+        first_stage = _first_stage()
+        first_stage.remote = SimpleNamespace(url="https://galaxy.example.com/")
+        first_stage.optimize = True
+        first_stage.sync_highest_versions = False
+        first_stage.latest_repository_version = self.repository.latest_version()
+        first_stage.use_checkpoints = False
+        first_stage.signed_only = False
+        first_stage.namespace_shas = {}
+        first_stage.already_synced = SyncedVersions()
+        first_stage.exclude_info = {}
+        first_stage.add_dependents = False
+        first_stage.parsing_metadata_progress_bar = FakeProgressReport(total=0)
+        first_stage.emitted = []
+        first_stage.put = mock.AsyncMock(side_effect=first_stage.emitted.append)
+        first_stage._get_paginated_collection_api = mock.AsyncMock(
+            return_value=("https://galaxy.example.com/api/v3/collections/", 3)
+        )
+        first_stage._metadata_downloader = mock.Mock(return_value=mock.Mock(run=mock.AsyncMock()))
+        first_stage._fetch_collection_version_metadata = mock.AsyncMock(return_value=[])
+        return first_stage
+
+    @mock.patch(
+        "pulp_ansible.app.tasks.collections.parse_metadata", return_value={"deprecated": False}
+    )
+    def _sync(self, versions, _):
+        """Sync foo.bar from a remote listing `versions`, returning the first stage."""
+        first_stage = self._first_stage()
+        first_stage._fetch_all_pages = mock.AsyncMock(return_value=versions)
+
+        async def fetch():
+            for coro in await first_stage._fetch_paginated_collection_metadata("bar", "foo", "*"):
+                await coro
+
+        async_to_sync(fetch)()
+        return first_stage
+
+    def _fetched_urls(self, first_stage):
+        return [
+            call.args[1] for call in first_stage._fetch_collection_version_metadata.call_args_list
+        ]
+
+    def test_known_version_is_reused(self):
+        """Known versions with as many signatures as upstream carry their marks and signatures."""
+        first_stage = self._sync(
+            [
+                {"version": "1.0.0", "signatures_count": 1, "marks": ["certified"]},
+                {"version": "2.0.0", "signatures_count": 0, "marks": []},
+            ]
+        )
+
+        self.assertEqual(
+            self._fetched_urls(first_stage),
+            ["https://galaxy.example.com/api/v3/collections/foo/bar/versions/2.0.0/"],
+        )
+        cv, signature, mark = [d_content.content for d_content in first_stage.emitted]
+        self.assertEqual(cv, self.collection_version)
+        self.assertEqual(signature, self.signature)
+        self.assertEqual(mark.marked_collection, self.collection_version)
+        self.assertEqual(mark.value, "certified")
+        self.assertIn(("foo.bar", "1.0.0"), first_stage.already_synced)
+
+    def test_known_version_with_changed_signatures_is_fetched(self):
+        """Known versions are fetched again when upstream reports a different signature count."""
+        for versions in (
+            [{"version": "1.0.0", "signatures_count": 2, "marks": []}],
+            [{"version": "1.0.0", "signatures_count": 0, "marks": []}],
+            [{"version": "1.0.0", "marks": []}],
+        ):
+            with self.subTest(versions=versions):
+                first_stage = self._sync(versions)
+                self.assertEqual(
+                    self._fetched_urls(first_stage),
+                    ["https://galaxy.example.com/api/v3/collections/foo/bar/versions/1.0.0/"],
+                )
+                self.assertEqual(first_stage.emitted, [])
+
+
+class TestDryRun(TestCase):
+    """Test planning a sync without running it."""
+
+    @mock.patch("pulp_ansible.app.tasks.collections.declarative_content_from_git_repo")
+    def test_git_versions_are_not_built(self, build):
+        """Collection versions served with a git_url are noted, but not cloned and built."""
+        first_stage = _first_stage()
+        first_stage.dry_run = True
+        first_stage.git_build_executor = None
+        first_stage.put = mock.AsyncMock()
+        version_metadata = {
+            "namespace": {"name": "foo"},
+            "name": "bar",
+            "version": "1.0.0",
+            "git_url": "https://git.example.com/foo/bar.git",
+            "git_commit_sha": "0123abc",
+        }
+
+        self.assertEqual(
+            asyncio.run(first_stage._add_collection_version_from_git(version_metadata)), []
+        )
+        build.assert_not_called()
+        self.assertIsNone(first_stage.git_build_executor)
+        d_content = first_stage.put.call_args.args[0]
+        self.assertEqual(
+            (d_content.content.namespace, d_content.content.name, d_content.content.version),
+            ("foo", "bar", "1.0.0"),
+        )
+        self.assertEqual(
+            d_content.extra_data,
+            {"git_url": "https://git.example.com/foo/bar.git", "git_ref": "0123abc"},
+        )
+
+
+class FakeGalaxyTestCase(TestCase):
+    """Base class for tests that download from a local fake Galaxy."""
+
+    galaxy_options = {}
+
+    def setUp(self):
+        # Downloads are written to the working directory, as in a task
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmp.name)
+        self.working_directory = tmp.name
+        working_directory = self.settings(WORKING_DIRECTORY=tmp.name)
+        working_directory.enable()
+        self.addCleanup(working_directory.disable)
+
+        # The pipeline runs on the event loop of the thread, as in a task
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+        # The pipeline queries the database from the thread of sync_to_async
+        self.addCleanup(self.loop.run_until_complete, sync_to_async(connections.close_all)())
+
+        self.galaxy = FakeGalaxy(host="127.0.0.1", **self.galaxy_options).start()
+        self.addCleanup(self.galaxy.stop)
+
+    def _remote(self, **kwargs):
+        """Create a remote of the fake Galaxy, closing its session once the test is done."""
+        remote = CollectionRemote.objects.create(name=randstr(), url=self.galaxy.url, **kwargs)
+        self.addCleanup(self._close_session, remote)
+        return remote
+
+    def _close_session(self, remote):
+        factory = remote.download_factory
+        atexit.unregister(factory._session_cleanup)
+        self.loop.run_until_complete(factory._session.close())
+
+
+@mock.patch("pulp_ansible.app.tasks.collections.ProgressReport", FakeProgressReport)
+class TestPlanSync(FakeGalaxyTestCase):
+    """Test planning a sync from a local fake Galaxy."""
+
+    galaxy_options = {"namespaces": 1, "collections": 3, "versions": 2, "dependencies": 1}
+
+    def setUp(self):
+        super().setUp()
+        self.remote = self._remote(requirements_file="collections:\n  - bench_ns0.bench_c1")
+        self.repository = AnsibleRepository.objects.create(name=randstr())
+        with self.repository.new_version() as new_version:
+            new_version.add_content(
+                CollectionVersion.objects.filter(
+                    pk__in=[
+                        build_cv("bench_ns0", "bench_c0", "1.0.0").pk,
+                        build_cv("foo", "bar", "1.0.0").pk,
+                    ]
+                )
+            )
+
+    def _sizes(self, name):
+        return {
+            version["version"]: version["size"]
+            for version in self.galaxy.collections[("bench_ns0", name)]
+        }
+
+    def test_plan(self):
+        """The plan lists the versions a sync would add or remove, and what it would download."""
+        plan = plan_sync(self.remote, self.repository, is_repo_remote=False, mirror=True)
+
+        c0, c1 = self._sizes("bench_c0"), self._sizes("bench_c1")
+        # bench_c1 depends on bench_c0, whose 1.0.0 is already in the repository
+        self.assertEqual(
+            plan["added"],
+            [
+                {
+                    "namespace": "bench_ns0",
+                    "name": "bench_c0",
+                    "version": "1.1.0",
+                    "size": c0["1.1.0"],
+                },
+                {
+                    "namespace": "bench_ns0",
+                    "name": "bench_c1",
+                    "version": "1.0.0",
+                    "size": c1["1.0.0"],
+                },
+                {
+                    "namespace": "bench_ns0",
+                    "name": "bench_c1",
+                    "version": "1.1.0",
+                    "size": c1["1.1.0"],
+                },
+            ],
+        )
+        self.assertEqual(plan["added_count"], 3)
+        self.assertEqual(plan["removed"], [{"namespace": "foo", "name": "bar", "version": "1.0.0"}])
+        self.assertEqual(plan["removed_count"], 1)
+        self.assertEqual(plan["artifact_size"], c0["1.1.0"] + sum(c1.values()))
+        self.assertEqual(plan["download_size"], plan["artifact_size"])
+        self.assertEqual(plan["would_fetch"], [])
+        # Only metadata was requested
+        self.assertFalse(
+            [endpoint for endpoint in self.galaxy.requests_by_endpoint if "download" in endpoint]
+        )
+        self.assertEqual(self.repository.latest_version().number, 1)
+
+    def test_plan_additive(self):
+        """Additive syncs remove nothing, and on-demand syncs download nothing."""
+        self.remote.policy = "on_demand"
+        self.remote.save()
+
+        plan = plan_sync(self.remote, self.repository, is_repo_remote=False, mirror=False)
+        self.assertEqual(plan["added_count"], 3)
+        self.assertEqual(plan["removed"], [])
+        self.assertEqual(plan["download_size"], 0)
+
+
+@mock.patch("pulpcore.plugin.stages.artifact_stages.ProgressReport", FakeProgressReport)
+class TestDocsBlobDownloader(FakeGalaxyTestCase):
+    """Test downloading the docs blobs of synced collection versions."""
+
+    galaxy_options = {"namespaces": 1, "collections": 4, "versions": 1}
+
+    def setUp(self):
+        super().setUp()
+        self.remote = self._remote()
+
+    def _d_content(self, name):
+        collection_version = CollectionVersion(
+            namespace="bench_ns0", name=name, version="1.0.0", sha256=randstr()
+        )
+        d_artifact = DeclarativeArtifact(
+            artifact=Artifact(),
+            url=f"{self.galaxy.base_url}/download/bench_ns0-{name}-1.0.0.tar.gz",
+            relative_path=f"bench_ns0-{name}-1.0.0.tar.gz",
+            remote=self.remote,
+        )
+        docs_blob_url = (
+            f"{self.galaxy.url}v3/collections/bench_ns0/{name}/versions/1.0.0/docs-blob/"
+        )
+        return DeclarativeContent(
+            content=collection_version,
+            d_artifacts=[d_artifact],
+            extra_data={"docs_blob_url": docs_blob_url},
+        )
+
+    def test_round_trip(self):
+        """Docs blobs are kept in memory, compressed, and saved as served."""
+        d_content = self._d_content("bench_c0")
+
+        emitted = self.loop.run_until_complete(run_stage(DocsBlobDownloader(), [d_content]))
+        self.assertEqual(emitted, [d_content])
+        self.assertEqual(os.listdir(self.working_directory), [])
+
+        collection_version = d_content.content
+        collection_version.collection, _ = Collection.objects.get_or_create(
+            namespace="bench_ns0", name="bench_c0"
+        )
+        collection_version.save()
+        d_content.extra_data.update(
+            pre_save_adding=True,
+            pre_save_pulp_id=collection_version.pulp_id,
+            files_raw='{"files": [], "format": 1}',
+        )
+        AnsibleContentSaver.__new__(AnsibleContentSaver)._post_save([d_content])
+
+        collection_version.refresh_from_db()
+        self.assertEqual(
+            collection_version.docs_blob,
+            {
+                "collection_readme": {"name": "README.md", "html": "<h1>bench_ns0.bench_c0</h1>"},
+                "documentation_files": [],
+                "contents": [],
+            },
+        )
+
+    def test_missing_docs_blob(self):
+        """A docs blob the remote doesn't serve is skipped, without failing the sync."""
+        d_content = self._d_content("missing")
+
+        emitted = self.loop.run_until_complete(run_stage(DocsBlobDownloader(), [d_content]))
+        self.assertEqual(emitted, [d_content])
+        self.assertNotIn("docs_blob", d_content.extra_data)
+
+    @override_settings(ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY=2)
+    def test_concurrency_is_bounded(self):
+        """At most ANSIBLE_SYNC_DOCS_BLOB_CONCURRENCY docs blobs are downloaded at once."""
+        get_downloader = self.remote.get_downloader
+        active = []
+        max_active = 0
+
+        def tracking_downloader(**kwargs):
+            downloader = get_downloader(**kwargs)
+            run = downloader.run
+
+            async def tracked_run():
+                nonlocal max_active
+                active.append(downloader)
+                max_active = max(max_active, len(active))
+                try:
+                    await asyncio.sleep(0.05)
+                    return await run()
+                finally:
+                    active.remove(downloader)
+
+            downloader.run = tracked_run
+            return downloader
+
+        items = [self._d_content(f"bench_c{i}") for i in range(4)]
+        with mock.patch.object(self.remote, "get_downloader", side_effect=tracking_downloader):
+            self.loop.run_until_complete(run_stage(DocsBlobDownloader(), items))
+
+        self.assertEqual(max_active, 2)
+        self.assertTrue(all("docs_blob" in d_content.extra_data for d_content in items))
+
+
+class TestGitBuildPool(TestCase):
+    """Test building the collections another Pulp synced from git in worker processes."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmp.name)
+        self.remote = CollectionRemote.objects.create(name=randstr(), url="https://example.com/")
+
+    def _first_stage(self):
+        first_stage = _first_stage()
+        first_stage.remote = self.remote
+        first_stage.dry_run = False
+        first_stage.git_build_executor = None
+        first_stage.metadata_store = None
+        first_stage.metadata_cache = None
+        first_stage.emitted = []
+        first_stage.put = mock.AsyncMock(side_effect=first_stage.emitted.append)
+        return first_stage
+
+    def _git_repo(self):
+        """Create a git repository holding the testns.testcol 1.2.3 collection."""
+        upstream = Repo.init("upstream", initial_branch="main")
+        files = {
+            "galaxy.yml": (
+                "namespace: testns\nname: testcol\nversion: 1.2.3\nreadme: README.md\n"
+                "authors: [Test]\nlicense: [GPL-3.0-or-later]\ndescription: A test\n"
+                "repository: https://example.com/testns/testcol\n"
+            ),
+            "README.md": "# testcol\n",
+            "meta/runtime.yml": 'requires_ansible: ">=2.14"\n',
+        }
+        for path, content in files.items():
+            path = os.path.join(upstream.working_dir, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fd:
+                fd.write(content)
+        upstream.index.add(list(files))
+        author = Actor("Test", "test@example.com")
+        commit = upstream.index.commit("testcol", author=author, committer=author)
+        return upstream.working_dir, commit.hexsha
+
+    def test_collection_is_built_in_pool(self):
+        """The collection is built in a lazily spawned worker process and saved."""
+        url, commit_sha = self._git_repo()
+        first_stage = self._first_stage()
+        version_metadata = {
+            "git_url": url,
+            "git_commit_sha": commit_sha,
+            "namespace": {"name": "testns"},
+            "name": "testcol",
+            "version": "1.2.3",
+        }
+
+        async def emit_content():
+            await first_stage._add_collection_version_from_git(version_metadata)
+
+        first_stage._emit_content = emit_content
+        async_to_sync(first_stage.run)()
+
+        executor = first_stage.git_build_executor
+        self.assertEqual(executor._mp_context.get_start_method(), "spawn")
+        self.assertTrue(executor._shutdown_thread)
+        (d_content,) = first_stage.emitted
+        collection_version = d_content.content
+        self.assertFalse(collection_version._state.adding)
+        self.assertEqual(
+            (collection_version.namespace, collection_version.name, collection_version.version),
+            ("testns", "testcol", "1.2.3"),
+        )
+        self.assertEqual(d_content.d_artifacts[0].url, f"{url}/commit/{commit_sha}")
+        self.assertTrue(
+            collection_version.contentartifact_set.filter(artifact__isnull=False).exists()
+        )
+
+    @mock.patch("pulp_ansible.app.tasks.collections.ProcessPoolExecutor")
+    @mock.patch(
+        "pulp_ansible.app.tasks.collections.declarative_content_from_git_repo",
+        side_effect=RuntimeError("build failed"),
+    )
+    def test_pool_is_shut_down_on_errors(self, build, executor_class):
+        """The worker processes are shut down when the sync fails."""
+        first_stage = self._first_stage()
+        version_metadata = {"git_url": "https://example.com/repo.git", "git_commit_sha": "abc"}
+
+        async def emit_content():
+            await first_stage._add_collection_version_from_git(version_metadata)
+
+        first_stage._emit_content = emit_content
+
+        with self.assertRaisesRegex(RuntimeError, "build failed"):
+            async_to_sync(first_stage.run)()
+
+        self.assertEqual(build.call_args.kwargs["executor"], executor_class.return_value)
+        self.assertEqual(executor_class.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+        executor_class.return_value.shutdown.assert_called_once_with(cancel_futures=True)
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from aiohttp.client_exceptions import ClientResponseError
+from django.test import SimpleTestCase, override_settings
+
+from pulp_ansible.app.downloaders import (
+    AdaptiveRateLimiter,
+    AnsibleDownloaderFactory,
+    BearerTokenCache,
+    MetadataCache,
+    parse_retry_after,
+)
+
+URL = "https://galaxy.example.com/api/v3/collections/all/"
+
+
+class TestMetadataCache(SimpleTestCase):
+    """Test the on-disk cache of remote metadata responses."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = MetadataCache(f"{self.tmpdir.name}/cache")
+        # Cached bodies are copied into the working directory
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _download_result(self, body, headers):
+        path = f"{self.tmpdir.name}/download"
+        with open(path, "w") as fp:
+            json.dump(body, fp)
+        return SimpleNamespace(path=path, headers=headers)
+
+    def test_revalidates_cached_response(self):
+        """A response with validators is cached and makes the next request conditional."""
+        self.assertEqual(self.cache.conditional_headers(URL), {})
+        self.assertIsNone(self.cache.get(URL))
+
+        headers = {"ETag": '"abc"', "Last-Modified": "Tue, 01 Sep 2026 00:00:00 GMT"}
+        self.cache.put(URL, self._download_result([{"name": "foo"}], headers))
+
+        self.assertEqual(
+            self.cache.conditional_headers(URL),
+            {"If-None-Match": '"abc"', "If-Modified-Since": "Tue, 01 Sep 2026 00:00:00 GMT"},
+        )
+        cached = self.cache.get(URL)
+        with open(cached.path) as fp:
+            self.assertEqual(json.load(fp), [{"name": "foo"}])
+        self.assertEqual(self.cache.conditional_headers(URL + "?limit=1"), {})
+
+        # The result is a copy, which the caller may move or modify
+        os.unlink(cached.path)
+        with open(self.cache.get(URL).path) as fp:
+            self.assertEqual(json.load(fp), [{"name": "foo"}])
+
+    def test_skips_responses_without_validators(self):
+        """Responses that cannot be revalidated are not cached."""
+        self.cache.put(URL, self._download_result([], {}))
+        self.cache.put(URL, self._download_result([], {"ETag": "x", "Cache-Control": "no-store"}))
+        self.assertIsNone(self.cache.get(URL))
+
+    def test_prune(self):
+        """The least recently used entries are evicted to fit the size limit."""
+        headers = {"ETag": '"abc"'}
+        for i in range(3):
+            url = f"{URL}?offset={i}"
+            self.cache.put(url, self._download_result("x" * 98, headers))
+            os.utime(self.cache._entry(url)[1], (i, i))
+        self.cache.get(f"{URL}?offset=0")
+
+        self.cache.prune(200)
+        self.assertIsNotNone(self.cache.get(f"{URL}?offset=0"))
+        self.assertIsNone(self.cache.get(f"{URL}?offset=1"))
+        self.assertIsNotNone(self.cache.get(f"{URL}?offset=2"))
+
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(f"{URL}?offset=0"))
+
+
+class TestAdaptiveRateLimiter(SimpleTestCase):
+    """Test the per-host AIMD concurrency limit."""
+
+    def _throttled(self, status=429, retry_after=None):
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        return ClientResponseError(None, (), status=status, headers=headers)
+
+    def test_backs_off_and_ramps_up(self):
+        """The limit halves on throttling answers and grows back on successes."""
+
+        async def run():
+            limiter = AdaptiveRateLimiter(initial=8, maximum=10)
+            with self.assertRaises(ClientResponseError):
+                async with limiter:
+                    raise self._throttled(503)
+            self.assertEqual(limiter.limit, 4)
+            # Throttling answers to concurrent requests only count once
+            with self.assertRaises(ClientResponseError):
+                async with limiter:
+                    raise self._throttled()
+            self.assertEqual(limiter.limit, 4)
+            with self.assertRaises(ClientResponseError):
+                async with limiter:
+                    raise self._throttled(404)
+            self.assertEqual(limiter.limit, 4)
+
+            for i in range(100):
+                async with limiter:
+                    pass
+            self.assertEqual(limiter.limit, 10)
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(run())
+
+    def test_retry_after_holds_back_requests(self):
+        """A Retry-After header delays the following requests to the host."""
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            limiter = AdaptiveRateLimiter(initial=2, maximum=2)
+            with self.assertRaises(ClientResponseError):
+                async with limiter:
+                    raise self._throttled(retry_after="0.2")
+            start = loop.time()
+            async with limiter:
+                pass
+            self.assertGreaterEqual(loop.time() - start, 0.15)
+
+        asyncio.run(run())
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def _factory(self, download_concurrency):
+        factory = AnsibleDownloaderFactory.__new__(AnsibleDownloaderFactory)
+        factory._remote = SimpleNamespace(
+            download_concurrency=download_concurrency, DEFAULT_DOWNLOAD_CONCURRENCY=10
+        )
+        factory._rate_limiters = {}
+        return factory
+
+    def test_disabled_by_default(self):
+        """Without the setting, downloads are only limited by the remote's settings."""
+        self.assertIsNone(self._factory(50)._rate_limiter(URL))
+
+    @override_settings(ANSIBLE_SYNC_HOST_CONCURRENCY=20)
+    def test_shared_per_host(self):
+        """The downloads from one host share a limiter capped by the remote's concurrency."""
+        factory = self._factory(5)
+        limiter = factory._rate_limiter(URL)
+        self.assertIs(factory._rate_limiter(f"{URL}?offset=100"), limiter)
+        self.assertIsNot(factory._rate_limiter("https://other.example.com/"), limiter)
+        self.assertEqual((limiter.limit, limiter.maximum), (5, 5))
+
+
+class TestBearerTokenCache(SimpleTestCase):
+    """Test the cache of Bearer tokens."""
+
+    def test_shares_refreshes_per_key(self):
+        """Concurrent requests share one refresh, and other keys get their own token."""
+        cache = BearerTokenCache()
+        refreshes = []
+
+        def refresher(token):
+            async def refresh():
+                refreshes.append(token)
+                await asyncio.sleep(0.01)
+                return token, 300
+
+            return refresh
+
+        async def run():
+            return await asyncio.gather(
+                *(cache.get_or_refresh(("auth", "a"), refresher("token-a")) for i in range(5)),
+                cache.get_or_refresh(("auth", "b"), refresher("token-b")),
+            )
+
+        self.assertEqual(asyncio.run(run()), ["token-a"] * 5 + ["token-b"])
+        self.assertEqual(sorted(refreshes), ["token-a", "token-b"])
+
+        cache.invalidate(("auth", "a"), "stale")
+        self.assertEqual(cache.get(("auth", "a")), "token-a")
+        cache.invalidate(("auth", "a"), "token-a")
+        self.assertIsNone(cache.get(("auth", "a")))
+
+    def test_refreshes_before_expiry(self):
+        """Tokens count as stale shortly before they expire."""
+        cache = BearerTokenCache()
+
+        async def refresh():
+            return "token", 300
+
+        with mock.patch("pulp_ansible.app.downloaders.time.monotonic", return_value=1000):
+            asyncio.run(cache.get_or_refresh("key", refresh))
+        with mock.patch("pulp_ansible.app.downloaders.time.monotonic", return_value=1269):
+            self.assertEqual(cache.get("key"), "token")
+        with mock.patch("pulp_ansible.app.downloaders.time.monotonic", return_value=1270):
+            self.assertIsNone(cache.get("key"))
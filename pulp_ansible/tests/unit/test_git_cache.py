@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+from git import Repo
+
+from pulp_ansible.app.tasks.git_cache import GitMirrorCache
+
+
+class TestGitMirrorCache(SimpleTestCase):
+    """Test the cache of bare git mirrors."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmp.name)
+
+        self.upstream = Repo.init("upstream", initial_branch="main")
+        with self.upstream.config_writer() as config:
+            config.set_value("user", "name", "Test")
+            config.set_value("user", "email", "test@example.com")
+        self.url = os.path.abspath("upstream")
+        self.cache = GitMirrorCache(os.path.abspath("cache"))
+
+    def commit(self, content):
+        with open(os.path.join(self.upstream.working_dir, "galaxy.yml"), "w") as fd:
+            fd.write(content)
+        self.upstream.index.add(["galaxy.yml"])
+        return self.upstream.index.commit(content).hexsha
+
+    def checkout(self, git_ref=None):
+        worktree = self.cache.checkout(self.url, git_ref)
+        self.addCleanup(self.cache.remove_worktree, self.url, worktree)
+        return worktree
+
+    def test_checkout_refs(self):
+        """Branches, tags and commit shas are checked out of the mirror."""
+        first = self.commit("version: 1.0.0")
+        self.upstream.create_tag("1.0.0")
+        second = self.commit("version: 1.1.0")
+
+        self.assertEqual(self.checkout().head.commit.hexsha, second)
+        self.assertEqual(self.checkout("main").head.commit.hexsha, second)
+        self.assertEqual(self.checkout("1.0.0").head.commit.hexsha, first)
+        self.assertEqual(self.checkout(first).head.commit.hexsha, first)
+        self.assertEqual(len(os.listdir(self.cache.path)), 2)  # the mirror and its lock
+
+    def test_fetches_new_commits(self):
+        """Later checkouts fetch the new commits into the existing mirror."""
+        self.commit("version: 1.0.0")
+        self.checkout()
+        latest = self.commit("version: 2.0.0")
+
+        worktree = self.checkout("main")
+        self.assertEqual(worktree.head.commit.hexsha, latest)
+        with open(os.path.join(worktree.working_dir, "galaxy.yml")) as fd:
+            self.assertEqual(fd.read(), "version: 2.0.0")
+
+    def test_remove_worktree(self):
+        """Removed worktrees are deleted and forgotten by the mirror."""
+        self.commit("version: 1.0.0")
+        worktree = self.cache.checkout(self.url)
+        self.cache.remove_worktree(self.url, worktree)
+
+        self.assertFalse(os.path.exists(worktree.working_dir))
+        mirror = Repo(self.cache._mirror_path(self.url))
+        self.assertEqual(len(mirror.git.worktree("list").splitlines()), 1)
@@ -0,0 +1,92 @@
+import io
+import os
+import tarfile
+import tempfile
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from pulp_ansible.app.tasks.collections import _local_collection_tarballs
+
+
+def build_tar(path, members, mode="w:gz"):
+    with tarfile.open(path, mode=mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
+def temp_file(path):
+    return SimpleNamespace(file=SimpleNamespace(open=lambda: open(path, "rb")))
+
+
+class TestLocalCollectionTarballs(SimpleTestCase):
+    """Test finding the collection tarballs of a batch import."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmpdir.name)
+        os.mkdir("uploads")
+        os.makedirs("import/sub")
+        self.collection = build_tar(
+            "uploads/foo-bar-1.0.0.tar.gz", {"MANIFEST.json": b"{}", "FILES.json": b"{}"}
+        )
+        self.other = build_tar(
+            "uploads/foo-baz-1.0.0.tar.gz", {"./MANIFEST.json": b"{}", "FILES.json": b"{}"}
+        )
+
+    def read(self, tarballs):
+        contents = []
+        for path, is_copy in tarballs:
+            with open(path, "rb") as fd:
+                contents.append((fd.read(), is_copy))
+        return contents
+
+    def test_uploads(self):
+        """Uploaded tarballs are copied, uploaded archives of tarballs are unpacked."""
+        build_tar(
+            "uploads/archive.tar",
+            {
+                "foo-bar-1.0.0.tar.gz": self.collection,
+                "./foo-baz-1.0.0.tar.gz": self.other,
+                "README": b"not a collection",
+            },
+            mode="w",
+        )
+        tarballs = _local_collection_tarballs(
+            [temp_file("uploads/foo-bar-1.0.0.tar.gz"), temp_file("uploads/archive.tar")], None
+        )
+        self.assertEqual(
+            self.read(tarballs),
+            [(self.collection, True), (self.collection, True), (self.other, True)],
+        )
+        # The copy of the archive itself is deleted once it is unpacked
+        copies = [name for name in os.listdir(".") if name.endswith(".tar.gz")]
+        self.assertEqual(len(copies), 3)
+
+    def test_path(self):
+        """Tarballs in a directory are imported in place."""
+        os.rename("uploads/foo-bar-1.0.0.tar.gz", "import/foo-bar-1.0.0.tar.gz")
+        os.rename("uploads/foo-baz-1.0.0.tar.gz", "import/sub/foo-baz-1.0.0.tar.gz")
+        with open("import/README.md", "w") as fd:
+            fd.write("not a collection")
+
+        # Links out of the allowed import paths are skipped
+        build_tar("uploads/outside-1.0.0.tar.gz", {"MANIFEST.json": b"{}"})
+        os.symlink(os.path.abspath("uploads/outside-1.0.0.tar.gz"), "import/outside-1.0.0.tar.gz")
+
+        with override_settings(ALLOWED_IMPORT_PATHS=[os.path.abspath("import")]):
+            tarballs = list(_local_collection_tarballs([], os.path.abspath("import")))
+        self.assertEqual(
+            tarballs,
+            [
+                (os.path.abspath("import/foo-bar-1.0.0.tar.gz"), False),
+                (os.path.abspath("import/sub/foo-baz-1.0.0.tar.gz"), False),
+            ],
+        )
@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from pulpcore.plugin.stages import EndStage, Stage, create_pipeline
+
+from pulp_ansible.app.tasks.profiling import profile_stage
+
+
+class Producer(Stage):
+    async def run(self):
+        for i in range(10):
+            await self.put(SimpleNamespace(value=i, does_batch=True))
+
+
+class Filter(Stage):
+    async def run(self):
+        async for item in self.items():
+            if item.value % 2:
+                await self.put(item)
+
+
+class Batcher(Stage):
+    async def run(self):
+        async for batch in self.batches(minsize=2):
+            for item in batch:
+                await asyncio.sleep(0)
+                await self.put(item)
+
+
+@mock.patch("pulpcore.plugin.stages.api.get_domain", mock.Mock())
+class TestProfileStage(SimpleTestCase):
+    """Test the instrumentation of sync pipeline stages."""
+
+    def test_counts_items_and_batches(self):
+        """Profiled stages count the items they receive and pass on, and the batches."""
+        stages = [Producer(), Filter(), Batcher()]
+        profiles = [profile_stage(stage, position) for position, stage in enumerate(stages)]
+        asyncio.run(create_pipeline(stages + [EndStage()]))
+
+        producer, filter_, batcher = profiles
+        self.assertEqual((producer.items_in, producer.items_out), (0, 10))
+        self.assertEqual((filter_.items_in, filter_.items_out), (10, 5))
+        self.assertEqual((batcher.items_in, batcher.items_out), (5, 5))
+        self.assertEqual(filter_.batches, 0)
+        self.assertGreater(batcher.batches, 0)
+        self.assertLessEqual(batcher.max_batch_size, 5)
+        for profile in profiles:
+            self.assertGreater(profile.wall_time, 0)
+            self.assertEqual(profile.db_queries, 0)
+        self.assertEqual(batcher.as_dict()["stage"], "Batcher")
+        self.assertIn("batches of", batcher.summary())
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+
+from pulpcore.plugin.models import Artifact, ContentArtifact, Remote
+
+from pulp_ansible.app.constants import PAGE_SIZE
+from pulp_ansible.app.models import AnsibleRepository, Role, RoleRemote
+from pulp_ansible.app.tasks.roles import RoleFirstStage
+
+from .utils import FakeProgressReport, randstr
+
+
+@mock.patch("pulp_ansible.app.tasks.roles.ProgressReport", FakeProgressReport)
+@mock.patch("pulp_ansible.app.tasks.roles.parse_metadata", side_effect=lambda result: result)
+class TestFetchGalaxyPages(SimpleTestCase):
+    """Test fetching the pages of the Galaxy roles API."""
+
+    def test_page_window_is_bounded(self, _):
+        """At most `download_concurrency` pages are fetched at once, and all are yielded."""
+        in_flight = []
+        max_in_flight = 0
+
+        def get_downloader(url):
+            async def run():
+                nonlocal max_in_flight
+                in_flight.append(url)
+                max_in_flight = max(max_in_flight, len(in_flight))
+                await asyncio.sleep(0.01)
+                in_flight.remove(url)
+                return {"count": 7 * PAGE_SIZE, "url": url}
+
+            return SimpleNamespace(run=run)
+
+        first_stage = RoleFirstStage.__new__(RoleFirstStage)
+        first_stage.remote = SimpleNamespace(
+            url="https://galaxy.example.com/api/v1/roles/",
+            download_concurrency=2,
+            DEFAULT_DOWNLOAD_CONCURRENCY=10,
+            get_downloader=get_downloader,
+        )
+
+        async def fetch():
+            return [page["url"] async for page in first_stage._fetch_galaxy_pages()]
+
+        urls = asyncio.run(fetch())
+        self.assertEqual(len(urls), 7)
+        self.assertEqual(
+            {url.rsplit("page=", 1)[1].split("&")[0] for url in urls},
+            {str(page) for page in range(1, 8)},
+        )
+        self.assertEqual(max_in_flight, 2)
+
+
+@mock.patch("pulp_ansible.app.tasks.roles.ProgressReport", FakeProgressReport)
+class TestRoleFirstStage(TestCase):
+    """Test emitting the role versions Pulp already has without downloading them again."""
+
+    def setUp(self):
+        self.remote = RoleRemote.objects.create(
+            name=randstr(), url="https://galaxy.example.com/api/v1/roles/", policy=Remote.IMMEDIATE
+        )
+        self.repository = AnsibleRepository.objects.create(name=randstr())
+        # foo.bar 1.0.0 is in the repository, 2.0.0 was downloaded for another repository
+        self.in_repository = Role.objects.create(namespace="foo", name="bar", version="1.0.0")
+        self.downloaded = Role.objects.create(namespace="foo", name="bar", version="2.0.0")
+        self._add_artifact(self.downloaded)
+        # Only the metadata of foo.baz 1.0.0 is known, e.g. from an on-demand sync
+        Role.objects.create(namespace="foo", name="baz", version="1.0.0")
+        with self.repository.new_version() as new_version:
+            new_version.add_content(Role.objects.filter(pk=self.in_repository.pk))
+
+    def _add_artifact(self, role):
+        data = randstr().encode()
+        artifact = Artifact.objects.create(
+            size=len(data),
+            file=SimpleUploadedFile(f"{role.name}-{role.version}.tar.gz", data),
+            **{
+                algorithm: hashlib.new(algorithm, data).hexdigest()
+                for algorithm in Artifact.DIGEST_FIELDS
+            },
+        )
+        ContentArtifact.objects.create(
+            artifact=artifact, content=role, relative_path=f"{role.name}-{role.version}.tar.gz"
+        )
+
+    def _role(self, name, versions):
+        return {
+            "namespace": "foo",
+            "name": name,
+            "github_user": "foo",
+            "github_repo": name,
+            "summary_fields": {"versions": [{"name": version} for version in versions]},
+        }
+
+    def _run(self, mirror):
+        """Run the first stage on the remote's role versions, returning what it emitted."""
+        first_stage = RoleFirstStage(self.remote, self.repository, mirror=mirror)
+        pages = [
+            [self._role("bar", ["1.0.0", "2.0.0", "3.0.0"])],
+            [],
+            [self._role("baz", ["1.0.0"]), self._role("qux", ["1.0.0"])],
+        ]
+
+        async def fetch_role_pages():
+            for page in pages:
+                yield page
+
+        emitted = []
+        first_stage._fetch_role_pages = fetch_role_pages
+        first_stage.put = mock.AsyncMock(side_effect=emitted.append)
+        async_to_sync(first_stage.run)()
+        return emitted
+
+    def _by_key(self, emitted):
+        return {(d.content.namespace, d.content.name, d.content.version): d for d in emitted}
+
+    def test_additive_sync(self):
+        """Versions in the repository are skipped and downloaded versions have no artifacts."""
+        emitted = self._run(mirror=False)
+
+        self.assertEqual(len(emitted), 4)
+        emitted = self._by_key(emitted)
+        self.assertEqual(
+            set(emitted),
+            {
+                ("foo", "bar", "2.0.0"),
+                ("foo", "bar", "3.0.0"),
+                ("foo", "baz", "1.0.0"),
+                ("foo", "qux", "1.0.0"),
+            },
+        )
+        self.assertEqual(emitted[("foo", "bar", "2.0.0")].content, self.downloaded)
+        self.assertEqual(emitted[("foo", "bar", "2.0.0")].d_artifacts, [])
+        # Versions without a downloaded tarball are downloaded
+        for key in (("foo", "bar", "3.0.0"), ("foo", "baz", "1.0.0"), ("foo", "qux", "1.0.0")):
+            self.assertTrue(emitted[key].content._state.adding)
+            self.assertEqual(len(emitted[key].d_artifacts), 1)
+
+    def test_mirror_sync(self):
+        """Mirror syncs emit every version, the ones in the repository without an artifact."""
+        emitted = self._run(mirror=True)
+
+        self.assertEqual(len(emitted), 5)
+        emitted = self._by_key(emitted)
+        self.assertEqual(emitted[("foo", "bar", "1.0.0")].content, self.in_repository)
+        self.assertEqual(emitted[("foo", "bar", "1.0.0")].d_artifacts, [])
+        self.assertEqual(emitted[("foo", "bar", "2.0.0")].content, self.downloaded)
+        self.assertEqual(emitted[("foo", "bar", "2.0.0")].d_artifacts, [])
+        self.assertEqual(len(emitted[("foo", "bar", "3.0.0")].d_artifacts), 1)
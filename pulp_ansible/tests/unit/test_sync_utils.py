@@ -0,0 +1,178 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from pulp_ansible.app.tasks.utils import (
+    CollectionVersionMetadataIndex,
+    DiskCollectionVersionMetadataIndex,
+    DiskSyncedVersions,
+    LocalCollectionTarball,
+    SyncedVersions,
+    SyncMetadataStore,
+    is_allowed_import_path,
+    iter_metadata_items,
+)
+from pulp_ansible.exceptions import CollectionFileNotFoundError
+
+
+class TestIterMetadataItems(SimpleTestCase):
+    """Test the incremental metadata parser."""
+
+    def test_yields_standard_types(self):
+        """Each list item is yielded as plain python objects."""
+        items = [
+            {"namespace": {"name": "foo"}, "name": "bar", "version": "1.0.0", "tags": ["a"]},
+            {"namespace": {"name": "foo"}, "name": "baz", "version": "2.0.0", "tags": []},
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as fp:
+            json.dump(items, fp)
+            fp.flush()
+            result = list(iter_metadata_items(SimpleNamespace(path=fp.name)))
+        self.assertEqual(result, items)
+        self.assertIsInstance(result[0]["namespace"], dict)
+        self.assertIsInstance(result[0]["tags"], list)
+
+
+class TestCollectionVersionMetadataIndex(SimpleTestCase):
+    """Test the compact collection version metadata index."""
+
+    def get_index(self):
+        return CollectionVersionMetadataIndex()
+
+    def test_add_and_get(self):
+        """Records are returned per collection in insertion order."""
+        index = self.get_index()
+        self.assertFalse(index)
+        index.add("foo", "bar", {"version": "1.0.0"})
+        index.add("foo", "bar", {"version": "1.1.0"})
+        index.add("foo", "baz", {"version": "2.0.0"})
+
+        self.assertTrue(index)
+        self.assertEqual(len(index), 2)
+        self.assertIn(("foo", "bar"), index)
+        self.assertEqual(index.get("foo", "bar"), [{"version": "1.0.0"}, {"version": "1.1.0"}])
+
+    def test_get_missing_collection(self):
+        """Looking up an unknown collection raises a KeyError and does not add it."""
+        index = self.get_index()
+        with self.assertRaises(KeyError):
+            index.get("foo", "bar")
+        self.assertNotIn(("foo", "bar"), index)
+
+
+class TestDiskCollectionVersionMetadataIndex(TestCollectionVersionMetadataIndex):
+    """Test the collection version metadata index kept in SQLite."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SyncMetadataStore(self.tmpdir.name)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def get_index(self):
+        return DiskCollectionVersionMetadataIndex(self.store)
+
+    def test_new_index_on_same_store(self):
+        """A second index on the same store starts out empty."""
+        index = self.get_index()
+        index.add("foo", "bar", {"version": "1.0.0"})
+        index = self.get_index()
+        self.assertFalse(index)
+        index.add("foo", "baz", {"version": "2.0.0"})
+        self.assertNotIn(("foo", "bar"), index)
+        self.assertEqual(index.get("foo", "baz"), [{"version": "2.0.0"}])
+
+
+class TestSyncedVersions(SimpleTestCase):
+    """Test the sets of synced collection versions."""
+
+    def check_synced_versions(self, synced):
+        self.assertNotIn(("foo.bar", "1.0.0"), synced)
+        synced.add("foo.bar", "1.0.0")
+        synced.add("foo.bar", "1.0.0")
+        synced.add("foo.bar", "2.0.0")
+        self.assertIn(("foo.bar", "1.0.0"), synced)
+        self.assertNotIn(("foo.baz", "1.0.0"), synced)
+        self.assertEqual(synced.versions("foo.bar"), {"1.0.0", "2.0.0"})
+        self.assertEqual(synced.versions("foo.baz"), set())
+
+    def test_in_memory(self):
+        """Versions are tracked per collection in memory."""
+        self.check_synced_versions(SyncedVersions())
+
+    def test_on_disk(self):
+        """Versions are tracked per collection in SQLite, whose file is deleted on close."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SyncMetadataStore(tmpdir)
+            self.check_synced_versions(DiskSyncedVersions(store))
+            store.close()
+            self.assertEqual(os.listdir(tmpdir), [])
+
+
+def build_tarball(members):
+    tarball = io.BytesIO()
+    with tarfile.open(fileobj=tarball, mode="w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    tarball.seek(0)
+    return tarball
+
+
+class TestLocalCollectionTarball(SimpleTestCase):
+    """Test the local copy of collection tarballs."""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(tmpdir.name)
+
+    def test_read_manifest_and_files(self):
+        """MANIFEST.json and FILES.json are read and the copy is rewound for the importer."""
+        content = build_tarball(
+            {
+                "./MANIFEST.json": b'{"collection_info": {"name": "bar"}}',
+                "FILES.json": b'{"files": []}',
+                "README.md": b"readme",
+            }
+        )
+        with LocalCollectionTarball(content, "foo-bar-1.0.0.tar.gz") as tarball:
+            manifest, files = tarball.read_manifest_and_files()
+            self.assertEqual(manifest, {"collection_info": {"name": "bar"}})
+            self.assertEqual(files, {"files": []})
+            self.assertEqual(tarball.file.read(), content.getvalue())
+        self.assertEqual(os.listdir("."), [])
+
+    def test_missing_file(self):
+        """Tarballs without FILES.json are rejected."""
+        content = build_tarball({"MANIFEST.json": b"{}"})
+        with LocalCollectionTarball(content, "foo-bar-1.0.0.tar.gz") as tarball:
+            with self.assertRaises(CollectionFileNotFoundError):
+                tarball.read_manifest_and_files()
+
+
+class TestIsAllowedImportPath(SimpleTestCase):
+    """Test checking paths against ALLOWED_IMPORT_PATHS."""
+
+    def test_allowed_paths(self):
+        """Paths are allowed if they resolve to a location within an allowed path."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            allowed = os.path.join(tmpdir, "allowed")
+            os.makedirs(os.path.join(allowed, "sub"))
+            os.symlink(tmpdir, os.path.join(allowed, "escape"))
+            with override_settings(ALLOWED_IMPORT_PATHS=[allowed]):
+                self.assertTrue(is_allowed_import_path(allowed))
+                self.assertTrue(is_allowed_import_path(os.path.join(allowed, "sub")))
+                self.assertFalse(is_allowed_import_path(allowed + "-other"))
+                self.assertFalse(is_allowed_import_path(os.path.join(allowed, "escape")))
+                self.assertFalse(is_allowed_import_path(os.path.join(allowed, "sub", "..", "..")))
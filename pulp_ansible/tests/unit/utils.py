@@ -1,3 +1,4 @@
+import asyncio
 import contextlib
 import hashlib
 import os
@@ -6,6 +7,7 @@ import shutil
 import string
 import subprocess
 import tempfile
+from types import SimpleNamespace
 
 import yaml
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -78,3 +80,49 @@ def build_cvs_from_specs(specs):
         )
 
     return collection_versions
+
+
+def build_cv(namespace, name, version):
+    """Make a CV without an artifact, for tests that don't read the tarball."""
+    collection, _ = Collection.objects.get_or_create(namespace=namespace, name=name)
+    return CollectionVersion.objects.create(
+        collection=collection,
+        sha256=hashlib.sha256(f"{namespace}.{name}-{version}".encode()).hexdigest(),
+        namespace=namespace,
+        name=name,
+        version=version,
+    )
+
+
+async def run_stage(stage, items):
+    """Run a sync pipeline stage on `items`, returning the items it passed on."""
+    in_q = asyncio.Queue()
+    out_q = asyncio.Queue()
+    for item in items:
+        in_q.put_nowait(item)
+    in_q.put_nowait(None)
+    stage._connect(in_q, out_q)
+    await stage()
+    emitted = []
+    while (item := out_q.get_nowait()) is not None:
+        emitted.append(item)
+    return emitted
+
+
+class FakeProgressReport(SimpleNamespace):
+    """A progress report that is not saved, as there is no task to attach it to."""
+
+    def __init__(self, **kwargs):
+        super().__init__(done=0, suffix=None, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def aincrement(self):
+        self.done += 1
+
+    async def asave(self, *args, **kwargs):
+        pass